@@ -0,0 +1,181 @@
+"""JSON scoring API for LMS integrations, next to the Streamlit UI.
+
+    python api.py --port 8502 --workers 4
+
+Endpoints:
+
+- ``GET  /health``       liveness probe
+- ``GET  /rubric``       questions and answer options of the active rubric
+- ``POST /score``        one environment -> scores, labels and report text
+- ``POST /score/batch``  ``{"items": [...]}`` with up to MAX_BATCH environments
+
+An environment is ``{"answers": [...5 answers...], "env_name": "..."}``;
+each answer is an option index (0-based) or an answer text, which is scored
+with the rubric's keyword rules. Serialized responses are cached by
+(rubric, scores) with the name left out, so a repeated answer tuple costs one
+dict lookup plus splicing in its name, and the cache is bounded by the number
+of answer combinations whatever names clients send.
+Starlette and uvicorn already ship with Streamlit, so this adds no
+dependencies.
+"""
+import argparse
+import json
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from report import display_name, precompile, render_report
+from rubric import PRINCIPLES, load_rubric
+
+MAX_BATCH = 1000
+
+
+class InvalidRequest(ValueError):
+    pass
+
+
+def parse_item(item, rubric):
+    """Validate one request item; return (scores tuple, env_name)."""
+    if not isinstance(item, dict):
+        raise InvalidRequest("each item must be a JSON object")
+    answers = item.get("answers")
+    if not isinstance(answers, list) or len(answers) != len(PRINCIPLES):
+        raise InvalidRequest(f"'answers' must be a list of {len(PRINCIPLES)} answers")
+    env_name = item.get("env_name", "")
+    if not isinstance(env_name, str):
+        raise InvalidRequest("'env_name' must be a string")
+    try:
+        env_name.encode("utf-8")
+    except UnicodeEncodeError:
+        # e.g. a lone surrogate ("\ud800"): valid JSON, but not text we can return or store
+        raise InvalidRequest("'env_name' must be valid Unicode text")
+
+    scores = []
+    for n, (question, answer) in enumerate(zip(rubric.questions, answers), start=1):
+        if isinstance(answer, bool):
+            raise InvalidRequest(f"answer {n} must be an option index or text")
+        if isinstance(answer, int):
+            if not 0 <= answer < len(question.options):
+                raise InvalidRequest(f"answer {n} must be between 0 and {len(question.options) - 1}")
+            scores.append(question.score(answer))
+        elif isinstance(answer, str) and answer.strip():
+            scores.append(question.match(answer.strip()))
+        else:
+            raise InvalidRequest(f"answer {n} must be an option index or text")
+    return tuple(scores), env_name[:200]
+
+
+# Stands in for the environment name in the cached JSON; NUL never occurs in
+# report text, and json.dumps escapes it, so the split is unambiguous
+_NAME_MARK = "\x00env\x00"
+_ENCODED_MARK = json.dumps(_NAME_MARK)[1:-1]
+
+
+@lru_cache(maxsize=4096)
+def _report_json_parts(scores, rubric):
+    # Keyed by the score tuple only (at most one entry per answer combination),
+    # so clients varying env_name can't grow it
+    report = render_report(scores, _NAME_MARK, rubric)
+    text = json.dumps({**report.as_dict(), "download_text": report.download_text}, ensure_ascii=False)
+    return tuple(text.split(_ENCODED_MARK))
+
+
+def _report_json(scores, env_name, rubric):
+    name = json.dumps(display_name(env_name), ensure_ascii=False)[1:-1]
+    return name.join(_report_json_parts(scores, rubric))
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise InvalidRequest("request body must be valid JSON")
+
+
+def _error(message, status=422):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def rubric_info(request):
+    rubric = load_rubric()
+    return JSONResponse(
+        {
+            "name": rubric.name,
+            "version": rubric.version,
+            "digest": rubric.digest,
+            "questions": [
+                {"principle": q.principle, "question": q.text, "options": list(q.options)}
+                for q in rubric.questions
+            ],
+        }
+    )
+
+
+async def score(request):
+    rubric = load_rubric()
+    try:
+        scores, env_name = parse_item(await _json_body(request), rubric)
+    except InvalidRequest as exc:
+        return _error(str(exc))
+    return Response(_report_json(scores, env_name, rubric), media_type="application/json")
+
+
+async def score_batch(request):
+    rubric = load_rubric()
+    try:
+        body = await _json_body(request)
+        items = body.get("items") if isinstance(body, dict) else None
+        if not isinstance(items, list):
+            raise InvalidRequest("'items' must be a list")
+        if len(items) > MAX_BATCH:
+            raise InvalidRequest(f"at most {MAX_BATCH} items per batch")
+        parsed = []
+        for i, item in enumerate(items):
+            try:
+                parsed.append(parse_item(item, rubric))
+            except InvalidRequest as exc:
+                raise InvalidRequest(f"item {i}: {exc}")
+    except InvalidRequest as exc:
+        return _error(str(exc))
+    # Items are already serialized, so splice them instead of re-encoding
+    results = ",".join(_report_json(scores, name, rubric) for scores, name in parsed)
+    return Response(f'{{"results":[{results}]}}', media_type="application/json")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    precompile()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/rubric", rubric_info),
+        Route("/score", score, methods=["POST"]),
+        Route("/score/batch", score_batch, methods=["POST"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the scoring API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args(argv)
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,28 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from charts import profile_figure, profile_frame, profile_svg, profile_vega_spec
+from config import (
+    CHART_MODE,
+    LIVE_URL,
+    MEMORY_BUDGET_MB,
+    SESSION_BUDGET_MB,
+    SESSION_IDLE_MINUTES,
+    SHARED_CACHE_PATH,
+    SIMILARITY_PATH,
+    STORE_PATH,
+)
+from live import PUBLISH_INTERVAL, LiveHub, RemoteHub
+from metrics import all_cache_metrics, cache_metrics
+from presets import ENVIRONMENTS, preset_profiles
+from report import precompile, render_report
+from rubric import PRINCIPLES, load_rubric
+from sections import SectionMemo, report_sections
+from session_resources import SessionResources
+from store import AnalysisStore
+from telemetry import get_telemetry, span
+
+# pandas, NumPy and plotly are imported inside the views and helpers that
+# need them, so a cold start only pays for what the first view draws.
 
 st.set_page_config(page_title="Learning Environment Analyzer", layout="centered")
 
@@ -14,15 +36,210 @@ st.write(
     "and metacognitive support**."
 )
 
-tabs = st.tabs(
-    [
-        "Tang et al. (2025) scenarios",
-        "Analyze your own environment",
-    ]
-)
 
-# ---------- TAB 1: PRESET ENVIRONMENTS (TANG ET AL., 2025) ---------- #
-with tabs[0]:
+# ---- CACHED PRESET PROFILES ---- #
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    # Cross-process cache of the multi-process deployment (deploy.py), if any
+    if not SHARED_CACHE_PATH:
+        return None
+    from shared_cache import SharedCache
+
+    return SharedCache(SHARED_CACHE_PATH)
+
+
+@st.cache_resource(show_spinner=False)
+def _preset_profiles():
+    # Built once per process (or loaded from the shared cache) and shared by
+    # every session; the preset data never changes while the server is running.
+    cache_metrics("preset_profiles").miss()
+    return preset_profiles(get_shared_cache())
+
+
+@st.cache_resource(show_spinner=False)
+def _compiled_reports(rubric_digest):
+    # Every answer combination's report text, compiled once per process (or
+    # once per machine with a shared cache) and again only when the rubric
+    # file changes
+    return precompile(load_rubric(), get_shared_cache())
+
+
+def preset_profile(name):
+    cache_metrics("preset_profiles").lookup()
+    return _preset_profiles()[name]
+
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    # One store (and writer thread) per process, shared by every session
+    return AnalysisStore(STORE_PATH)
+
+
+@st.cache_resource(show_spinner=False)
+def get_similarity_index():
+    # One per process, loaded from disk if saved before; similar_environments
+    # then keeps it in sync with the history incrementally
+    import os
+
+    from similarity import SimilarityIndex
+
+    if SIMILARITY_PATH and os.path.exists(SIMILARITY_PATH):
+        return SimilarityIndex.load(SIMILARITY_PATH)
+    return SimilarityIndex()
+
+
+SIMILAR_COUNT = 5
+# Save the index after this many new analyses, if LEA_SIMILARITY_PATH is set
+SIMILARITY_SAVE_EVERY = 10_000
+
+
+def similar_environments(scores):
+    """The nearest preset and up to SIMILAR_COUNT nearest saved analyses, with distances."""
+    from similarity import nearest_profiles
+
+    index, store = get_similarity_index(), get_store()
+    index.sync(store)
+    if SIMILARITY_PATH and index.unsaved >= SIMILARITY_SAVE_EVERY:
+        index.save(SIMILARITY_PATH)
+    matches = index.knn(scores, SIMILAR_COUNT)
+    rows = store.get(m.id for m in matches)
+    return nearest_profiles(scores, ENVIRONMENTS, 1)[0], [(rows[m.id], m.distance) for m in matches if m.id in rows]
+
+
+def similar_text(preset, past):
+    import datetime
+
+    lines = [f"Closest Tang et al. (2025) scenario: **{preset.id}** (distance {preset.distance:.2f})."]
+    if past:
+        lines.extend(["", "Closest past analyses:"])
+        for row, distance in past:
+            when = datetime.datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d")
+            cohort = f", {row['cohort']}" if row["cohort"] else ""
+            lines.append(f"- **{row['env_name']}** ({when}{cohort}) – distance {distance:.2f}")
+    return "\n".join(lines)
+
+
+@st.cache_resource(show_spinner=False)
+def get_live_hub():
+    # Live class sessions: in this process, or on the broker shared by all workers
+    return RemoteHub(LIVE_URL) if LIVE_URL else LiveHub()
+
+
+@st.cache_resource(show_spinner=False)
+def get_session_resources():
+    # What sessions hold, with per-session and process budgets and idle expiry
+    from streamlit import runtime
+
+    def is_active(sid):
+        return runtime.exists() and runtime.get_instance().is_active_session(sid)
+
+    return SessionResources(
+        session_budget=int(SESSION_BUDGET_MB * 2**20),
+        global_budget=int(MEMORY_BUDGET_MB * 2**20),
+        idle_timeout=SESSION_IDLE_MINUTES * 60,
+        is_active=is_active,
+    )
+
+
+def hold_upload(upload, key):
+    """Account for ``upload`` in this session's budget; evicting it deletes the file.
+
+    Returns ``upload``, or None (after telling the user) if it was evicted.
+    """
+    from streamlit import runtime
+
+    resources, sid = get_session_resources(), session_id()
+    name = f"upload/{key}"
+    if upload is None:
+        if resources.pop_notice(sid, name):
+            st.info("Your uploaded file was cleared to free memory. Please upload it again.")
+        resources.discard(sid, name)
+        return None
+    if resources.get(sid, name) != upload.file_id:
+
+        def remove(file_id):
+            if runtime.exists():
+                runtime.get_instance().uploaded_file_mgr.remove_file(sid, file_id)
+
+        resources.put(sid, name, upload.file_id, upload.size, on_evict=remove)
+    return upload
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def uploaded_table(data, file_name):
+    # Keyed by the file bytes, so re-renders don't re-parse or re-score it.
+    # A compact ScoreTable, since cache_data copies the value on every read.
+    from compare import read_upload
+
+    return read_upload(data, file_name)
+
+
+@st.cache_data(show_spinner=False, ttl=30, max_entries=1)
+def saved_table():
+    # The whole history as a compact ScoreTable, re-read at most every 30 s
+    return get_store().score_table()
+
+
+def _table_digest(table):
+    # Cohort statistics only depend on the scores
+    import hashlib
+
+    return hashlib.sha1(table.scores.tobytes()).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=64, hash_funcs={"score_table.ScoreTable": _table_digest})
+def cohort_statistics(table, resamples):
+    from cohort_stats import cohort_stats
+
+    return cohort_stats(table, resamples)
+
+
+@st.cache_data(show_spinner=False, max_entries=64, hash_funcs={"score_table.ScoreTable": _table_digest})
+def cohort_comparison(before, after, resamples):
+    from cohort_stats import compare_cohorts
+
+    return compare_cohorts(before, after, resamples)
+
+
+def show_profile(scores, fig=None):
+    """Draw a design-principle profile in the configured CHART_MODE."""
+    if CHART_MODE == "svg":
+        with span("svg_chart"):
+            st.markdown(
+                profile_svg(tuple(scores.keys()), tuple(scores.values())),
+                unsafe_allow_html=True,
+            )
+    elif CHART_MODE == "vega":
+        with span("vega_chart"):
+            st.vega_lite_chart(profile_vega_spec(scores), use_container_width=True)
+    else:
+        if fig is None:
+            with span("dataframe"):
+                df = profile_frame(scores)
+            with span("figure"):
+                fig = profile_figure(df)
+        with span("plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
+
+
+def session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+
+rubric = load_rubric()
+
+HISTORY_PAGE_SIZE = 50
+MAX_TABLE_ROWS = 1000
+
+
+# Each view is a function and only the selected one runs on a rerun (st.tabs
+# would run every tab body, hidden or not).
+
+# ---------- VIEW 1: PRESET ENVIRONMENTS (TANG ET AL., 2025) ---------- #
+def presets_view():
     st.subheader("Preset environments from Tang et al. (2025)")
 
     st.markdown(
@@ -32,52 +249,13 @@ with tabs[0]:
         "\n- **Class 3:** Generative AI-assisted teaching *with* teacher supervision"
     )
 
-    environments = {
-        "Traditional computer-assisted (Class 1)": {
-            "Scaffolding": 3,
-            "ICAP engagement": 2,       # mostly Passive/Active
-            "Feedback quality": 3,
-            "Collaboration": 2,
-            "Metacognitive support": 2,
-        },
-        "GenAI-assisted, no teacher (Class 2)": {
-            "Scaffolding": 1,
-            "ICAP engagement": 2,
-            "Feedback quality": 2,
-            "Collaboration": 1,
-            "Metacognitive support": 1,
-        },
-        "GenAI + teacher supervision (Class 3)": {
-            "Scaffolding": 4,
-            "ICAP engagement": 4,       # more Constructive/Interactive
-            "Feedback quality": 4,
-            "Collaboration": 2,
-            "Metacognitive support": 3,
-        },
-    }
-
-    choice = st.selectbox("Select environment:", list(environments.keys()))
-    scores = environments[choice]
-
-    df = pd.DataFrame(
-        {
-            "Design principle": list(scores.keys()),
-            "Score (1–5)": list(scores.values()),
-        }
-    )
+    choice = st.selectbox("Select environment:", list(ENVIRONMENTS.keys()))
 
     st.subheader("Design principle profile")
-    fig = px.bar(
-        df,
-        x="Design principle",
-        y="Score (1–5)",
-        range_y=[0, 5],
-        text="Score (1–5)",
-        color="Design principle",
+    show_profile(
+        ENVIRONMENTS[choice],
+        fig=preset_profile(choice)[1] if CHART_MODE == "plotly" else None,
     )
-    fig.update_traces(textposition="outside")
-    fig.update_layout(showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("Interpretation")
 
@@ -127,9 +305,14 @@ with tabs[0]:
 
     explain_preset(choice)
 
-# ---------- TAB 2: USER WIZARD FOR CUSTOM ENVIRONMENTS ---------- #
-with tabs[1]:
+
+# ---------- VIEW 2: USER WIZARD FOR CUSTOM ENVIRONMENTS ---------- #
+# A fragment, so submitting the form reruns (and re-sends) only this view,
+# and each result section is rebuilt only when its inputs changed
+@st.fragment
+def custom_view():
     st.subheader("Describe and analyze your own learning environment")
+    _compiled_reports(rubric.digest)
 
     st.markdown(
         "Answer the questions below about a learning environment (a class, project, "
@@ -142,377 +325,485 @@ with tabs[1]:
             "Name or short description of your environment (optional):",
             placeholder="e.g., 8th Grade Science Lab, AI-assisted math station, etc.",
         )
-
-        q1 = st.radio(
-            "1. How often does a teacher, tutor, or system **adjust support** based on what learners seem to need?",
-            [
-                "Almost never – support is fixed or absent",
-                "Sometimes – some adjustment for struggling learners",
-                "Often – support is clearly tailored and responsive",
-            ],
+        cohort = st.text_input(
+            "Cohort tag (optional):",
+            placeholder="e.g., Spring 2026 – Lincoln Middle School",
+            help="Used to group saved analyses in the History tab.",
         )
-
-        q2 = st.radio(
-            "2. What do learners mostly **do** during the activity?",
-            [
-                "Listen / watch / read (no required action)",
-                "Answer questions / complete tasks (short answers, click, copy)",
-                "Explain, justify, create, or solve open-ended problems",
-                "Discuss, argue, or co-construct ideas with others",
-            ],
-        )
-
-        q3 = st.radio(
-            "3. How is **feedback** usually given?",
-            [
-                "Mostly right/wrong with little explanation",
-                "Some explanation, but not always tied to specific misconceptions",
-                "Targeted, explanatory feedback that responds to learner thinking",
-            ],
+        live_code = st.text_input(
+            "Live session code (optional):",
+            value=st.query_params.get("live", ""),
+            help="From your teacher, to add your answers to the class's live profile.",
         )
 
-        q4 = st.radio(
-            "4. What kind of **collaboration** do learners do?",
-            [
-                "Mostly individual work",
-                "Occasional pair/small group work",
-                "Frequent, structured collaboration (roles, shared products, etc.)",
-            ],
-        )
-
-        q5 = st.radio(
-            "5. How much **metacognition** is built into the activity?",
-            [
-                "Almost none – learners are not asked to reflect or plan",
-                "Sometimes – occasional reflection questions or check-ins",
-                "Often – learners regularly plan, monitor, and reflect on learning",
-            ],
-        )
+        answers = [
+            st.radio(
+                question.text,
+                range(len(question.options)),
+                format_func=question.options.__getitem__,
+                key=f"q{i}",
+            )
+            for i, question in enumerate(rubric.questions, start=1)
+        ]
 
         submitted = st.form_submit_button("Analyze my environment")
 
     if submitted:
-        # --------- scoring helpers --------- #
-        def map_scaffolding(a):
-            if "never" in a:
-                return 1
-            if "Sometimes" in a:
-                return 3
-            return 5
-
-        def map_icap(a):
-            if "Listen" in a:
-                return 1
-            if "Answer questions" in a:
-                return 2
-            if "Explain, justify" in a:
-                return 4   # Constructive
-            return 5       # Interactive
-
-        def map_feedback(a):
-            if "right/wrong" in a:
-                return 2
-            if "Some explanation" in a:
-                return 3
-            return 5
-
-        def map_collab(a):
-            if "individual" in a:
-                return 1
-            if "Occasional" in a:
-                return 3
-            return 5
-
-        def map_meta(a):
-            if "none" in a:
-                return 1
-            if "Sometimes" in a:
-                return 3
-            return 5
-
-        custom_scores = {
-            "Scaffolding": map_scaffolding(q1),
-            "ICAP engagement": map_icap(q2),
-            "Feedback quality": map_feedback(q3),
-            "Collaboration": map_collab(q4),
-            "Metacognitive support": map_meta(q5),
-        }
-
-        # Helper for ICAP label
-        def icap_label(score):
-            if score <= 1:
-                return "Passive (P)"
-            if score == 2:
-                return "Active (A)"
-            if score == 4:
-                return "Constructive (C)"
-            return "Interactive (I)"
-
-        # Helpers for qualitative labels
-        def level_label(score):
-            if score <= 2:
-                return "low"
-            if score == 3:
-                return "moderate"
-            return "high"
-
-        def capitalize_first(s: str) -> str:
-            return s[0].upper() + s[1:] if s else s
-
-        env_display_name = env_name.strip() if env_name.strip() else "This environment"
-
-        df_custom = pd.DataFrame(
-            {
-                "Design principle": list(custom_scores.keys()),
-                "Score (1–5)": list(custom_scores.values()),
-            }
-        )
+        with span("mapping"):
+            custom_scores = rubric.score_options(answers)
+        with span("report"):
+            report = render_report(custom_scores, env_name, rubric)
+        with span("similar"):
+            # Before saving, so this analysis isn't its own nearest match
+            similar = similar_environments(custom_scores)
+        with span("store"):
+            get_store().add(report.env_name, custom_scores, cohort.strip() or None)
+        if live_code.strip():
+            try:
+                # Keyed by session, so a resubmit replaces this student's answers
+                get_live_hub().submit(live_code.strip().upper(), custom_scores, session_id())
+                st.success(f"Added to live session {live_code.strip().upper()}.")
+            except KeyError:
+                st.warning(f"There is no live session with the code {live_code.strip().upper()}.")
+            except OSError:
+                st.warning("The live session service is not reachable right now.")
+        with span("sections") as sections_span:
+            # Held by the session resource manager, which may evict it to stay
+            # in budget; then every section is simply rebuilt
+            resources = get_session_resources()
+            memo = resources.get_or_create(session_id(), "section_memo", SectionMemo)
+            content, rebuilt = memo.resolve(report_sections(rubric), rubric, report)
+            if rebuilt:
+                resources.resize(session_id(), "section_memo", memo.nbytes())
+            sections_span.set(rebuilt=len(rebuilt))
 
         st.subheader("Your environment’s design profile")
 
-        scaff = custom_scores["Scaffolding"]
-        icap = custom_scores["ICAP engagement"]
-        feed = custom_scores["Feedback quality"]
-        collab = custom_scores["Collaboration"]
-        meta = custom_scores["Metacognitive support"]
-
         # -------- Summary line ABOVE chart -------- #
-        summary_line = (
-            f"**Summary:** {env_display_name} appears mostly **{icap_label(icap)}** "
-            f"with **{level_label(scaff)} scaffolding** and "
-            f"**{level_label(meta)} metacognitive support**."
-        )
-        st.markdown(summary_line)
+        st.markdown(content["summary"])
 
         # -------- Impact on learning -------- #
-        impact_parts = []
-
-        # ICAP impact
-        if icap <= 1:
-            impact_parts.append(
-                "students mainly receive information passively, so knowledge may remain inert and hard to transfer."
-            )
-        elif icap == 2:
-            impact_parts.append(
-                "students are active but not generative, so they may complete tasks without fully understanding underlying concepts."
-            )
-        elif icap == 4:
-            impact_parts.append(
-                "students engage constructively, which usually supports deeper understanding and integration of ideas."
-            )
-        else:
-            impact_parts.append(
-                "students engage interactively, which often supports co-construction of ideas and deeper learning."
-            )
-
-        # Scaffolding impact
-        if scaff <= 2:
-            impact_parts.append(
-                "Because scaffolding is low, struggling learners may not get enough adaptive support and can stay confused or fall behind."
-            )
-        elif scaff == 3:
-            impact_parts.append(
-                "With moderate scaffolding, some learners receive help, but support might not always be contingent or faded over time."
-            )
-        else:
-            impact_parts.append(
-                "High scaffolding can help keep learners in their zone of proximal development, as long as support is gradually faded to build independence."
-            )
-
-        # Metacognition impact
-        if meta <= 2:
-            impact_parts.append(
-                "Low metacognitive support means students have fewer opportunities to plan, monitor, and reflect, which can limit long-term self-regulation."
-            )
-        elif meta == 3:
-            impact_parts.append(
-                "Some metacognitive support is present, but making reflection more regular and strategy-focused could strengthen durable learning."
-            )
-        else:
-            impact_parts.append(
-                "Strong metacognitive support can help learners take more ownership of their learning and transfer strategies to new contexts."
-            )
-
-        impact_text = " ".join(impact_parts)
-
-        st.markdown(
-            f"**Impact on learning:** {capitalize_first(impact_text)}"
-        )
+        st.markdown(f"**Impact on learning:** {content['impact']}")
 
         st.markdown("---")
 
         # -------- Chart -------- #
-        fig2 = px.bar(
-            df_custom,
-            x="Design principle",
-            y="Score (1–5)",
-            range_y=[0, 5],
-            text="Score (1–5)",
-            color="Design principle",
-        )
-        fig2.update_traces(textposition="outside")
-        fig2.update_layout(showlegend=False)
-        st.plotly_chart(fig2, use_container_width=True)
+        show_profile(custom_scores, fig=content["chart"])
 
         # -------- Interpretation -------- #
         st.subheader("Interpretation")
         st.markdown("### Design principle details")
 
-        # ICAP explanation text for reuse
-        if icap <= 1:
-            icap_text = (
-                "Engagement is mostly **Passive** (ICAP: P). "
-                "Learners receive information but don’t manipulate or generate ideas."
-            )
-        elif icap == 2:
-            icap_text = (
-                "Engagement is mostly **Active** (ICAP: A). "
-                "Learners do tasks, but rarely generate new ideas."
-            )
-        elif icap == 4:
-            icap_text = (
-                "Engagement is mostly **Constructive** (ICAP: C). "
-                "Learners explain, justify, or create, which supports deeper learning."
+        for i, question in enumerate(rubric.questions):
+            if i:
+                st.markdown("")
+            st.markdown(content[f"details/{question.key}"])
+
+        st.markdown("### Similar environments")
+        st.markdown(similar_text(*similar))
+
+        # -------- Design improvement summary -------- #
+        st.markdown("---")
+        st.subheader("Design improvement summary")
+        st.write(content["improvements"])
+
+        # -------- Download button -------- #
+        download_text, download_json = content["downloads"]
+        with span("download"):
+            st.download_button(
+                label="Download this analysis",
+                data=download_text,
+                file_name="learning_environment_analysis.txt",
+                mime="text/plain",
             )
-        else:
-            icap_text = (
-                "Engagement is mostly **Interactive** (ICAP: I). "
-                "Learners co-construct ideas through dialogue and collaboration."
+            st.download_button(
+                label="Download as JSON",
+                data=download_json,
+                file_name="learning_environment_analysis.json",
+                mime="application/json",
             )
 
-        # Scaffolding
-        st.markdown(
-            f"**Scaffolding**  \n"
-            f"- Score: {scaff}/5 ({level_label(scaff).capitalize()})  \n"
-            f"{'• Low scaffolding. Consider adding more adaptive teacher or peer support.' if scaff <= 2 else ''}"
-            f"{'• Moderate scaffolding. You might make support more clearly contingent and plan for fading over time.' if scaff == 3 else ''}"
-            f"{'• Strong scaffolding. Support seems adaptive; consider planning how it fades to build independence.' if scaff >= 4 else ''}"
-        )
 
-        st.markdown("")
+# ---------- VIEW 3: HISTORY OF SAVED ANALYSES ---------- #
+def history_view():
+    import pandas as pd
 
-        # ICAP
-        st.markdown(
-            f"**ICAP engagement**  \n"
-            f"- Score: {icap}/5 ({icap_label(icap)})  \n"
-            f"• {icap_text}"
-        )
+    st.subheader("History of analyzed environments")
 
-        st.markdown("")
+    store = get_store()
+    ALL_COHORTS = "All cohorts"
+    cohort_choice = st.selectbox("Cohort:", [ALL_COHORTS, *store.cohorts()], key="history_cohort")
+    cohort_filter = None if cohort_choice == ALL_COHORTS else cohort_choice
 
-        # Feedback
-        st.markdown(
-            f"**Feedback quality**  \n"
-            f"- Score: {feed}/5 ({level_label(feed).capitalize()})  \n"
-            f"{'• Feedback is mostly evaluative. Adding explanations linked to misconceptions could deepen learning.' if feed <= 2 else ''}"
-            f"{'• Feedback is somewhat explanatory. You could align it more closely with specific errors or strategies.' if feed == 3 else ''}"
-            f"{'• Feedback appears highly diagnostic and explanatory, which is ideal for learning.' if feed >= 4 else ''}"
-        )
+    total = store.count(cohort_filter)
+    st.caption(f"{total:,} saved analyses")
 
-        st.markdown("")
+    if total:
+        # Keyset paging: remember the (created_at, id) cursor of each page start
+        cursors = st.session_state.setdefault("history_cursors", {})
+        page_starts = cursors.setdefault(cohort_choice, [None])
+        rows = store.page(cohort_filter, before=page_starts[-1], limit=HISTORY_PAGE_SIZE)
 
-        # Collaboration
-        st.markdown(
-            f"**Collaboration**  \n"
-            f"- Score: {collab}/5 ({level_label(collab).capitalize()})  \n"
-            f"{'• Mostly individual. Consider adding structured pair or group activities.' if collab <= 2 else ''}"
-            f"{'• Some collaboration. You might add roles, shared artifacts, or norms to deepen it.' if collab == 3 else ''}"
-            f"{'• Collaboration seems well integrated. Check that it supports real co-construction, not just dividing work.' if collab >= 4 else ''}"
-        )
+        history_df = pd.DataFrame(rows).drop(columns="id")
+        history_df["created_at"] = pd.to_datetime(history_df["created_at"], unit="s")
+        st.dataframe(history_df, hide_index=True, use_container_width=True)
 
-        st.markdown("")
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        if prev_col.button("← Newer", disabled=len(page_starts) == 1, key="history_prev"):
+            page_starts.pop()
+            st.rerun()
+        page_col.caption(f"Page {len(page_starts)}")
+        if next_col.button("Older →", disabled=len(rows) < HISTORY_PAGE_SIZE, key="history_next"):
+            page_starts.append((rows[-1]["created_at"], rows[-1]["id"]))
+            st.rerun()
 
-        # Metacognition
-        st.markdown(
-            f"**Metacognitive support**  \n"
-            f"- Score: {meta}/5 ({level_label(meta).capitalize()})  \n"
-            f"{'• Little or no metacognition. You could add prompts to plan, monitor, or reflect on learning.' if meta <= 2 else ''}"
-            f"{'• Some reflection. Making it more regular and tied to strategies could help.' if meta == 3 else ''}"
-            f"{'• Strong metacognitive support. Learners are regularly guided to reflect and self-regulate.' if meta >= 4 else ''}"
+        st.markdown("### Mean profile per cohort")
+        means = store.mean_profiles()
+        means_df = pd.DataFrame(
+            [
+                {"Cohort": c or "(none)", "Analyses": n, **{p: round(m[p], 2) for p in PRINCIPLES}}
+                for c, (n, m) in means.items()
+            ]
         )
+        st.dataframe(means_df, hide_index=True, use_container_width=True)
+        if cohort_filter is not None and cohort_filter in means:
+            show_profile({p: round(v, 2) for p, v in means[cohort_filter][1].items()})
 
-        # For download text, reconstruct a compact interpretation string
-        interpretation_text = (
-            "Scaffolding:\n"
-            f"- Score: {scaff}/5 ({level_label(scaff)})\n"
-            "ICAP engagement:\n"
-            f"- Score: {icap}/5 ({icap_label(icap)})\n"
-            f"- {icap_text}\n"
-            "Feedback quality:\n"
-            f"- Score: {feed}/5 ({level_label(feed)})\n"
-            "Collaboration:\n"
-            f"- Score: {collab}/5 ({level_label(collab)})\n"
-            "Metacognitive support:\n"
-            f"- Score: {meta}/5 ({level_label(meta)})\n"
-        )
+        st.markdown("### Score distribution per principle")
+        distribution = store.distribution(cohort_filter)
+        dist_df = pd.DataFrame(distribution).fillna(0).astype(int).sort_index()
+        dist_df.index.name = "Score"
+        st.bar_chart(dist_df, stack=False)
+    else:
+        st.info("No analyses saved yet. Results from the “Analyze your own environment” tab appear here.")
 
-        # -------- Design improvement summary -------- #
-        st.markdown("---")
-        st.subheader("Design improvement summary")
 
-        improvements = []
+# ---------- VIEW 4: COMPARE ENVIRONMENTS ---------- #
+def compare_view():
+    import numpy as np
 
-        if scaff <= 2:
-            improvements.append(
-                "Increase **adaptive scaffolding** (teacher, peers, or tools) that responds to learner difficulty."
-            )
-        if icap <= 2:
-            improvements.append(
-                "Redesign tasks so learners must **explain, justify, or create**, moving beyond simple completion."
-            )
-        if collab <= 2:
-            improvements.append(
-                "Add **structured collaboration** (pairs/groups with roles and shared artifacts)."
-            )
-        if meta <= 2:
-            improvements.append(
-                "Embed regular **metacognitive prompts** (plan, monitor, reflect on strategies and understanding)."
-            )
-        if feed <= 2:
-            improvements.append(
-                "Shift feedback from right/wrong toward **diagnostic explanations** linked to misconceptions."
-            )
+    from compare import difference_table, for_display, grouped_bar_figure, radar_figure, score_matrix, stack
 
-        if not improvements:
-            improvements.append(
-                "This environment already reflects many strong design principles. Future work could focus on fine-tuning "
-                "task design and alignment across scaffolding, collaboration, and metacognition."
+    st.subheader("Compare environments")
+
+    preset_names = st.multiselect(
+        "Preset environments:", list(ENVIRONMENTS.keys()), default=list(ENVIRONMENTS.keys())
+    )
+    saved_count = st.number_input(
+        "Latest saved analyses to include:", min_value=0, max_value=5000, value=0, step=10
+    )
+    upload = st.file_uploader(
+        "Or upload a batch (CSV/Parquet with q1–q5 answers or one column per principle):",
+        type=["csv", "parquet"],
+        key="compare_upload",
+    )
+    upload = hold_upload(upload, "compare_upload")
+
+    uploaded = ([], [])
+    if upload is not None:
+        try:
+            uploaded = uploaded_table(upload.getvalue(), upload.name).as_block()
+        except (KeyError, ValueError) as exc:
+            st.error(f"Could not read {upload.name}: {exc}")
+
+    saved_rows = get_store().page(limit=saved_count) if saved_count else []
+    names, matrix = stack(
+        score_matrix({name: ENVIRONMENTS[name] for name in preset_names}),
+        (
+            [f"{r['env_name']} #{r['id']}" for r in saved_rows],
+            np.array([[r[p] for p in PRINCIPLES] for r in saved_rows]).reshape(-1, len(PRINCIPLES)),
+        ),
+        uploaded,
+    )
+
+    if len(names) < 2:
+        st.info("Select at least two environments to compare.")
+    else:
+        labels, shown, summarized = for_display(names, matrix)
+        if summarized:
+            st.caption(
+                f"{len(names):,} environments selected – charts show the quantile profiles "
+                "(10th, 25th, 50th, 75th, 90th percentile and mean) across all of them."
             )
+        st.plotly_chart(grouped_bar_figure(labels, shown), use_container_width=True)
+        st.plotly_chart(radar_figure(labels, shown), use_container_width=True)
+
+        st.markdown("### Differences from a reference environment")
+        reference = st.selectbox(
+            "Reference:",
+            range(min(len(names), MAX_TABLE_ROWS)),
+            format_func=lambda i: names[i],
+            key="compare_reference",
+        )
+        diff = difference_table(names, matrix, reference)
+        if len(diff) > MAX_TABLE_ROWS:
+            st.caption(f"Showing the {MAX_TABLE_ROWS:,} environments furthest from the reference.")
+            diff = diff.nlargest(MAX_TABLE_ROWS, "Distance")
+        st.dataframe(diff.round(2), use_container_width=True)
 
-        improvement_paragraph = " ".join(improvements)
-        st.write(improvement_paragraph)
 
-        # -------- Download button -------- #
-        impact_for_download = capitalize_first(impact_text)
-
-        download_text = (
-            f"Learning Environment Analysis – {env_display_name}\n\n"
-            f"Scaffolding: {scaff}/5 ({level_label(scaff)})\n"
-            f"ICAP engagement: {icap}/5 ({icap_label(icap)})\n"
-            f"Feedback quality: {feed}/5 ({level_label(feed)})\n"
-            f"Collaboration: {collab}/5 ({level_label(collab)})\n"
-            f"Metacognitive support: {meta}/5 ({level_label(meta)})\n\n"
-            f"Summary:\n{summary_line}\n\n"
-            f"Impact on learning:\n{impact_for_download}\n\n"
-            "Interpretation:\n"
-            f"{interpretation_text}\n\n"
-            "Design improvement summary:\n"
-            f"{improvement_paragraph}\n"
+# ---------- VIEW 5: COHORT STATISTICS ---------- #
+def cohorts_view():
+    import pandas as pd
+
+    from cohort_stats import by_cohort, describe_change
+
+    st.subheader("Cohort statistics")
+
+    source = st.radio("Analyses:", ["Saved history", "Upload"], horizontal=True, key="cohorts_source")
+    if source == "Upload":
+        upload = st.file_uploader(
+            "CSV/Parquet with q1–q5 answers or one column per principle, and a `cohort` column:",
+            type=["csv", "parquet"],
+            key="cohorts_upload",
         )
+        upload = hold_upload(upload, "cohorts_upload")
+        if upload is None:
+            return
+        try:
+            table = uploaded_table(upload.getvalue(), upload.name)
+        except (KeyError, ValueError) as exc:
+            st.error(f"Could not read {upload.name}: {exc}")
+            return
+    else:
+        table = saved_table()
+    if not len(table):
+        st.info("No analyses yet. Save some from the “Analyze your own environment” tab or upload a batch.")
+        return
+
+    ALL_COHORTS = "All analyses"
+    groups = {ALL_COHORTS: table}
+    cohorts = sorted(by_cohort(table).items(), key=lambda item: (item[0] == "", item[0]))
+    groups.update((name or "(no cohort)", rows) for name, rows in cohorts if len(rows))
+    resamples = st.select_slider("Bootstrap resamples:", [1000, 2000, 5000, 10000], value=2000, key="cohorts_resamples")
+
+    choice = st.selectbox("Cohort:", list(groups), key="cohorts_choice")
+    with st.spinner("Resampling…"):
+        stats = cohort_statistics(groups[choice], resamples)
+    ci = f"{stats.confidence:.0%} CI"
+    st.caption(f"{stats.n:,} analyses · {ci}s from {stats.resamples:,} bootstrap resamples")
+
+    means = {p: round(e.value, 2) for p, e in stats.means.items()}
+    fig = None
+    if CHART_MODE == "plotly":
+        fig = profile_figure(profile_frame(means, {p: (e.low, e.high) for p, e in stats.means.items()}))
+    show_profile(means, fig)
+    st.dataframe(
+        pd.DataFrame(
+            [{"Principle": p, "Mean": e.value, f"{ci} low": e.low, f"{ci} high": e.high} for p, e in stats.means.items()]
+        ).round(2),
+        hide_index=True,
+        use_container_width=True,
+    )
 
-        st.download_button(
-            label="Download this analysis",
-            data=download_text,
-            file_name="learning_environment_analysis.txt",
-            mime="text/plain",
+    st.markdown("### Score distribution per principle")
+    dist_df = pd.DataFrame(stats.distribution, columns=PRINCIPLES)
+    dist_df.index.name = "Score"
+    st.bar_chart(dist_df, stack=False)
+
+    st.markdown("### Correlations between principles")
+    st.dataframe(pd.DataFrame(stats.correlations, index=PRINCIPLES, columns=PRINCIPLES).round(2))
+    pairs = [(i, j) for i in range(len(PRINCIPLES)) for j in range(i + 1, len(PRINCIPLES))]
+    with st.expander(f"{ci}s of the correlations"):
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "Principles": f"{PRINCIPLES[i]} ~ {PRINCIPLES[j]}",
+                        "r": stats.correlations[i, j],
+                        f"{ci} low": stats.correlation_low[i, j],
+                        f"{ci} high": stats.correlation_high[i, j],
+                    }
+                    for i, j in pairs
+                ]
+            ).round(2),
+            hide_index=True,
+            use_container_width=True,
         )
 
+    if len(groups) > 2:
+        st.markdown("### Change between cohorts")
+        names = [name for name in groups if name != ALL_COHORTS]
+        left, right = st.columns(2)
+        before = left.selectbox("From:", names, index=0, key="cohorts_before")
+        after = right.selectbox("To:", names, index=min(1, len(names) - 1), key="cohorts_after")
+        if before != after:
+            with st.spinner("Resampling…"):
+                change = cohort_comparison(groups[before], groups[after], resamples)
+                before_stats = cohort_statistics(groups[before], resamples)
+                after_stats = cohort_statistics(groups[after], resamples)
+            for p in PRINCIPLES:
+                st.markdown(
+                    "- "
+                    + describe_change(
+                        p, before_stats.means[p], after_stats.means[p], change.means[p], change.confidence, (before, after)
+                    )
+                )
+
+
+# ---------- VIEW 6: LIVE CLASS SESSION ---------- #
+@st.fragment(run_every=PUBLISH_INTERVAL)
+def live_dashboard(code):
+    # Reruns on its own once per publish interval and only reads the latest
+    # snapshot, so its cost doesn't depend on how often students submit
+    import pandas as pd
+
+    try:
+        snapshot = get_live_hub().latest(code)
+    except KeyError:
+        st.warning(f"Live session {code} has ended.")
+        return
+    except OSError:
+        st.warning("The live session service is not reachable right now; retrying…")
+        return
+    st.metric("Students", f"{snapshot.n:,}")
+    if not snapshot.n:
+        st.info("Waiting for the first submission…")
+        return
+    show_profile(snapshot.means())
+    dist_df = pd.DataFrame(snapshot.distribution()).sort_index()
+    dist_df.index.name = "Score"
+    st.bar_chart(dist_df, stack=False)
+
+
+def live_view():
+    st.subheader("Live class session")
+    hub = get_live_hub()
+    code = st.session_state.get("live_session")
+
+    if code is None:
+        st.write(
+            "Start a session and share its code. Students enter it in the “Analyze your own "
+            "environment” form, and the class-wide profile below updates about once a second."
+        )
+        title = st.text_input("Session title (optional):", key="live_title")
+        if st.button("Start a live session", key="live_start"):
+            try:
+                st.session_state["live_session"] = hub.open(title)
+            except OSError:
+                st.error("The live session service is not reachable right now.")
+            else:
+                st.rerun()
+        watch = st.text_input("Or watch a running session (code):", key="live_watch")
+        if st.button("Watch", key="live_watch_button", disabled=not watch.strip()):
+            st.session_state["live_session"] = watch.strip().upper()
+            st.rerun()
+        return
+
+    st.markdown(f"Session code: **{code}** · students can also open this app with `?live={code}`")
+    live_dashboard(code)
+    if st.button("Leave session", key="live_leave"):
+        del st.session_state["live_session"]
+        st.rerun()
+
+
+# ---------- DIAGNOSTICS (?stats) ---------- #
+def _process_rss():
+    # Resident memory of this process in bytes (Linux), or None
+    import os
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def session_memory_stats():
+    from streamlit import runtime
+
+    usage = get_session_resources().usage()
+    mb = 2**20
+    st.markdown("**Session memory (this process)**")
+    held, rss = st.columns(2)
+    held.metric(
+        "Held by sessions",
+        f"{usage['total'] / mb:.1f} MB",
+        f"budget {usage['global_budget'] / mb:,.0f} MB · {usage['session_budget'] / mb:,.0f} MB per session",
+        delta_color="off",
+    )
+    rss_bytes = _process_rss()
+    uploads = (
+        sum(stat.byte_length for stat in runtime.get_instance().uploaded_file_mgr.get_stats())
+        if runtime.exists()
+        else 0
+    )
+    rss.metric(
+        "Process memory",
+        f"{rss_bytes / mb:.0f} MB" if rss_bytes else "n/a",
+        f"{uploads / mb:.1f} MB in uploaded files",
+        delta_color="off",
+    )
+    st.caption(
+        f"{len(usage['sessions'])} sessions tracked · evicted "
+        + (
+            ", ".join(
+                f"{n:,} for {reason} ({usage['evicted_bytes'][reason] / mb:.1f} MB)"
+                for reason, n in sorted(usage["evictions"].items())
+            )
+            or "nothing yet"
+        )
+    )
+    if usage["sessions"]:
+        st.table(
+            [
+                {
+                    "Session": row["session"][:8],
+                    "Held (MB)": round(row["bytes"] / mb, 2),
+                    "Entries": row["entries"],
+                    "Idle (s)": round(row["idle_s"]),
+                }
+                for row in usage["sessions"][:20]
+            ]
+        )
+
+
+VIEWS = {
+    "Tang et al. (2025) scenarios": presets_view,
+    "Analyze your own environment": custom_view,
+    "History": history_view,
+    "Compare": compare_view,
+    "Cohorts": cohorts_view,
+    "Live session": live_view,
+}
+
+view = st.segmented_control(
+    "View",
+    list(VIEWS),
+    default=next(iter(VIEWS)),
+    required=True,
+    key="view",
+    label_visibility="collapsed",
+)
+get_session_resources().touch(session_id())
+with span("rerun", session=session_id() if get_telemetry() else "", view=view):
+    VIEWS[view]()
+
 st.markdown("---")
 st.caption(
     "This tool is inspired by Learning Sciences frameworks: Tabak & Reiser (scaffolding), "
     "Chi (ICAP), Winne & Azevedo (metacognition), and Tang et al. (2025) on GenAI-assisted teaching."
 )
 
+if "stats" in st.query_params:
+    with st.expander("Cache statistics", expanded=True):
+        for m in all_cache_metrics():
+            st.metric(
+                m["name"],
+                f"{m['hit_rate']:.1%} hits",
+                f"{m['calls']} lookups / {m['misses']} builds",
+                delta_color="off",
+            )
+        if get_telemetry():
+            st.markdown("**Stage timings (this process)**")
+            st.table(
+                [
+                    {"Stage": name, "Runs": n, "Mean (ms)": round(mean * 1000, 2)}
+                    for name, (n, mean) in sorted(get_telemetry().summary().items())
+                ]
+            )
+        session_memory_stats()
+
 with st.expander("References (APA)"):
     st.markdown(
         """
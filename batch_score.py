@@ -0,0 +1,46 @@
+"""Score a survey export from the command line.
+
+    python batch_score.py survey.csv scored.parquet --chunksize 100000
+
+Each input row is one environment with its five answers in the columns
+``q1``..``q5`` (override with ``--columns``). The output keeps the input
+columns (or only those named with ``--keep``) and appends one score column
+per design principle.
+"""
+import argparse
+import sys
+import time
+
+from scoring import ANSWER_COLUMNS, score_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score learning environment surveys.")
+    parser.add_argument("src", help="input .csv or .parquet file")
+    parser.add_argument("dst", help="output .csv or .parquet file")
+    parser.add_argument(
+        "--columns",
+        nargs=5,
+        default=ANSWER_COLUMNS,
+        metavar="COL",
+        help="answer columns for questions 1-5 (default: q1 q2 q3 q4 q5)",
+    )
+    parser.add_argument(
+        "--keep",
+        nargs="*",
+        default=None,
+        metavar="COL",
+        help="input columns to copy to the output (default: all)",
+    )
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per chunk")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = score_file(args.src, args.dst, args.chunksize, args.columns, args.keep)
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else float("inf")
+    print(f"Scored {rows:,} environments in {elapsed:.2f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
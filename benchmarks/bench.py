@@ -0,0 +1,207 @@
+"""Benchmarks for the scoring, report, chart and full-rerun paths.
+
+    python benchmarks/bench.py                                  # run and print
+    python benchmarks/bench.py --save benchmarks/baseline.json  # record a baseline
+    python benchmarks/bench.py --compare benchmarks/baseline.json
+
+Per-submit cases time one operation many times; batch cases time a whole
+synthetic batch of 1 to 1,000,000 environments per round. Each case reports
+p50/p95/p99 latency in milliseconds and the peak Python heap (tracemalloc,
+measured in a separate untimed run so it doesn't skew the timings).
+``--compare`` fails with exit code 1 when a case's p50 is more than
+``--tolerance`` slower than the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep the full-rerun case from writing into the real history database
+os.environ.setdefault("LEA_STORE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import pandas as pd  # noqa: E402
+
+from charts import profile_figure, profile_frame  # noqa: E402
+from report import compile_report, precompile, render_report  # noqa: E402
+from rubric import load_rubric  # noqa: E402
+from scoring import ANSWER_COLUMNS, score_answers, score_frame, score_options  # noqa: E402
+
+DEFAULT_SIZES = [1, 100, 10_000, 1_000_000]
+
+
+# --------- synthetic data --------- #
+def synthetic_options(n, seed=0):
+    """(n, 5) option indices drawn uniformly per question."""
+    rng = np.random.default_rng(seed)
+    rubric = load_rubric()
+    return np.column_stack([rng.integers(0, len(q.options), n) for q in rubric.questions])
+
+
+def synthetic_answers(n, seed=0):
+    """DataFrame of n survey rows with answer texts in q1..q5."""
+    rubric = load_rubric()
+    options = synthetic_options(n, seed)
+    return pd.DataFrame(
+        {
+            col: np.asarray(q.options, dtype=object)[options[:, i]]
+            for i, (col, q) in enumerate(zip(ANSWER_COLUMNS, rubric.questions))
+        }
+    )
+
+
+def synthetic_scores(n, seed=0):
+    rubric = load_rubric()
+    options = synthetic_options(n, seed)
+    return np.column_stack([q.scores[options[:, i]] for i, q in enumerate(rubric.questions)])
+
+
+# --------- timing --------- #
+def percentiles(samples_ms):
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(statistics.fmean(samples_ms), 4),
+        "samples": len(samples_ms),
+    }
+
+
+def measure(fn, repeat, setup=None):
+    """Time ``fn`` ``repeat`` times, then once more under tracemalloc."""
+    samples = []
+    for i in range(repeat):
+        arg = setup(i) if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    result = percentiles(samples)
+
+    arg = setup(0) if setup else None
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["peak_kb"] = round(peak / 1024, 1)
+    return result
+
+
+# --------- cases --------- #
+def per_submit_cases(repeat):
+    rubric = load_rubric()
+    precompile(rubric)
+    options = synthetic_options(repeat)
+    texts = synthetic_answers(repeat).to_numpy()
+    scores = [score_options(row, rubric) for row in options]
+
+    yield "submit/score_answers_text", measure(lambda a: score_answers(*a), repeat, lambda i: texts[i])
+    yield "submit/score_options", measure(lambda a: score_options(a, rubric), repeat, lambda i: options[i])
+    yield "submit/report_compile", measure(lambda s: compile_report(s.values(), rubric), repeat, lambda i: scores[i])
+    yield "submit/report_render", measure(lambda s: render_report(s, "Lab", rubric), repeat, lambda i: scores[i])
+    yield "submit/download_text", measure(
+        lambda s: render_report(s, "Lab", rubric).download_text.encode("utf-8"), repeat, lambda i: scores[i]
+    )
+    yield "submit/profile_figure", measure(
+        lambda s: profile_figure(profile_frame(s)), max(repeat // 10, 10), lambda i: scores[i]
+    )
+
+
+def batch_cases(sizes, rounds):
+    for n in sizes:
+        answers = synthetic_answers(n)
+        yield f"batch/score_frame/{n}", measure(lambda df: score_frame(df), rounds, lambda i: answers)
+        del answers
+
+        # Rendering is per environment, so cap it to keep the suite's runtime sane
+        if n <= 100_000:
+            rows = [tuple(r) for r in synthetic_scores(n).tolist()]
+            yield f"batch/render_report/{n}", measure(
+                lambda rs: [render_report(r).download_text for r in rs], rounds, lambda i: rows
+            )
+
+
+def apptest_cases(repeat):
+    from streamlit.testing.v1 import AppTest
+
+    app = os.path.join(ROOT, "app.py")
+
+    def rerun(_):
+        AppTest.from_file(app, default_timeout=60).run()
+
+    def submit(_):
+        at = AppTest.from_file(app, default_timeout=60).run()
+        at.segmented_control(key="view").set_value("Analyze your own environment").run()
+        next(b for b in at.button if b.label.startswith("Analyze")).click().run()
+
+    yield "apptest/initial_run", measure(rerun, repeat)
+    yield "apptest/submit", measure(submit, repeat)
+
+
+# --------- baseline handling --------- #
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old or not old["p50_ms"]:
+            continue
+        ratio = current["p50_ms"] / old["p50_ms"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:40s} {old['p50_ms']:>10.4f} -> {current['p50_ms']:>10.4f} ms  x{ratio:5.2f} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scoring, rendering and export paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="batch sizes")
+    parser.add_argument("--repeat", type=int, default=1000, help="iterations for per-submit cases")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds for batch cases")
+    parser.add_argument("--apptest-repeat", type=int, default=10, help="iterations for AppTest cases (0 to skip)")
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    cases = [per_submit_cases(args.repeat), batch_cases(args.sizes, args.rounds)]
+    if args.apptest_repeat:
+        cases.append(apptest_cases(args.apptest_repeat))
+
+    results = {}
+    for group in cases:
+        for name, result in group:
+            results[name] = result
+            print(
+                f"{name:40s} p50 {result['p50_ms']:>10.4f}  p95 {result['p95_ms']:>10.4f}  "
+                f"p99 {result['p99_ms']:>10.4f} ms  peak {result['peak_kb']:>10.1f} KB"
+            )
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
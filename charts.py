@@ -0,0 +1,133 @@
+"""Design-principle profile tables and figures.
+
+Besides the interactive plotly figure, the profile can be drawn as a static
+SVG (cached per score tuple) or as a small Vega-Lite spec, both styled after
+the ``px.bar`` chart so the modes look alike. pandas and plotly are imported
+on first use, so the static modes never load them.
+"""
+from functools import lru_cache
+from html import escape
+
+SCORE_LABEL = "Score (1–5)"
+ERROR_MINUS = "Below"
+ERROR_PLUS = "Above"
+
+# plotly's default qualitative colors, in the order px.bar assigns them
+PALETTE = ["#636EFA", "#EF553B", "#00CC96", "#AB63FA", "#FFA15A"]
+PLOT_BG = "#E5ECF6"
+GRID = "#FFFFFF"
+TEXT = "#2A3F5F"
+
+
+def profile_frame(scores, intervals=None):
+    """Two-column table (principle, score) for one score dict.
+
+    ``intervals`` ({principle: (low, high)}, e.g. confidence intervals of
+    cohort means) adds the error-bar columns profile_figure draws.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(
+        {
+            "Design principle": list(scores.keys()),
+            SCORE_LABEL: list(scores.values()),
+        }
+    )
+    if intervals is not None:
+        df[ERROR_MINUS] = [scores[p] - intervals[p][0] for p in scores]
+        df[ERROR_PLUS] = [intervals[p][1] - scores[p] for p in scores]
+    return df
+
+
+def profile_figure(df):
+    """Bar chart of one environment's design-principle profile."""
+    # plotly.express is the single most expensive import here, so it is only
+    # loaded once a plotly chart is actually drawn
+    import plotly.express as px
+
+    errors = {"error_y": ERROR_PLUS, "error_y_minus": ERROR_MINUS} if ERROR_PLUS in df.columns else {}
+    fig = px.bar(
+        df,
+        x="Design principle",
+        y=SCORE_LABEL,
+        range_y=[0, 5],
+        text=SCORE_LABEL,
+        color="Design principle",
+        **errors,
+    )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(showlegend=False)
+    return fig
+
+
+@lru_cache(maxsize=1024)
+def profile_svg(principles, scores, width=700, height=450):
+    """Static SVG bar chart for a (principles, scores) pair of tuples."""
+    left, right, top, bottom = 60, 20, 30, 70
+    plot_w, plot_h = width - left - right, height - top - bottom
+    step = plot_w / len(principles)
+    bar_w = step * 0.8
+
+    def y(value):
+        return top + plot_h - plot_h * value / 5
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'width="100%" role="img" font-family="Open Sans, verdana, arial, sans-serif" '
+        f'font-size="12" fill="{TEXT}">',
+        f'<rect x="{left}" y="{top}" width="{plot_w}" height="{plot_h}" fill="{PLOT_BG}"/>',
+    ]
+    for tick in range(6):
+        parts.append(
+            f'<line x1="{left}" x2="{left + plot_w}" y1="{y(tick):.1f}" y2="{y(tick):.1f}" stroke="{GRID}"/>'
+            f'<text x="{left - 8}" y="{y(tick) + 4:.1f}" text-anchor="end">{tick}</text>'
+        )
+    for i, (principle, score) in enumerate(zip(principles, scores)):
+        x = left + i * step + (step - bar_w) / 2
+        cx = x + bar_w / 2
+        parts.append(
+            f'<rect x="{x:.1f}" y="{y(score):.1f}" width="{bar_w:.1f}" '
+            f'height="{y(0) - y(score):.1f}" fill="{PALETTE[i % len(PALETTE)]}"/>'
+            f'<text x="{cx:.1f}" y="{y(score) - 6:.1f}" text-anchor="middle">{score}</text>'
+            f'<text x="{cx:.1f}" y="{top + plot_h + 20}" text-anchor="middle">{escape(principle)}</text>'
+        )
+    parts.append(
+        f'<text x="{left + plot_w / 2}" y="{height - 20}" text-anchor="middle" font-size="14">Design principle</text>'
+        f'<text transform="translate(18 {top + plot_h / 2}) rotate(-90)" text-anchor="middle" '
+        f'font-size="14">{SCORE_LABEL}</text>'
+        "</svg>"
+    )
+    return "".join(parts)
+
+
+def profile_vega_spec(scores):
+    """Vega-Lite spec for one score dict, matching the px.bar profile."""
+    principles = list(scores.keys())
+    return {
+        "data": {
+            "values": [
+                {"Design principle": p, SCORE_LABEL: s} for p, s in scores.items()
+            ]
+        },
+        "encoding": {
+            "x": {"field": "Design principle", "type": "nominal", "sort": principles, "axis": {"labelAngle": 0}},
+            "y": {"field": SCORE_LABEL, "type": "quantitative", "scale": {"domain": [0, 5]}},
+        },
+        "layer": [
+            {
+                "mark": "bar",
+                "encoding": {
+                    "color": {
+                        "field": "Design principle",
+                        "type": "nominal",
+                        "scale": {"domain": principles, "range": PALETTE[: len(principles)]},
+                        "legend": None,
+                    }
+                },
+            },
+            {
+                "mark": {"type": "text", "dy": -8},
+                "encoding": {"text": {"field": SCORE_LABEL, "type": "quantitative"}},
+            },
+        ],
+    }
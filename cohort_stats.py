@@ -0,0 +1,192 @@
+"""Cohort-level statistics with bootstrap confidence intervals.
+
+    stats = cohort_stats(table)                   # table: a score_table.ScoreTable
+    stats.means["ICAP engagement"]                # Estimate(value=3.4, low=3.31, high=3.49)
+    compare_cohorts(before, after).means[...]     # difference of means, with its CI
+
+Per-principle means, score distributions and the correlations between
+principles, with percentile bootstrap CIs over thousands of resamples.
+
+A cohort's rows only take 6^5 = 7,776 distinct score vectors, so the
+bootstrap works on the cohort's *cells*: the distinct score vectors it
+contains and how often each occurs. Resampling n rows with replacement is the
+same as drawing the cells' counts from a multinomial with n trials, and the
+means and (co)variances of a resample are its counts times fixed per-cell
+matrices. So every resample is a row of one multinomial draw and one matrix
+product, with no Python loop over resamples, and the cost depends on the
+number of occupied cells (at most 7,776), not on the cohort size.
+
+Resamples are drawn in fixed-size chunks, each from its own seeded
+generator, and the chunks run on a thread pool (NumPy releases the GIL in
+both steps). The result for a given ``seed`` is the same for any number of
+workers.
+"""
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from rubric import MAX_SCORE, PRINCIPLES
+
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+CHUNK = 256
+# Below this many (resample, cell) pairs a thread pool costs more than it saves
+PARALLEL_MIN_WORK = 2_000_000
+
+_BASE = MAX_SCORE + 1
+_PAIRS = [(i, j) for i in range(len(PRINCIPLES)) for j in range(len(PRINCIPLES))]
+
+
+class Estimate(NamedTuple):
+    value: float
+    low: float
+    high: float
+
+
+class CohortStats(NamedTuple):
+    n: int
+    means: dict  # {principle: Estimate}
+    distribution: np.ndarray  # (MAX_SCORE + 1, 5) counts, rows are scores
+    correlations: np.ndarray  # (5, 5) Pearson r; NaN where a principle doesn't vary
+    correlation_low: np.ndarray
+    correlation_high: np.ndarray
+    resamples: int
+    confidence: float
+
+
+class CohortComparison(NamedTuple):
+    n: tuple  # (n_a, n_b)
+    means: dict  # {principle: Estimate of mean_b - mean_a}
+    resamples: int
+    confidence: float
+
+
+def cells(table):
+    """(values, counts): the distinct score vectors of ``table`` and how often each occurs.
+
+    ``values`` is a (k, 5) float64 array, ``counts`` a (k,) int64 array.
+    """
+    codes = np.zeros(len(table), dtype=np.int64)
+    for column in table.scores:
+        codes = codes * _BASE + column
+    occupied, counts = np.unique(codes, return_counts=True)
+    values = np.empty((len(occupied), len(PRINCIPLES)))
+    rest = occupied
+    for i in reversed(range(len(PRINCIPLES))):
+        rest, values[:, i] = np.divmod(rest, _BASE)
+    return values, counts
+
+
+def _moments(weights, values, n):
+    """Means (b, 5) and covariances (b, 5, 5) of ``b`` weightings of the cells."""
+    means = weights @ values / n
+    products = values[:, [i for i, _ in _PAIRS]] * values[:, [j for _, j in _PAIRS]]
+    second = (weights @ products / n).reshape(-1, len(PRINCIPLES), len(PRINCIPLES))
+    return means, second - means[:, :, None] * means[:, None, :]
+
+
+def _correlations(cov):
+    sd = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cov / (sd[..., :, None] * sd[..., None, :])
+    return np.clip(r, -1.0, 1.0)
+
+
+def _resample_chunk(values, counts, size, seed):
+    n = int(counts.sum())
+    weights = np.random.default_rng(seed).multinomial(n, counts / n, size=size).astype(np.float64)
+    return _moments(weights, values, n)
+
+
+def bootstrap_moments(values, counts, resamples=RESAMPLES, seed=0, workers=None, chunk=CHUNK):
+    """Means (resamples, 5) and covariances (resamples, 5, 5) of bootstrap resamples."""
+    sizes = [min(chunk, resamples - start) for start in range(0, resamples, chunk)]
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(len(sizes))
+    workers = workers or os.cpu_count() or 1
+    jobs = [(values, counts, size, s) for size, s in zip(sizes, seeds)]
+    if workers > 1 and len(sizes) > 1 and resamples * len(counts) >= PARALLEL_MIN_WORK:
+        with ThreadPoolExecutor(min(workers, len(sizes))) as pool:
+            parts = list(pool.map(lambda job: _resample_chunk(*job), jobs))
+    else:
+        parts = [_resample_chunk(*job) for job in jobs]
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def _interval(samples, confidence):
+    tail = (1 - confidence) / 2 * 100
+    with warnings.catch_warnings():
+        # Correlations of a principle that never varies are all NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+
+
+def cohort_stats(table, resamples=RESAMPLES, confidence=CONFIDENCE, seed=0, workers=None):
+    """Means, distribution and correlations of ``table``, with bootstrap CIs."""
+    distribution = table.distribution()
+    if not len(table):
+        nan = np.full((len(PRINCIPLES), len(PRINCIPLES)), np.nan)
+        empty = Estimate(np.nan, np.nan, np.nan)
+        return CohortStats(0, dict.fromkeys(PRINCIPLES, empty), distribution, nan, nan, nan, resamples, confidence)
+
+    values, counts = cells(table)
+    n = int(counts.sum())
+    means, cov = _moments(counts[None, :].astype(np.float64), values, n)
+    boot_means, boot_cov = bootstrap_moments(values, counts, resamples, seed, workers)
+    mean_low, mean_high = _interval(boot_means, confidence)
+    r_low, r_high = _interval(_correlations(boot_cov), confidence)
+    return CohortStats(
+        n,
+        {p: Estimate(float(means[0, i]), float(mean_low[i]), float(mean_high[i])) for i, p in enumerate(PRINCIPLES)},
+        distribution,
+        _correlations(cov[0]),
+        r_low,
+        r_high,
+        resamples,
+        confidence,
+    )
+
+
+def compare_cohorts(a, b, resamples=RESAMPLES, confidence=CONFIDENCE, seed=0, workers=None):
+    """Difference of means (``b`` minus ``a``) per principle, with bootstrap CIs.
+
+    The two cohorts are resampled independently.
+    """
+    if not len(a) or not len(b):
+        raise ValueError("Both cohorts need at least one analysis")
+    seeds = np.random.SeedSequence(seed).spawn(2)
+    boot = []
+    for table, s in zip((a, b), seeds):
+        values, counts = cells(table)
+        boot.append(bootstrap_moments(values, counts, resamples, s, workers)[0])
+    diff = boot[1] - boot[0]
+    low, high = _interval(diff, confidence)
+    # Exact means (mean_profile rounds for display)
+    change = b.scores.mean(axis=1) - a.scores.mean(axis=1)
+    return CohortComparison(
+        (len(a), len(b)),
+        {p: Estimate(float(change[i]), float(low[i]), float(high[i])) for i, p in enumerate(PRINCIPLES)},
+        resamples,
+        confidence,
+    )
+
+
+def by_cohort(table):
+    """{cohort: rows of ``table`` in that cohort}, in dictionary order."""
+    return {name: table.cohort(name) for name in table.cohorts}
+
+
+def describe_change(principle, before, after, change, confidence=CONFIDENCE, labels=("before", "after")):
+    """A sentence like "Mean ICAP engagement rose from 2.10 in fall to 3.40 in spring (+1.30, 95% CI [+1.21, +1.39])."."""
+    interval = f"{confidence:.0%} CI [{change.low:+.2f}, {change.high:+.2f}]"
+    if round(change.value, 2) == 0:
+        return f"Mean {principle} stayed at {after.value:.2f} from {labels[0]} to {labels[1]} ({interval})."
+    verb = "rose" if change.value > 0 else "fell"
+    return (
+        f"Mean {principle} {verb} from {before.value:.2f} in {labels[0]} to {after.value:.2f} in {labels[1]} "
+        f"({change.value:+.2f}, {interval})."
+    )
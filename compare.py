@@ -0,0 +1,124 @@
+"""Side-by-side comparison of many environments.
+
+Everything works on one wide score matrix (one row per environment, one
+column per design principle) instead of a DataFrame per environment. When
+more environments are selected than a chart can show legibly, the charts
+switch to a quantile summary of the matrix (mean, median and the 10/25/75/90
+percentile profiles), which costs the same to draw for 20 rows or 200,000.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from score_table import ScoreTable
+from scoring import PRINCIPLES, score_frame
+
+# Above this many environments the charts show a quantile summary instead
+MAX_SERIES = 12
+
+SUMMARY_ROWS = ("P10", "P25", "Median", "Mean", "P75", "P90")
+
+
+def score_matrix(profiles):
+    """Stack {name: scores dict} into (names, float32 matrix)."""
+    names = list(profiles)
+    matrix = np.array([[s[p] for p in PRINCIPLES] for s in profiles.values()], dtype=np.float32)
+    return names, matrix.reshape(len(names), len(PRINCIPLES))
+
+
+def stack(*blocks):
+    """Concatenate (names, matrix) blocks into one (names, matrix) pair."""
+    blocks = [(list(n), np.asarray(m, dtype=np.float32)) for n, m in blocks if len(n)]
+    if not blocks:
+        return [], np.empty((0, len(PRINCIPLES)), dtype=np.float32)
+    names = [name for block_names, _ in blocks for name in block_names]
+    return names, np.vstack([m for _, m in blocks])
+
+
+def frame_to_table(df, name_column="env_name", cohort_column="cohort"):
+    """ScoreTable from an uploaded table of answers or scores.
+
+    Tables that already have one column per principle are used as is; tables
+    with ``q1``..``q5`` answer columns are scored first. A ``cohort_column``,
+    if present, is kept.
+    """
+    if all(p in df.columns for p in PRINCIPLES):
+        scores = df[PRINCIPLES]
+    else:
+        scores = score_frame(df)
+    if name_column in df.columns:
+        names = df[name_column]
+    else:
+        names = pd.Series([f"Upload #{i + 1}" for i in range(len(df))], index=df.index)
+    columns = {"env_name": names}
+    if cohort_column in df.columns:
+        columns["cohort"] = df[cohort_column]
+    return ScoreTable.from_frame(scores.assign(**columns), name_column="env_name", cohort_column="cohort")
+
+
+def read_upload(data, file_name):
+    """ScoreTable from the bytes of an uploaded CSV or Parquet file."""
+    import io
+
+    if file_name.endswith(".parquet"):
+        df = pd.read_parquet(io.BytesIO(data))
+    else:
+        # As text, so answer columns are matched verbatim; score columns are
+        # converted back to numbers by ScoreTable.from_frame
+        df = pd.read_csv(io.BytesIO(data), dtype=str)
+    return frame_to_table(df)
+
+
+def frame_to_matrix(df, name_column="env_name"):
+    """(names, matrix) from an uploaded table of answers or scores."""
+    return frame_to_table(df, name_column).as_block()
+
+
+def summarize(matrix):
+    """Quantile profiles of a score matrix, in SUMMARY_ROWS order."""
+    p10, p25, median, p75, p90 = np.percentile(matrix, [10, 25, 50, 75, 90], axis=0)
+    return np.vstack([p10, p25, median, matrix.mean(axis=0), p75, p90])
+
+
+def for_display(names, matrix, max_series=MAX_SERIES):
+    """Rows to chart: all of them, or the quantile summary when there are too many.
+
+    Returns (labels, matrix, summarized).
+    """
+    if len(names) <= max_series:
+        return list(names), matrix, False
+    return list(SUMMARY_ROWS), summarize(matrix), True
+
+
+def difference_table(names, matrix, reference):
+    """Per-principle differences from the ``reference`` row, plus distance.
+
+    One broadcast subtraction over the whole matrix.
+    """
+    diff = matrix - matrix[reference]
+    table = pd.DataFrame(diff, index=pd.Index(names, name="Environment"), columns=PRINCIPLES)
+    table["Distance"] = np.sqrt((diff ** 2).sum(axis=1))
+    return table
+
+
+def grouped_bar_figure(labels, matrix):
+    """Grouped bars: principles on x, one bar per environment."""
+    fig = go.Figure(
+        [
+            go.Bar(name=label, x=PRINCIPLES, y=row, text=np.round(row, 2), textposition="outside")
+            for label, row in zip(labels, matrix)
+        ]
+    )
+    fig.update_layout(barmode="group", yaxis={"range": [0, 5.5], "title": "Score (1–5)"}, xaxis_title="Design principle")
+    return fig
+
+
+def radar_figure(labels, matrix):
+    """Radar chart with one closed polygon per environment."""
+    theta = [*PRINCIPLES, PRINCIPLES[0]]
+    closed = np.hstack([matrix, matrix[:, :1]])
+    fig = go.Figure(
+        [go.Scatterpolar(r=row, theta=theta, name=label, fill="toself", opacity=0.6) for label, row in zip(labels, closed)]
+    )
+    fig.update_layout(polar={"radialaxis": {"range": [0, 5]}})
+    return fig
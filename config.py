@@ -0,0 +1,48 @@
+"""Runtime settings, read once from ``LEA_*`` environment variables."""
+import os
+
+CHART_MODES = ("plotly", "svg", "vega")
+
+# How profile charts are drawn: "plotly" (interactive figure), "svg"
+# (pre-rendered static image) or "vega" (compact Vega-Lite spec)
+CHART_MODE = os.environ.get("LEA_CHART_MODE", "plotly").strip().lower()
+if CHART_MODE not in CHART_MODES:
+    raise ValueError(f"LEA_CHART_MODE must be one of {CHART_MODES}, got {CHART_MODE!r}")
+
+# SQLite file holding the history of submitted analyses
+STORE_PATH = os.environ.get("LEA_STORE_PATH", "analyses.db")
+
+# Rubric spec (questions, scoring, labels and report text)
+RUBRIC_PATH = os.environ.get(
+    "LEA_RUBRIC_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rubric.yaml")
+)
+
+# Directory for timing telemetry (metrics.prom and spans.jsonl); unset or
+# empty turns instrumentation off
+TELEMETRY_DIR = os.environ.get("LEA_TELEMETRY_DIR", "").strip()
+
+# SQLite file of build-once values (preset charts, compiled reports) shared
+# by the worker processes of a multi-process deployment; unset keeps the
+# caches per process
+SHARED_CACHE_PATH = os.environ.get("LEA_SHARED_CACHE", "").strip()
+
+# Survey-responses API that lms_import.py syncs from, and its bearer token
+LMS_URL = os.environ.get("LEA_LMS_URL", "").strip()
+LMS_TOKEN = os.environ.get("LEA_LMS_TOKEN", "").strip()
+
+# Broker for live class sessions (``python live.py serve``); unset keeps
+# them in the process, which only works with a single worker
+LIVE_URL = os.environ.get("LEA_LIVE_URL", "").strip()
+
+# .npy file the nearest-environment index is saved to and loaded from, so a
+# restart doesn't re-read the whole history; unset rebuilds it per process
+SIMILARITY_PATH = os.environ.get("LEA_SIMILARITY_PATH", "").strip()
+
+# Memory budgets for what sessions hold (section memo, uploaded batches), in
+# MB: per session and for all sessions of the process together. Over a
+# budget the least recently used entries are evicted and rebuilt on demand.
+SESSION_BUDGET_MB = float(os.environ.get("LEA_SESSION_BUDGET_MB", "50"))
+MEMORY_BUDGET_MB = float(os.environ.get("LEA_MEMORY_BUDGET_MB", "1024"))
+
+# Sessions idle this long lose what they hold
+SESSION_IDLE_MINUTES = float(os.environ.get("LEA_SESSION_IDLE_MINUTES", "30"))
@@ -0,0 +1,244 @@
+"""Run the app as N Streamlit worker processes behind nginx.
+
+    python deploy.py --workers 4            # workers on 8601.., nginx on 8501
+    python deploy.py --workers 4 --no-proxy # workers only; use your own proxy
+
+One Streamlit process runs every session's reruns under one GIL, so during
+class blocks reruns queue up behind each other. This launcher starts one
+worker per core (by default), each its own process, and puts nginx in front
+of them on ``--port``:
+
+- Sessions live in the memory of the worker that created them, so the proxy
+  pins each browser to one worker: nginx sets a ``lea_worker`` cookie on the
+  first response and routes by a consistent hash of it. (Hashing the client
+  IP would send a whole school behind one NAT address to a single worker.)
+- Workers share one cookie secret, and one ``SharedCache`` file for the
+  preset profile figures and the compiled report table, which the launcher
+  builds once before the workers start.
+- The analysis history is already a shared WAL-mode SQLite file.
+- Live class sessions go to one ``live.py serve`` broker on ``--live-port``,
+  so students and their teacher can be on different workers.
+- With ``LEA_TELEMETRY_DIR`` set, each worker writes its telemetry to its
+  own ``worker-<port>`` directory inside it, because every process
+  rewrites ``metrics.prom`` with its own totals.
+
+Dead workers are restarted; Ctrl-C or SIGTERM stops everything. Everything
+the launcher writes (nginx config and logs, worker logs, the shared cache)
+goes to ``--run-dir``.
+"""
+import argparse
+import os
+import secrets
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+NGINX_CONF = """\
+# Generated by deploy.py
+worker_processes auto;
+pid nginx.pid;
+error_log logs/nginx-error.log warn;
+
+events {{
+    worker_connections 4096;
+}}
+
+http {{
+    access_log off;
+    client_body_temp_path tmp/body;
+    proxy_temp_path tmp/proxy;
+    fastcgi_temp_path tmp/fastcgi;
+    uwsgi_temp_path tmp/uwsgi;
+    scgi_temp_path tmp/scgi;
+
+    # Session affinity: a browser keeps the worker its first request hashed to
+    map $cookie_lea_worker $lea_affinity {{
+        ""      $request_id;
+        default $cookie_lea_worker;
+    }}
+
+    map $http_upgrade $connection_upgrade {{
+        default upgrade;
+        ""      close;
+    }}
+
+    upstream streamlit {{
+        hash $lea_affinity consistent;
+{servers}
+    }}
+
+    server {{
+        listen {listen};
+        client_max_body_size {max_upload_mb}m;
+
+        location / {{
+            proxy_pass http://streamlit;
+            proxy_http_version 1.1;
+            proxy_set_header Upgrade $http_upgrade;
+            proxy_set_header Connection $connection_upgrade;
+            proxy_set_header Host $host;
+            proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+            proxy_read_timeout 1d;
+            proxy_buffering off;
+            add_header Set-Cookie "lea_worker=$lea_affinity; Path=/; HttpOnly; SameSite=Lax" always;
+        }}
+    }}
+}}
+"""
+
+
+def nginx_config(ports, listen=8501, max_upload_mb=200):
+    servers = "\n".join(f"        server 127.0.0.1:{port} max_fails=0;" for port in ports)
+    return NGINX_CONF.format(servers=servers, listen=listen, max_upload_mb=max_upload_mb)
+
+
+def worker_env(run_dir, extra=None, live_port=None):
+    """Environment for worker processes: the shared cache (and live broker) plus ``extra``."""
+    env = dict(os.environ)
+    env["LEA_SHARED_CACHE"] = os.path.join(run_dir, "shared_cache.db")
+    if live_port is not None:
+        env["LEA_LIVE_URL"] = f"http://127.0.0.1:{live_port}"
+    env.update(extra or {})
+    return env
+
+
+def warm_shared_cache(path):
+    """Clear the shared cache and build its entries once, before any worker starts."""
+    from presets import preset_profiles
+    from report import precompile
+    from shared_cache import SharedCache
+
+    cache = SharedCache(path)
+    cache.clear()
+    preset_profiles(cache)
+    precompile(cache=cache)
+    return cache.keys()
+
+
+def start_worker(port, env, log_path, cookie_secret, app=os.path.join(ROOT, "app.py")):
+    env = dict(env)
+    if env.get("LEA_TELEMETRY_DIR", "").strip():
+        # Each process rewrites metrics.prom with its own totals, so one directory per worker
+        env["LEA_TELEMETRY_DIR"] = os.path.join(env["LEA_TELEMETRY_DIR"].strip(), f"worker-{port}")
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", app,
+                "--server.port", str(port),
+                "--server.address", "127.0.0.1",
+                "--server.headless", "true",
+                "--browser.gatherUsageStats", "false",
+            ],
+            cwd=ROOT,
+            # Streamlit only takes the cookie secret from config or the environment
+            env={**env, "STREAMLIT_SERVER_COOKIE_SECRET": cookie_secret},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+
+def start_live_broker(port, log_path):
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "live.py"), "serve", "--port", str(port)],
+            cwd=ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+
+def start_nginx(run_dir):
+    nginx = shutil.which("nginx")
+    if nginx is None:
+        return None
+    return subprocess.Popen(
+        [nginx, "-p", run_dir, "-c", "nginx.conf", "-g", "daemon off;"],
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def stop(procs, timeout=10):
+    for proc in procs:
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+    deadline = time.monotonic() + timeout
+    for proc in procs:
+        if proc is None:
+            continue
+        try:
+            proc.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run N Streamlit workers behind nginx with sticky sessions.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8501, help="port nginx listens on")
+    parser.add_argument("--base-port", type=int, default=8601, help="first worker port")
+    parser.add_argument("--live-port", type=int, default=8600, help="live session broker port")
+    parser.add_argument("--run-dir", default=os.path.join(ROOT, ".deploy"))
+    parser.add_argument("--no-proxy", action="store_true", help="only write nginx.conf, don't start nginx")
+    args = parser.parse_args(argv)
+
+    run_dir = os.path.abspath(args.run_dir)
+    for sub in ("logs", "tmp"):
+        os.makedirs(os.path.join(run_dir, sub), exist_ok=True)
+    ports = [args.base_port + i for i in range(args.workers)]
+    with open(os.path.join(run_dir, "nginx.conf"), "w") as f:
+        f.write(nginx_config(ports, args.port))
+
+    env = worker_env(run_dir, live_port=args.live_port)
+    keys = warm_shared_cache(env["LEA_SHARED_CACHE"])
+    print(f"shared cache ready: {', '.join(keys)}")
+
+    broker_log = os.path.join(run_dir, "logs", "live-broker.log")
+    broker = start_live_broker(args.live_port, broker_log)
+    cookie_secret = secrets.token_hex(32)
+    workers = {
+        port: start_worker(port, env, os.path.join(run_dir, "logs", f"worker-{port}.log"), cookie_secret)
+        for port in ports
+    }
+    proxy = None if args.no_proxy else start_nginx(run_dir)
+    if proxy is None:
+        print(f"workers on ports {ports[0]}-{ports[-1]}; proxy config: {run_dir}/nginx.conf")
+        if not args.no_proxy:
+            print("nginx not found on PATH, so no proxy was started", file=sys.stderr)
+    else:
+        print(f"{args.workers} workers behind http://localhost:{args.port}")
+
+    stopping = False
+
+    def on_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+    try:
+        while not stopping:
+            time.sleep(1)
+            if stopping:
+                break
+            for port, proc in workers.items():
+                if proc.poll() is not None:
+                    print(f"worker {port} exited with {proc.returncode}; restarting", file=sys.stderr)
+                    log_path = os.path.join(run_dir, "logs", f"worker-{port}.log")
+                    workers[port] = start_worker(port, env, log_path, cookie_secret)
+            if broker.poll() is not None:
+                # Running sessions are lost; teachers start a new one
+                print(f"live broker exited with {broker.returncode}; restarting", file=sys.stderr)
+                broker = start_live_broker(args.live_port, broker_log)
+            if proxy is not None and proxy.poll() is not None:
+                print(f"nginx exited with {proxy.returncode}", file=sys.stderr)
+                break
+    finally:
+        stop([proxy, *workers.values(), broker])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Bulk report export: many scored environments into one ZIP archive.
+
+    python export.py scored.parquet reports.zip --formats txt md html pdf json
+
+The input is a scored table as written by ``batch_score.py`` (one column per
+design principle, plus an optional name column). Rows are read in chunks,
+rendered in a process pool and written to the archive entry by entry as the
+results come back, so neither the input nor the archive is ever held in
+memory as a whole.
+"""
+import argparse
+import html
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from report import render_report
+from scoring import PRINCIPLES, read_chunks
+
+FORMATS = ("txt", "md", "html", "pdf", "json")
+
+
+# --------- single-report renderers --------- #
+def to_txt(report):
+    return report.download_text
+
+
+def to_markdown(report):
+    return (
+        f"# Learning Environment Analysis – {report.env_name}\n\n"
+        f"{report.summary_line}\n\n"
+        f"**Impact on learning:** {report.impact_text}\n\n"
+        "## Design principle details\n\n"
+        + "\n\n".join(report.details)
+        + "\n\n## Design improvement summary\n\n"
+        f"{report.improvement_paragraph}\n"
+    )
+
+
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+
+
+def _inline_html(text):
+    return _BOLD.sub(r"<strong>\1</strong>", html.escape(text)).replace("  \n", "<br>\n")
+
+
+def to_html(report):
+    title = html.escape(f"Learning Environment Analysis – {report.env_name}")
+    details = "\n".join(f"<p>{_inline_html(d)}</p>" for d in report.details)
+    return (
+        "<!DOCTYPE html>\n"
+        f'<html lang="en"><head><meta charset="utf-8"><title>{title}</title></head>\n'
+        f"<body>\n<h1>{title}</h1>\n"
+        f"<p>{_inline_html(report.summary_line)}</p>\n"
+        f"<p><strong>Impact on learning:</strong> {_inline_html(report.impact_text)}</p>\n"
+        f"<h2>Design principle details</h2>\n{details}\n"
+        f"<h2>Design improvement summary</h2>\n"
+        f"<p>{_inline_html(report.improvement_paragraph)}</p>\n"
+        "</body></html>\n"
+    )
+
+
+def to_json(report):
+    return json.dumps(report.as_dict(), ensure_ascii=False, indent=2)
+
+
+def _wrap(line, width):
+    words, out, current = line.split(" "), [], ""
+    for word in words:
+        if current and len(current) + 1 + len(word) > width:
+            out.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    out.append(current)
+    return out
+
+
+def _pdf_escape(line):
+    data = line.encode("cp1252", "replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def to_pdf(report, width=92, lines_per_page=60):
+    """Plain-text PDF of the download text (Helvetica, US Letter)."""
+    lines = []
+    for line in report.download_text.replace("**", "").splitlines():
+        lines.extend(_wrap(line, width))
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    kids = []
+    for page in pages:
+        stream = b"BT /F1 10 Tf 12 TL 50 750 Td\n" + b"".join(
+            b"(" + _pdf_escape(line) + b") Tj T*\n" for line in page
+        ) + b"ET"
+        page_no = len(objects) + 1
+        kids.append(f"{page_no} 0 R".encode())
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents "
+            + f"{page_no + 1} 0 R".encode()
+            + b" >>"
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count " + str(len(pages)).encode() + b" >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{off:010d} 00000 n \n".encode() for off in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+RENDERERS = {
+    "txt": to_txt,
+    "md": to_markdown,
+    "html": to_html,
+    "pdf": to_pdf,
+    "json": to_json,
+}
+
+
+# --------- bulk export --------- #
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+
+
+def entry_name(row_no, env_name, fmt):
+    slug = _SLUG.sub("-", env_name).strip("-")[:60] or "environment"
+    return f"{fmt}/{row_no:07d}_{slug}.{fmt}"
+
+
+def render_batch(rows, formats):
+    """Render (row_no, env_name, scores) rows; return (entry name, bytes) pairs.
+
+    Runs in the worker processes, so it only takes and returns plain data.
+    """
+    out = []
+    for row_no, env_name, scores in rows:
+        report = render_report(scores, env_name)
+        for fmt in formats:
+            data = RENDERERS[fmt](report)
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            out.append((entry_name(row_no, report.env_name, fmt), data))
+    return out
+
+
+def iter_rows(src, name_column=None, chunksize=10_000):
+    """Yield (row_no, env_name, scores) from a scored CSV/Parquet file."""
+    columns = list(PRINCIPLES) + ([name_column] if name_column else [])
+    row_no = 0
+    for chunk in read_chunks(src, chunksize, columns=columns):
+        scores = chunk[PRINCIPLES].astype("int64").to_numpy()
+        names = chunk[name_column].fillna("").astype(str).tolist() if name_column else [""] * len(chunk)
+        for name, row in zip(names, scores.tolist()):
+            row_no += 1
+            yield row_no, name, tuple(row)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_zip(rows, dst, formats=FORMATS, workers=None, batch_size=200, max_pending=None):
+    """Write reports for ``rows`` into the ZIP at ``dst``; return rows exported.
+
+    ``rows`` is any iterable of (row_no, env_name, scores). At most
+    ``max_pending`` batches are in flight, and finished batches are written in
+    input order, so memory stays bounded by the batch window.
+    """
+    unknown = set(formats) - set(RENDERERS)
+    if unknown:
+        raise ValueError(f"Unknown export formats: {sorted(unknown)}")
+    formats = tuple(formats)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 4 * workers
+
+    exported = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool, zipfile.ZipFile(
+        dst, "w", compression=zipfile.ZIP_DEFLATED
+    ) as archive:
+        pending = deque()
+
+        def drain(limit):
+            nonlocal exported
+            while len(pending) > limit:
+                future, count = pending.popleft()
+                for name, data in future.result():
+                    archive.writestr(name, data)
+                exported += count
+
+        for batch in _batches(rows, batch_size):
+            pending.append((pool.submit(render_batch, batch, formats), len(batch)))
+            drain(max_pending)
+        drain(0)
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export analysis reports for a scored survey table.")
+    parser.add_argument("src", help="scored .csv or .parquet file (see batch_score.py)")
+    parser.add_argument("dst", help="output .zip file")
+    parser.add_argument("--formats", nargs="+", default=["txt"], choices=FORMATS)
+    parser.add_argument("--name-column", default=None, help="column holding environment names")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=200, help="reports per worker task")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    count = export_zip(
+        iter_rows(args.src, args.name_column),
+        args.dst,
+        formats=args.formats,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Exported {count:,} reports ({', '.join(args.formats)}) in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+"""Live class sessions: class-wide profiles that update while students submit.
+
+A teacher opens a session and gets a short code; students enter it in the
+"Analyze your own environment" form (or open ``?live=CODE``). Each submit
+adds the student's five scores to the session's running per-principle
+counts: five increments under a lock, O(1) however many students there are.
+A student who resubmits replaces their earlier answers (five decrements
+more). No rerun of any other session is triggered.
+
+Teachers don't see every submit. Once per ``PUBLISH_INTERVAL`` a publisher
+thread takes a snapshot of each session that changed since the last one
+and wakes everyone waiting on it. The teacher's dashboard fragment reads
+the latest snapshot, so a class of 200 costs each teacher the same one
+update per second as a class of 2.
+
+``LiveHub`` keeps the sessions in the process. With several worker
+processes (deploy.py), students and teachers land on different workers,
+so the sessions go to a broker instead:
+
+    python live.py serve --port 8600         # the broker; workers get LEA_LIVE_URL
+    python live.py simulate --rate 1000       # 1,000 submits/s against a LiveHub
+    python live.py simulate --url http://127.0.0.1:8600
+
+``RemoteHub`` is the broker's client, with the same methods as ``LiveHub``.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import secrets
+import statistics
+import sys
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from rubric import MAX_SCORE, PRINCIPLES
+
+PUBLISH_INTERVAL = 1.0
+# Sessions nobody has submitted to or opened for this long are dropped
+MAX_IDLE = 6 * 3600
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+
+
+class Snapshot(NamedTuple):
+    code: str
+    title: str
+    n: int  # students counted
+    version: int  # submits so far, resubmits included
+    counts: tuple  # per principle, counts of scores 0..MAX_SCORE
+    published_at: float
+
+    def means(self):
+        """{principle: mean score}, for charts.profile_frame / show_profile."""
+        return {
+            p: round(sum(score * c for score, c in enumerate(row)) / self.n, 2) if self.n else 0.0
+            for p, row in zip(PRINCIPLES, self.counts)
+        }
+
+    def distribution(self):
+        """{principle: {score: n}}, like AnalysisStore.distribution."""
+        return {p: dict(enumerate(row)) for p, row in zip(PRINCIPLES, self.counts)}
+
+    def to_json(self):
+        return {
+            "code": self.code,
+            "title": self.title,
+            "n": self.n,
+            "version": self.version,
+            "counts": self.counts,
+            "published_at": self.published_at,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            data["code"], data["title"], data["n"], data["version"], tuple(map(tuple, data["counts"])), data["published_at"]
+        )
+
+
+def check_scores(scores):
+    """``scores`` (a sequence or a dict keyed by principle) as a tuple of valid scores."""
+    if isinstance(scores, dict):
+        scores = [scores[p] for p in PRINCIPLES]
+    scores = tuple(scores)
+    if len(scores) != len(PRINCIPLES) or not all(
+        isinstance(s, int) and not isinstance(s, bool) and 0 <= s <= MAX_SCORE for s in scores
+    ):
+        raise ValueError(f"scores must be {len(PRINCIPLES)} whole numbers between 0 and {MAX_SCORE}")
+    return scores
+
+
+class LiveSession:
+    """Running per-principle score counts of one class session."""
+
+    def __init__(self, code, title=""):
+        self.code = code
+        self.title = title
+        self.version = 0
+        self.touched = time.monotonic()
+        self._n = 0
+        self._counts = [[0] * (MAX_SCORE + 1) for _ in PRINCIPLES]
+        self._students = {}
+        self._lock = threading.Lock()
+
+    def submit(self, scores, student=None):
+        """Count ``scores``; a known ``student`` id replaces that student's last scores."""
+        with self._lock:
+            previous = self._students.get(student) if student is not None else None
+            if previous is None:
+                self._n += 1
+            else:
+                for row, score in zip(self._counts, previous):
+                    row[score] -= 1
+            for row, score in zip(self._counts, scores):
+                row[score] += 1
+            if student is not None:
+                self._students[student] = scores
+            self.version += 1
+        self.touched = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return Snapshot(
+                self.code, self.title, self._n, self.version, tuple(map(tuple, self._counts)), time.time()
+            )
+
+
+class LiveHub:
+    """In-process live sessions plus the publisher thread that snapshots them."""
+
+    def __init__(self, interval=PUBLISH_INTERVAL, max_idle=MAX_IDLE):
+        self.interval = interval
+        self.max_idle = max_idle
+        self._sessions = {}
+        self._published = {}
+        self._changed = threading.Condition()
+        self._stopped = threading.Event()
+        self._publisher = threading.Thread(target=self._publish_loop, name="live-publisher", daemon=True)
+        self._publisher.start()
+
+    def open(self, title=""):
+        """Start a session; returns its join code."""
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(6))
+            if code not in self._sessions:
+                break
+        session = self._sessions[code] = LiveSession(code, title.strip()[:100])
+        with self._changed:
+            self._published[code] = session.snapshot()
+        return code
+
+    def close(self, code):
+        self._sessions.pop(code, None)
+        with self._changed:
+            self._published.pop(code, None)
+            self._changed.notify_all()
+
+    def submit(self, code, scores, student=None):
+        """Add one student's scores; KeyError for an unknown code."""
+        self._sessions[code].submit(check_scores(scores), student)
+
+    def latest(self, code):
+        """The last published snapshot; KeyError for an unknown code."""
+        session = self._sessions[code]
+        session.touched = time.monotonic()
+        return self._published[code]
+
+    def wait(self, code, after, timeout=None):
+        """Block until a snapshot newer than version ``after`` is published.
+
+        Returns it, or None on timeout. KeyError if the session is closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while True:
+                snapshot = self._published[code]
+                if snapshot.version > after:
+                    return snapshot
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+
+    def publish(self):
+        """Snapshot every session that changed; wake waiters if any did."""
+        changed = {}
+        now = time.monotonic()
+        for code, session in list(self._sessions.items()):
+            published = self._published.get(code)
+            if published is not None and session.version != published.version:
+                changed[code] = session.snapshot()
+            elif now - session.touched > self.max_idle:
+                self.close(code)
+        if changed:
+            with self._changed:
+                # Skip sessions closed meanwhile
+                self._published.update((c, s) for c, s in changed.items() if c in self._published)
+                self._changed.notify_all()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _publish_loop(self):
+        while not self._stopped.wait(self.interval):
+            self.publish()
+
+
+# --------- broker --------- #
+def create_app(hub):
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    def not_found(code):
+        return JSONResponse({"error": f"no live session {code!r}"}, status_code=404)
+
+    async def open_session(request):
+        body = await request.json() if await request.body() else {}
+        return JSONResponse({"code": hub.open(str(body.get("title", "")))})
+
+    async def submit(request):
+        code = request.path_params["code"]
+        try:
+            body = await request.json()
+            scores, student = body["scores"], body.get("student")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return JSONResponse({"error": 'expected a JSON body {"scores": [...]}'}, status_code=400)
+        try:
+            hub.submit(code, scores, None if student is None else str(student))
+        except KeyError:
+            return not_found(code)
+        except (ValueError, TypeError) as exc:
+            return JSONResponse({"error": str(exc)}, status_code=400)
+        return Response(status_code=204)
+
+    async def session(request):
+        code = request.path_params["code"]
+        if request.method == "DELETE":
+            hub.close(code)
+            return Response(status_code=204)
+        try:
+            after = int(request.query_params.get("after", -1))
+            wait = min(float(request.query_params.get("wait", 0)), 30.0)
+        except ValueError:
+            return JSONResponse({"error": "invalid parameter"}, status_code=400)
+        # Long poll without tying up a thread per waiting teacher
+        deadline = time.monotonic() + wait
+        try:
+            snapshot = hub.latest(code)
+            while snapshot.version <= after and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                snapshot = hub.latest(code)
+        except KeyError:
+            return not_found(code)
+        return JSONResponse(snapshot.to_json())
+
+    return Starlette(
+        routes=[
+            Route("/sessions", open_session, methods=["POST"]),
+            Route("/sessions/{code}/submit", submit, methods=["POST"]),
+            Route("/sessions/{code}", session, methods=["GET", "DELETE"]),
+        ]
+    )
+
+
+class BrokerError(OSError):
+    """The live broker failed or answered with an error; callers treat it as unreachable."""
+
+
+class RemoteHub:
+    """Client of a ``live.py serve`` broker, with LiveHub's methods."""
+
+    def __init__(self, url, timeout=5):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _request(self, method, path, body=None, timeout=None):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        for attempt in range(2):
+            # One keep-alive connection per thread
+            conn = getattr(self._local, "conn", None)
+            reused = conn is not None and conn.sock is not None
+            if conn is None:
+                conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            conn.timeout = timeout or self.timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(conn.timeout)
+            try:
+                conn.request(method, self.prefix + path, data, headers)
+                response = conn.getresponse()
+                payload = response.read()
+                break
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                self._local.conn = None
+                # The broker closes idle keep-alive connections; retry those once
+                if not reused or attempt:
+                    raise BrokerError(f"live broker: {type(exc).__name__}: {exc}") from exc
+        if response.status == 404:
+            raise KeyError(path)
+        if response.status == 400:
+            raise ValueError(json.loads(payload)["error"])
+        if response.status >= 300:
+            raise BrokerError(f"live broker: HTTP {response.status} for {method} {path}")
+        return json.loads(payload) if payload else None
+
+    def open(self, title=""):
+        return self._request("POST", "/sessions", {"title": title})["code"]
+
+    def close(self, code):
+        self._request("DELETE", f"/sessions/{code}")
+
+    def submit(self, code, scores, student=None):
+        self._request("POST", f"/sessions/{code}/submit", {"scores": check_scores(scores), "student": student})
+
+    def latest(self, code):
+        return Snapshot.from_json(self._request("GET", f"/sessions/{code}"))
+
+    def wait(self, code, after, timeout=None):
+        wait = 30.0 if timeout is None else timeout
+        snapshot = Snapshot.from_json(
+            self._request("GET", f"/sessions/{code}?after={after}&wait={wait}", timeout=wait + self.timeout)
+        )
+        return snapshot if snapshot.version > after else None
+
+
+# --------- simulator --------- #
+def simulate(hub, rate=1000, seconds=10, threads=8, class_size=200, teachers=3, seed=0):
+    """Submit at ``rate`` per second for ``seconds`` while ``teachers`` watch; return a report dict.
+
+    Submits come from ``class_size`` students in turn, so most are resubmits
+    that replace the student's earlier answers.
+    """
+    import random
+
+    from rubric import load_rubric
+
+    rubric = load_rubric()
+    rng = random.Random(seed)
+    samples = [
+        tuple(rubric.score_options([rng.randrange(len(q.options)) for q in rubric.questions]).values())
+        for _ in range(997)
+    ]
+    code = hub.open("simulation")
+    interval = getattr(hub, "interval", PUBLISH_INTERVAL)
+    stop = threading.Event()
+    latencies = [[] for _ in range(threads)]
+    answers = [{} for _ in range(threads)]  # each thread's students' last scores
+    updates = [[] for _ in range(teachers)]
+
+    def student(k):
+        # Each thread paces its own share of the rate, for its own share of the class
+        period = threads / rate
+        own = [f"student-{j}" for j in range(k, class_size, threads)]
+        next_at = time.perf_counter()
+        i = k
+        while not stop.is_set():
+            scores = samples[i % len(samples)]
+            student_id = own[(i // threads) % len(own)]
+            start = time.perf_counter()
+            hub.submit(code, scores, student_id)
+            latencies[k].append(time.perf_counter() - start)
+            answers[k][student_id] = scores
+            i += threads
+            next_at += period
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def teacher(k):
+        seen = -1
+        while True:
+            snapshot = hub.wait(code, seen, timeout=2 * interval + 1)
+            if snapshot is None:
+                if stop.is_set():
+                    return
+                continue
+            updates[k].append(time.perf_counter())
+            seen = snapshot.version
+
+    watchers = [threading.Thread(target=teacher, args=(k,), daemon=True) for k in range(teachers)]
+    submitters = [threading.Thread(target=student, args=(k,), daemon=True) for k in range(threads)]
+    started = time.perf_counter()
+    for t in watchers + submitters:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in submitters:
+        t.join()
+    elapsed = time.perf_counter() - started
+    for t in watchers:
+        t.join()
+    final = hub.latest(code)
+    hub.close(code)
+
+    last = {student_id: scores for per_thread in answers for student_id, scores in per_thread.items()}
+    counts = [[0] * (MAX_SCORE + 1) for _ in PRINCIPLES]
+    for scores in last.values():
+        for row, score in zip(counts, scores):
+            row[score] += 1
+    submitted = sum(len(l) for l in latencies)
+    all_latencies = sorted(x for l in latencies for x in l)
+    gaps = [b - a for u in updates for a, b in zip(u, u[1:])]
+    return {
+        "submitted": submitted,
+        "submits_per_s": submitted / elapsed,
+        "submit_p50_ms": 1000 * all_latencies[len(all_latencies) // 2],
+        "submit_p99_ms": 1000 * all_latencies[int(len(all_latencies) * 0.99)],
+        "updates_per_teacher": statistics.mean(len(u) for u in updates) if teachers else 0,
+        "min_update_gap_s": min(gaps) if gaps else None,
+        "final_version": final.version,
+        "final_n": final.n,
+        "students": len(last),
+        "counts_match": final.counts == tuple(map(tuple, counts)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live class session broker and simulator.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the broker")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8600)
+    sim = sub.add_parser("simulate", help="drive a session with simulated students")
+    sim.add_argument("--url", help="broker URL (default: an in-process LiveHub)")
+    sim.add_argument("--rate", type=float, default=1000, help="submits per second")
+    sim.add_argument("--seconds", type=float, default=10)
+    sim.add_argument("--threads", type=int, default=8, help="submitting threads")
+    sim.add_argument("--class-size", type=int, default=200, help="distinct students")
+    sim.add_argument("--teachers", type=int, default=3, help="watching threads")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        import uvicorn
+
+        uvicorn.run(create_app(LiveHub()), host=args.host, port=args.port, log_level="warning")
+        return
+
+    hub = RemoteHub(args.url) if args.url else LiveHub()
+    if not 0 < args.threads <= args.class_size:
+        parser.error("--threads must be between 1 and --class-size")
+    result = simulate(hub, args.rate, args.seconds, args.threads, args.class_size, args.teachers)
+    print(
+        f"{result['submitted']:,} submits at {result['submits_per_s']:,.0f}/s "
+        f"(target {args.rate:,.0f}/s; p50 {result['submit_p50_ms']:.3f} ms, p99 {result['submit_p99_ms']:.3f} ms)\n"
+        f"{result['updates_per_teacher']:.1f} updates per teacher, "
+        f"at least {result['min_update_gap_s'] or 0:.2f} s apart\n"
+        f"final snapshot: {result['final_version']:,} submits from {result['final_n']:,} students, "
+        f"counts {'match' if result['counts_match'] else 'DO NOT match'}",
+        file=sys.stderr,
+    )
+    ok = result["counts_match"] and (result["final_version"], result["final_n"]) == (
+        result["submitted"],
+        result["students"],
+    )
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Pull survey responses from the LMS into the analysis history.
+
+    python lms_import.py --url http://lms.example.edu --token $LMS_TOKEN
+    python lms_import.py --url http://127.0.0.1:8510 --concurrency 16   # lms_mock.py
+
+Pages through a REST endpoint (``--path``, default ``/api/v1/survey-responses``;
+see ``lms_mock.py`` for the expected shape) with one pooled aiohttp session:
+
+- the first page gives the total and an ``as_of`` snapshot time; the other
+  pages are fetched by ``--concurrency`` workers, all pinned to that snapshot
+- failed requests (connection errors, timeouts, 429 and 5xx) are retried with
+  exponential backoff and jitter, honouring ``Retry-After``
+- each record's five answers (option indices or texts) are scored with the
+  active rubric, exactly like the JSON API, and queued into the history store
+  under its LMS id, so a record imported again (updated since, or ``--full``)
+  replaces its earlier analysis instead of adding another
+- records updated while a run pages through the snapshot leave it (their
+  ``updated_at`` passes ``as_of``), which shifts the later pages by one and
+  could skip a record that stays in it for good; pages report the snapshot's
+  total, so when it changes mid-run the pass is discarded and repeated with a
+  new snapshot (up to ``SNAPSHOT_ATTEMPTS`` times)
+- rows are written only once every page has arrived, and the sync cursor
+  (the snapshot time) is saved in ``--state`` only after they are committed,
+  so the next run fetches only newer responses and a failed run is simply
+  repeated
+
+Where the fields live in a record is set with ``--id-field``,
+``--updated-field``, ``--name-field``, ``--cohort-field`` and
+``--answers-field`` (dotted paths, e.g. ``course.section``).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import NamedTuple
+
+import aiohttp
+
+from api import InvalidRequest, parse_item
+from config import LMS_TOKEN, LMS_URL, STORE_PATH
+from rubric import load_rubric
+from store import AnalysisStore
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Passes over a fresh snapshot before giving up on a busy LMS
+SNAPSHOT_ATTEMPTS = 3
+
+
+class FieldMap(NamedTuple):
+    """Dotted paths of the fields the importer reads from each record."""
+
+    id: str = "id"
+    updated: str = "updated_at"
+    name: str = "course.name"
+    cohort: str = "course.section"
+    answers: str = "responses"
+
+
+class Source(NamedTuple):
+    url: str
+    path: str = "/api/v1/survey-responses"
+    token: str = ""
+    per_page: int = 200
+    fields: FieldMap = FieldMap()
+
+
+class SyncResult(NamedTuple):
+    imported: int
+    skipped: int
+    pages: int
+    retries: int
+    cursor: float
+    seconds: float
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+def get_path(record, path):
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def map_record(record, fields, rubric):
+    """(env_name, scores dict, cohort, created_at, external_id) for one LMS record."""
+    name = get_path(record, fields.name)
+    scores, env_name = parse_item(
+        {"answers": get_path(record, fields.answers), "env_name": "" if name is None else str(name)}, rubric
+    )
+    cohort = get_path(record, fields.cohort)
+    updated = get_path(record, fields.updated)
+    record_id = get_path(record, fields.id)
+    return (
+        env_name,
+        dict(zip((q.principle for q in rubric.questions), scores)),
+        str(cohort) if cohort not in (None, "") else None,
+        float(updated) if isinstance(updated, (int, float)) else None,
+        f"lms:{record_id}" if record_id not in (None, "") else None,
+    )
+
+
+# --------- HTTP --------- #
+class Fetcher:
+    """GETs pages with retry, exponential backoff and jitter."""
+
+    def __init__(self, session, source, max_retries=6, backoff=0.2, max_backoff=10.0):
+        self.session = session
+        self.source = source
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+
+    async def page(self, page, since, until):
+        params = {"page": page, "per_page": self.source.per_page}
+        if since is not None:
+            params["updated_since"] = repr(since)
+        if until is not None:
+            params["until"] = repr(until)
+        url = self.source.url.rstrip("/") + self.source.path
+        for attempt in range(self.max_retries + 1):
+            delay = min(self.backoff * 2**attempt, self.max_backoff) * random.uniform(0.5, 1.0)
+            try:
+                async with self.session.get(url, params=params) as response:
+                    if response.status in RETRY_STATUSES:
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after:
+                            try:
+                                delay = max(delay, float(retry_after))
+                            except ValueError:
+                                pass
+                        error = FetchError(f"page {page}: HTTP {response.status}")
+                    elif response.status != 200:
+                        raise FetchError(f"page {page}: HTTP {response.status} {await response.text()}")
+                    else:
+                        return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                error = FetchError(f"page {page}: {type(exc).__name__}: {exc}")
+            if attempt < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(delay)
+        raise error
+
+
+# --------- sync --------- #
+def load_cursor(state_path, source):
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f).get(source.url + source.path)
+    except FileNotFoundError:
+        return None
+
+
+def save_cursor(state_path, source, cursor):
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    state[source.url + source.path] = cursor
+    tmp = f"{state_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, state_path)
+
+
+async def fetch_all(source, since, on_items, concurrency=8, timeout=30):
+    """Fetch every page updated after ``since``; call ``on_items(items)`` per page.
+
+    Returns (pages, retries, as_of, shifted); ``shifted`` means the snapshot's
+    total changed between pages, so some record may have been skipped.
+    """
+    headers = {"Accept": "application/json"}
+    if source.token:
+        headers["Authorization"] = f"Bearer {source.token}"
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=30)
+    async with aiohttp.ClientSession(
+        connector=connector, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as session:
+        fetcher = Fetcher(session, source)
+        first = await fetcher.page(1, since, None)
+        as_of, shifted = first["as_of"], False
+        on_items(first["items"])
+        pages = max(1, -(-first["total"] // source.per_page))
+
+        queue = asyncio.Queue()
+        for page in range(2, pages + 1):
+            queue.put_nowait(page)
+
+        async def worker():
+            while True:
+                try:
+                    page = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                body = await fetcher.page(page, since, as_of)
+                if body["total"] != first["total"]:
+                    nonlocal shifted
+                    shifted = True
+                on_items(body["items"])
+
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, pages - 1))))
+        return pages, fetcher.retries, as_of, shifted
+
+
+def sync(source, store, state_path, concurrency=8, rubric=None, full=False):
+    """Import everything newer than the saved cursor into ``store``."""
+    rubric = rubric or load_rubric()
+    since = None if full else load_cursor(state_path, source)
+    start = time.perf_counter()
+    total_pages = total_retries = 0
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        rows, skipped = [], 0
+
+        def on_items(items):
+            nonlocal skipped
+            for record in items:
+                try:
+                    rows.append(map_record(record, source.fields, rubric))
+                except InvalidRequest as exc:
+                    skipped += 1
+                    if skipped <= 5:
+                        print(f"skipped record {get_path(record, source.fields.id)}: {exc}", file=sys.stderr)
+
+        pages, retries, as_of, shifted = asyncio.run(fetch_all(source, since, on_items, concurrency))
+        total_pages += pages
+        total_retries += retries
+        if not shifted:
+            break
+        print("records changed during the import; fetching a new snapshot", file=sys.stderr)
+    else:
+        raise FetchError(f"records kept changing during {SNAPSHOT_ATTEMPTS} passes")
+    # Nothing is written unless every page arrived, so a failed run can simply be repeated
+    for row in rows:
+        store.add(*row)
+    store.flush()
+    save_cursor(state_path, source, as_of)
+    return SyncResult(len(rows), skipped, total_pages, total_retries, as_of, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import survey responses from the LMS.")
+    parser.add_argument("--url", default=LMS_URL, help="LMS base URL (default: $LEA_LMS_URL)")
+    parser.add_argument("--path", default=Source._field_defaults["path"])
+    parser.add_argument("--token", default=LMS_TOKEN, help="bearer token (default: $LEA_LMS_TOKEN)")
+    parser.add_argument("--per-page", type=int, default=Source._field_defaults["per_page"])
+    parser.add_argument("--concurrency", type=int, default=8, help="pages fetched at once")
+    parser.add_argument("--store", default=STORE_PATH, help="history database")
+    parser.add_argument("--state", default="lms_sync.json", help="file keeping the sync cursor")
+    parser.add_argument("--full", action="store_true", help="ignore the cursor and import everything")
+    for field, default in FieldMap._field_defaults.items():
+        parser.add_argument(f"--{field}-field", default=default, help=f"record path of the {field} field")
+    args = parser.parse_args(argv)
+    if not args.url:
+        parser.error("--url (or LEA_LMS_URL) is required")
+
+    source = Source(
+        url=args.url,
+        path=args.path,
+        token=args.token,
+        per_page=args.per_page,
+        fields=FieldMap(*(getattr(args, f"{field}_field") for field in FieldMap._fields)),
+    )
+    store = AnalysisStore(args.store)
+    try:
+        result = sync(source, store, args.state, args.concurrency, full=args.full)
+    except FetchError as exc:
+        raise SystemExit(f"Import failed, cursor not advanced: {exc}")
+    finally:
+        store.close()
+    rate = result.imported / result.seconds if result.seconds else 0
+    print(
+        f"Imported {result.imported:,} responses ({result.skipped:,} skipped) from {result.pages:,} pages "
+        f"in {result.seconds:.2f}s ({rate:,.0f}/s, {result.retries} retries)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Local stand-in for an LMS survey-responses API, for testing lms_import.py offline.
+
+    python lms_mock.py --records 100000 --latency 0.02 --fail-rate 0.02
+
+``GET /api/v1/survey-responses`` pages through synthetic responses:
+
+- ``updated_since`` (exclusive) and ``until`` (inclusive) filter on
+  ``updated_at``; without ``until`` the server uses its current time and
+  returns it as ``as_of``, which clients pass back for the remaining pages
+  so every page comes from the same snapshot
+- ``page`` (1-based) and ``per_page`` (max 500)
+
+and returns ``{"items": [...], "page", "per_page", "total", "as_of"}``.
+``POST /admin/generate?n=100`` adds new responses (to test incremental
+sync) and ``POST /admin/update?n=10`` re-stamps random existing ones as
+updated now (to test records that change during a sync). ``--latency`` delays every response and ``--fail-rate`` answers a
+share of requests with 503 (with ``Retry-After``) or 429.
+"""
+import argparse
+import asyncio
+import bisect
+import random
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from rubric import load_rubric
+
+MAX_PER_PAGE = 500
+COHORTS = ["Period 1", "Period 2", "Period 3", "Period 4", None]
+FREE_TEXT = ["never", "Sometimes", "often", "we do group projects every week"]
+
+
+class MockLMS:
+    """Synthetic responses, sorted by updated_at."""
+
+    def __init__(self, records=1000, seed=0, token=None, latency=0.0, fail_rate=0.0):
+        self.rng = random.Random(seed)
+        self.token = token
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.records = []
+        self.updated = []
+        self.requests = 0
+        self.next_id = 1
+        self.generate(records, start=time.time() - 86400)
+
+    def generate(self, n, start=None):
+        """Add ``n`` responses, spread over a day from ``start`` or stamped now."""
+        questions = load_rubric().questions
+        if start is None:
+            # Microseconds apart, so they are all visible to the next request
+            t, step = max(time.time() - n * 1e-6, self.updated[-1] if self.updated else 0), (1e-6, 1e-6)
+        else:
+            t, step = start, (0.001, 0.01)
+        for _ in range(n):
+            t += self.rng.uniform(*step)
+            record_id = self.next_id
+            self.next_id += 1
+            self.records.append(
+                {
+                    "id": record_id,
+                    "updated_at": round(t, 6),
+                    "course": {"name": f"Course {record_id % 997}", "section": self.rng.choice(COHORTS)},
+                    # Mostly option texts, like an LMS quiz export; some free text
+                    "responses": [
+                        self.rng.choice(q.options) if self.rng.random() > 0.1 else self.rng.choice(FREE_TEXT)
+                        for q in questions
+                    ],
+                }
+            )
+            self.updated.append(round(t, 6))
+
+    def update(self, ids):
+        """Mark the responses ``ids`` as updated now (they move to the end)."""
+        ids = set(ids)
+        changed = [r for r in self.records if r["id"] in ids]
+        self.records = [r for r in self.records if r["id"] not in ids]
+        self.updated = [r["updated_at"] for r in self.records]
+        t = max(time.time() - len(changed) * 1e-6, self.updated[-1] if self.updated else 0)
+        for record in changed:
+            t += 1e-6
+            record["updated_at"] = round(t, 6)
+            self.records.append(record)
+            self.updated.append(record["updated_at"])
+        return len(changed)
+
+    def page(self, since, until, page, per_page):
+        lo = bisect.bisect_right(self.updated, since) if since is not None else 0
+        hi = bisect.bisect_right(self.updated, until)
+        start = lo + (page - 1) * per_page
+        return self.records[start : min(start + per_page, hi)], max(hi - lo, 0)
+
+
+def _float_param(request, name):
+    value = request.query_params.get(name)
+    return float(value) if value not in (None, "") else None
+
+
+def create_app(lms):
+    async def responses(request):
+        lms.requests += 1
+        if lms.latency:
+            await asyncio.sleep(lms.latency)
+        if lms.token and request.headers.get("authorization") != f"Bearer {lms.token}":
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        if lms.fail_rate and lms.rng.random() < lms.fail_rate:
+            if lms.rng.random() < 0.5:
+                return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "0.05"})
+            return JSONResponse({"error": "unavailable"}, status_code=503)
+        try:
+            since = _float_param(request, "updated_since")
+            until = _float_param(request, "until")
+            page = int(request.query_params.get("page", 1))
+            per_page = min(int(request.query_params.get("per_page", 100)), MAX_PER_PAGE)
+        except ValueError:
+            return JSONResponse({"error": "invalid parameter"}, status_code=400)
+        if page < 1 or per_page < 1:
+            return JSONResponse({"error": "invalid parameter"}, status_code=400)
+        as_of = until if until is not None else time.time()
+        items, total = lms.page(since, as_of, page, per_page)
+        return JSONResponse({"items": items, "page": page, "per_page": per_page, "total": total, "as_of": as_of})
+
+    async def generate(request):
+        n = int(request.query_params.get("n", 100))
+        lms.generate(n)
+        return JSONResponse({"generated": n, "total": len(lms.records)})
+
+    async def update(request):
+        n = min(int(request.query_params.get("n", 10)), len(lms.records))
+        updated = lms.update(r["id"] for r in lms.rng.sample(lms.records, n))
+        return JSONResponse({"updated": updated, "total": len(lms.records)})
+
+    return Starlette(
+        routes=[
+            Route("/api/v1/survey-responses", responses),
+            Route("/admin/generate", generate, methods=["POST"]),
+            Route("/admin/update", update, methods=["POST"]),
+        ]
+    )
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a mock LMS survey-responses API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8510)
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--token", default=None, help="require this bearer token")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered 429/503")
+    args = parser.parse_args(argv)
+
+    lms = MockLMS(args.records, token=args.token, latency=args.latency, fail_rate=args.fail_rate)
+    uvicorn.run(create_app(lms), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Simulate a class of students against a running deployment.
+
+    python loadtest.py --url http://localhost:8501 --students 200
+    python loadtest.py --spawn 1 2 4 --students 200   # compare worker counts
+
+Each simulated student opens a real Streamlit session over the websocket,
+like a browser would, and loops through both main views: open the presets,
+pick another preset, switch to "Analyze your own environment", answer the
+five questions and submit. Every step is one script rerun; the harness
+reports completed reruns per second and the rerun latency percentiles.
+
+``--url`` targets a deployment (e.g. nginx from ``deploy.py``). ``--spawn``
+starts that many workers itself for each run, without a proxy, and pins
+students to workers round-robin, so the runs differ only in the number of
+processes doing the work.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from deploy import start_worker, stop, warm_shared_cache, worker_env
+
+CUSTOM_VIEW = "Analyze your own environment"
+PRESETS_VIEW = "Tang et al. (2025) scenarios"
+
+
+class Session:
+    """A minimal Streamlit browser client: reruns and widget state."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widgets = {}
+        self.states = {}
+        self.fragments = {}
+        self.session_id = None
+        self.alerts = []  # st.error/warning/info texts of the last run
+
+    async def rerun(self, triggers=(), query=""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = query
+        # Like the browser: a trigger inside a fragment reruns only that fragment
+        fragment_ids = {self.fragments.get(widget_id, "") for widget_id in triggers}
+        if len(fragment_ids) == 1:
+            msg.rerun_script.fragment_id = fragment_ids.pop()
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        for widget_id in triggers:
+            state = WidgetState(id=widget_id, trigger_value=True)
+            msg.rerun_script.widget_states.widgets.append(state)
+        await self.ws.send(msg.SerializeToString())
+
+        if not msg.rerun_script.fragment_id:
+            self.widgets = {}
+        markdown, self.alerts = [], []
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "script_finished":
+                return markdown
+            if kind == "new_session":
+                self.session_id = fwd.new_session.initialize.session_id
+            if kind != "delta" or fwd.delta.WhichOneof("type") != "new_element":
+                continue
+            element = fwd.delta.new_element
+            name = element.WhichOneof("type")
+            proto = getattr(element, name)
+            if name == "exception":
+                raise RuntimeError(f"app raised {proto.type}: {proto.message}")
+            if name == "markdown":
+                markdown.append(proto.body)
+            elif name == "alert":
+                self.alerts.append(proto.body)
+            elif getattr(proto, "id", ""):
+                self.widgets[proto.id] = (name, proto)
+                self.fragments[proto.id] = fwd.delta.fragment_id
+
+    def find(self, kind, key=None, label=None):
+        for widget_id, (name, proto) in self.widgets.items():
+            if name != kind:
+                continue
+            if key is not None and not widget_id.endswith(f"-{key}"):
+                continue
+            if label is not None and not proto.label.startswith(label):
+                continue
+            return widget_id, proto
+        raise LookupError(f"no {kind} widget (key={key!r}, label={label!r}) in the last run")
+
+    def choose(self, widget_id, text):
+        self.states[widget_id] = WidgetState(id=widget_id, string_value=text)
+
+    def choose_many(self, widget_id, texts):
+        state = WidgetState(id=widget_id)
+        state.string_array_value.data.extend(texts)
+        self.states[widget_id] = state
+
+
+async def student(ws_url, rounds, think, latencies, rng):
+    async with websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None) as ws:
+        session = Session(ws)
+
+        async def step(**kwargs):
+            start = time.perf_counter()
+            markdown = await session.rerun(**kwargs)
+            latencies.append(time.perf_counter() - start)
+            if think:
+                await asyncio.sleep(rng.expovariate(1 / think))
+            return markdown
+
+        await step()
+        for _ in range(rounds):
+            view_id, _ = session.find("button_group", key="view")
+            session.choose_many(view_id, [PRESETS_VIEW])
+            await step()
+
+            preset_id, preset = session.find("selectbox")
+            session.choose(preset_id, rng.choice(preset.options))
+            await step()
+
+            session.choose_many(view_id, [CUSTOM_VIEW])
+            await step()
+
+            for i in range(1, 6):
+                radio_id, radio = session.find("radio", key=f"q{i}")
+                session.choose(radio_id, rng.choice(radio.options))
+            submit_id, _ = session.find("button", label="Analyze")
+            markdown = await step(triggers=[submit_id])
+            if not any(m.startswith("**Summary:**") for m in markdown):
+                raise RuntimeError("submit did not produce a report")
+
+
+async def run_class(ws_urls, students, rounds, think, seed=0):
+    """Run ``students`` concurrent sessions, spread round-robin over ``ws_urls``."""
+    latencies = []
+    tasks = [
+        student(ws_urls[i % len(ws_urls)], rounds, think, latencies, random.Random(seed + i))
+        for i in range(students)
+    ]
+    start = time.perf_counter()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, Exception)]
+    return latencies, elapsed, errors
+
+
+def ws_url(http_url):
+    return http_url.rstrip("/").replace("http://", "ws://").replace("https://", "wss://") + "/_stcore/stream"
+
+
+def wait_healthy(ports, timeout=60):
+    deadline = time.monotonic() + timeout
+    for port in ports:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"worker on port {port} did not come up")
+                time.sleep(0.5)
+
+
+def report(label, latencies, elapsed, errors):
+    if not latencies:
+        print(f"{label}: no reruns completed, {len(errors)} errors: {errors[:1]}")
+        return
+    p50, p95, p99 = (statistics.quantiles(latencies, n=100)[i] * 1000 for i in (49, 94, 98))
+    print(
+        f"{label}: {len(latencies) / elapsed:8.1f} reruns/s  "
+        f"p50 {p50:7.1f}  p95 {p95:7.1f}  p99 {p99:7.1f} ms  "
+        f"({len(latencies)} reruns in {elapsed:.1f} s, {len(errors)} failed students)"
+    )
+    for exc in errors[:3]:
+        print(f"    {type(exc).__name__}: {exc}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the app with simulated students.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running deployment")
+    target.add_argument("--spawn", type=int, nargs="+", metavar="N", help="worker counts to start and compare")
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3, help="preset + submit loops per student")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between steps, seconds")
+    parser.add_argument("--base-port", type=int, default=8701)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        report(args.url, *asyncio.run(run_class([ws_url(args.url)], args.students, args.rounds, args.think)))
+        return
+
+    run_dir = tempfile.mkdtemp(prefix="lea-loadtest-")
+    # Keep simulated submissions out of the real history
+    env = worker_env(run_dir, {"LEA_STORE_PATH": os.path.join(run_dir, "loadtest.db")})
+    warm_shared_cache(env["LEA_SHARED_CACHE"])
+    for n in args.spawn:
+        ports = [args.base_port + i for i in range(n)]
+        workers = [
+            start_worker(port, env, os.path.join(run_dir, f"worker-{port}.log"), "loadtest")
+            for port in ports
+        ]
+        try:
+            wait_healthy(ports)
+            urls = [ws_url(f"http://127.0.0.1:{port}") for port in ports]
+            result = asyncio.run(run_class(urls, args.students, args.rounds, args.think))
+        finally:
+            stop(workers)
+        report(f"{n} worker(s)", *result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Process-wide cache hit/miss counters."""
+import threading
+
+
+class CacheMetrics:
+    """Counts lookups against a memoized builder.
+
+    Call ``lookup()`` on every access and ``miss()`` from inside the cached
+    function body, which only runs when the cache has no entry.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self):
+        with self._lock:
+            self.calls += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    @property
+    def hits(self):
+        return max(self.calls - self.misses, 0)
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.calls if self.calls else 0.0
+
+    def snapshot(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def cache_metrics(name):
+    """Return the shared CacheMetrics for ``name``, creating it on first use."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = CacheMetrics(name)
+        return _registry[name]
+
+
+def all_cache_metrics():
+    with _registry_lock:
+        return [m.snapshot() for m in _registry.values()]
@@ -0,0 +1,52 @@
+"""Preset environments from Tang et al. (2025)."""
+import hashlib
+import json
+
+ENVIRONMENTS = {
+    "Traditional computer-assisted (Class 1)": {
+        "Scaffolding": 3,
+        "ICAP engagement": 2,       # mostly Passive/Active
+        "Feedback quality": 3,
+        "Collaboration": 2,
+        "Metacognitive support": 2,
+    },
+    "GenAI-assisted, no teacher (Class 2)": {
+        "Scaffolding": 1,
+        "ICAP engagement": 2,
+        "Feedback quality": 2,
+        "Collaboration": 1,
+        "Metacognitive support": 1,
+    },
+    "GenAI + teacher supervision (Class 3)": {
+        "Scaffolding": 4,
+        "ICAP engagement": 4,       # more Constructive/Interactive
+        "Feedback quality": 4,
+        "Collaboration": 2,
+        "Metacognitive support": 3,
+    },
+}
+
+
+def presets_digest():
+    """Short content hash of ENVIRONMENTS, for cache keys."""
+    data = json.dumps(ENVIRONMENTS, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def preset_profiles(cache=None):
+    """{name: (profile frame, plotly figure)} for every preset.
+
+    With a ``cache`` (a shared_cache.SharedCache), the figures are built by
+    the first process that asks and loaded by the rest.
+    """
+    from charts import profile_figure, profile_frame
+
+    def build():
+        return {
+            name: (profile_frame(scores), profile_figure(profile_frame(scores)))
+            for name, scores in ENVIRONMENTS.items()
+        }
+
+    if cache is None:
+        return build()
+    return cache.get_or_build(f"presets/{presets_digest()}", build)
@@ -0,0 +1,207 @@
+"""Report text for a scored environment.
+
+Scores are discrete, so every report is fully determined by the rubric, the
+five-score tuple and the environment name. ``report_template`` builds the
+text for a score tuple once and keeps it; ``render_report`` only substitutes
+the name. All answer combinations the form can produce are compiled by
+``precompile`` at startup, and any other tuple (presets, imported data) is
+compiled lazily into an LRU cache. The text itself comes from the rubric
+spec; this module only lays it out.
+"""
+import itertools
+from functools import lru_cache
+from string import Template
+from typing import NamedTuple
+
+from rubric import PRINCIPLES, load_rubric
+
+DEFAULT_ENV_NAME = "This environment"
+
+
+# --------- label helpers --------- #
+def icap_label(score, rubric=None):
+    return (rubric or load_rubric()).questions[1].label(score)
+
+
+def level_label(score, rubric=None):
+    return (rubric or load_rubric()).questions[0].label(score)
+
+
+def capitalize_first(s: str) -> str:
+    return s[0].upper() + s[1:] if s else s
+
+
+def display_name(env_name):
+    env_name = (env_name or "").strip()
+    return env_name if env_name else DEFAULT_ENV_NAME
+
+
+# --------- report assembly --------- #
+class ReportTemplate(NamedTuple):
+    """Report text for one score tuple; ``$env`` marks the environment name."""
+
+    scores: tuple
+    labels: tuple
+    summary_line: Template
+    impact_text: str
+    icap_text: str
+    details: tuple
+    interpretation_text: str
+    improvement_paragraph: str
+    download_text: Template
+
+
+class Report(NamedTuple):
+    """A rendered report for one named environment."""
+
+    env_name: str
+    scores: dict
+    labels: dict
+    summary_line: str
+    impact_text: str
+    icap_text: str
+    details: tuple
+    interpretation_text: str
+    improvement_paragraph: str
+    download_text: str
+
+    def as_dict(self):
+        """Structured form of the report, e.g. for JSON export."""
+        return {
+            "env_name": self.env_name,
+            "scores": dict(self.scores),
+            "labels": dict(self.labels),
+            "summary": self.summary_line,
+            "impact": self.impact_text,
+            "icap": self.icap_text,
+            "details": list(self.details),
+            "improvements": self.improvement_paragraph,
+        }
+
+
+def _detail(question, score):
+    return (
+        f"**{question.principle}**  \n"
+        f"- Score: {score}/5 ({capitalize_first(question.label(score))})  \n"
+        f"• {question.details[question.band(score)]}"
+    )
+
+
+def compile_report(scores, rubric=None):
+    """Build the ReportTemplate for a (scaffolding, icap, feedback, collab, meta) tuple."""
+    rubric = rubric or load_rubric()
+    questions = rubric.questions
+    scores = tuple(int(s) for s in scores)
+    labels = tuple(q.label(s) for q, s in zip(questions, scores))
+
+    icap_text = questions[1].details[questions[1].band(scores[1])]
+
+    summary_line = rubric.summary.format(
+        env="$env",
+        **{f"{q.key}_label": label for q, label in zip(questions, labels)},
+        **{f"{q.key}_score": s for q, s in zip(questions, scores)},
+    )
+
+    impact_text = capitalize_first(
+        " ".join(questions[i].impact[questions[i].band(scores[i])] for i in rubric.impact_order)
+    )
+
+    interpretation_text = ""
+    for q, s, label in zip(questions, scores, labels):
+        interpretation_text += f"{q.principle}:\n- Score: {s}/5 ({label})\n"
+        if q.interpretation_detail:
+            interpretation_text += f"- {q.details[q.band(s)]}\n"
+
+    improvements = [
+        questions[i].improvement for i in rubric.improvement_order if scores[i] <= rubric.improve_max
+    ]
+    improvement_paragraph = " ".join(improvements or [rubric.no_improvements])
+
+    score_lines = "".join(
+        f"{q.principle}: {s}/5 ({label})\n" for q, s, label in zip(questions, scores, labels)
+    )
+    download_text = (
+        "Learning Environment Analysis – $env\n\n"
+        f"{score_lines}\n"
+        f"Summary:\n{summary_line}\n\n"
+        f"Impact on learning:\n{impact_text}\n\n"
+        "Interpretation:\n"
+        f"{interpretation_text}\n\n"
+        "Design improvement summary:\n"
+        f"{improvement_paragraph}\n"
+    )
+
+    return ReportTemplate(
+        scores=scores,
+        labels=labels,
+        summary_line=Template(summary_line),
+        impact_text=impact_text,
+        icap_text=icap_text,
+        details=tuple(_detail(q, s) for q, s in zip(questions, scores)),
+        interpretation_text=interpretation_text,
+        improvement_paragraph=improvement_paragraph,
+        download_text=Template(download_text),
+    )
+
+
+# Every tuple the form can produce, keyed by (rubric digest, scores);
+# filled by precompile()
+_TABLE = {}
+
+
+@lru_cache(maxsize=4096)
+def _compile_cached(scores, rubric):
+    return compile_report(scores, rubric)
+
+
+def precompile(rubric=None, cache=None):
+    """Compile the report for every answer combination; return the count.
+
+    With a ``cache`` (e.g. a shared_cache.SharedCache), the compiled table is
+    loaded from it when another process has already built it.
+    """
+    rubric = rubric or load_rubric()
+    combos = list(itertools.product(*rubric.score_levels))
+    if cache is not None:
+        templates = cache.get_or_build(
+            f"reports/{rubric.digest}", lambda: [compile_report(s, rubric) for s in combos]
+        )
+        for template in templates:
+            _TABLE.setdefault((rubric.digest, template.scores), template)
+        return len(templates)
+    for scores in combos:
+        key = (rubric.digest, scores)
+        if key not in _TABLE:
+            _TABLE[key] = compile_report(scores, rubric)
+    return len(combos)
+
+
+def report_template(scores, rubric=None):
+    """ReportTemplate for a score tuple or score dict (in PRINCIPLES order)."""
+    rubric = rubric or load_rubric()
+    if isinstance(scores, dict):
+        scores = tuple(int(scores[p]) for p in PRINCIPLES)
+    else:
+        scores = tuple(int(s) for s in scores)
+    template = _TABLE.get((rubric.digest, scores))
+    if template is None:
+        template = _compile_cached(scores, rubric)
+    return template
+
+
+def render_report(scores, env_name="", rubric=None):
+    """Full Report for a score tuple/dict and an (optional) environment name."""
+    template = report_template(scores, rubric)
+    name = display_name(env_name)
+    return Report(
+        env_name=name,
+        scores=dict(zip(PRINCIPLES, template.scores)),
+        labels=dict(zip(PRINCIPLES, template.labels)),
+        summary_line=template.summary_line.safe_substitute(env=name),
+        impact_text=template.impact_text,
+        icap_text=template.icap_text,
+        details=template.details,
+        interpretation_text=template.interpretation_text,
+        improvement_paragraph=template.improvement_paragraph,
+        download_text=template.download_text.safe_substitute(env=name),
+    )
@@ -0,0 +1,233 @@
+"""Rubric spec: load ``rubric.yaml`` once and compile it into lookup tables.
+
+The spec holds everything institution-specific: questions, answer options
+and their scores, keyword rules for free-text answers, the lexicon of the
+text classifier, the score bands used for labels, and the report's feedback
+text. ``load_rubric`` compiles it into a ``Rubric`` whose per-question score
+arrays are indexed by option number and whose label/band tables are indexed
+by score, so scoring and labelling are single index lookups. Compiled
+rubrics are cached by the SHA-256 of the spec file, so editing the file
+takes effect without a restart while an unchanged file is never parsed
+twice.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from config import RUBRIC_PATH
+
+# The rubric may change everything except the principles themselves, which
+# the store schema, charts and exports are built around.
+PRINCIPLES = [
+    "Scaffolding",
+    "ICAP engagement",
+    "Feedback quality",
+    "Collaboration",
+    "Metacognitive support",
+]
+
+MAX_SCORE = 5
+
+
+class Scale(NamedTuple):
+    """Band name and display label for every score 0..MAX_SCORE."""
+
+    bands: tuple
+    labels: tuple
+
+
+class Question(NamedTuple):
+    principle: str
+    key: str
+    text: str
+    options: tuple
+    scores: np.ndarray
+    option_index: dict
+    keywords: tuple
+    fallback: int
+    scale: Scale
+    details: dict
+    impact: dict
+    improvement: str
+    interpretation_detail: bool
+    lexicon: tuple
+
+    def score(self, option):
+        """Score of the option at index ``option``."""
+        return int(self.scores[option])
+
+    def match(self, answer):
+        """Score a free-text answer: exact option, then keywords, then fallback."""
+        option = self.option_index.get(answer)
+        if option is not None:
+            return int(self.scores[option])
+        for keyword, score in self.keywords:
+            if keyword in answer:
+                return score
+        return self.fallback
+
+    def band(self, score):
+        return self.scale.bands[_clamp(score)]
+
+    def label(self, score):
+        return self.scale.labels[_clamp(score)]
+
+
+class Rubric(NamedTuple):
+    version: int
+    name: str
+    digest: str
+    questions: tuple
+    summary: str
+    impact_order: tuple
+    improvement_order: tuple
+    improve_max: int
+    no_improvements: str
+
+    # Compiled rubrics are identified by their spec's content hash
+    def __hash__(self):
+        return hash(self.digest)
+
+    def __eq__(self, other):
+        return isinstance(other, Rubric) and other.digest == self.digest
+
+    @property
+    def score_levels(self):
+        """Distinct scores each question's options can produce."""
+        return [tuple(sorted({int(s) for s in q.scores})) for q in self.questions]
+
+    def score_options(self, options):
+        """Scores for one option index per question, keyed by principle."""
+        return {q.principle: int(q.scores[i]) for q, i in zip(self.questions, options)}
+
+
+def _clamp(score):
+    return min(max(int(score), 0), MAX_SCORE)
+
+
+def _compile_scale(name, bands):
+    if not bands or "max" in bands[-1]:
+        raise ValueError(f"Scale {name!r} needs a final band without 'max'")
+    band_of, label_of = [], []
+    for score in range(MAX_SCORE + 1):
+        band = next(b for b in bands if "max" not in b or score <= b["max"])
+        band_of.append(band["band"])
+        label_of.append(band["label"])
+    return Scale(tuple(band_of), tuple(label_of))
+
+
+def _compile_question(spec, scales, lexicon):
+    key = spec["key"]
+    scale = scales.get(spec["scale"])
+    if scale is None:
+        raise ValueError(f"Principle {spec['name']!r} uses unknown scale {spec['scale']!r}")
+    options = tuple(o["text"] for o in spec["options"])
+    scores = np.array([o["score"] for o in spec["options"]], dtype=np.uint8)
+    if scores.max(initial=0) > MAX_SCORE:
+        raise ValueError(f"Scores for {spec['name']!r} must be between 0 and {MAX_SCORE}")
+    keywords = tuple(
+        (keyword, int(o["score"])) for o in spec["options"] for keyword in o.get("keywords", ())
+    )
+    missing = set(scale.bands) - set(spec.get("details", {}))
+    if missing:
+        raise ValueError(f"Principle {spec['name']!r} has no details text for bands {sorted(missing)}")
+    return Question(
+        principle=spec["name"],
+        key=key,
+        text=spec["question"],
+        options=options,
+        scores=scores,
+        option_index={text: i for i, text in enumerate(options)},
+        keywords=keywords,
+        fallback=int(spec.get("fallback", scores[-1])),
+        scale=scale,
+        details=dict(spec["details"]),
+        impact=dict(spec.get("impact", {})),
+        improvement=spec.get("improvement", ""),
+        interpretation_detail=bool(spec.get("interpretation_detail", False)),
+        lexicon=tuple(
+            (int(score), str(term))
+            for score, terms in sorted(lexicon.get(key, {}).items())
+            for term in terms
+        ),
+    )
+
+
+def compile_rubric(spec, digest=""):
+    """Validate a parsed spec dict and compile it into a Rubric."""
+    scales = {name: _compile_scale(name, bands) for name, bands in spec["scales"].items()}
+    lexicon = spec.get("lexicon", {})
+    questions = tuple(_compile_question(p, scales, lexicon) for p in spec["principles"])
+    names = [q.principle for q in questions]
+    if names != PRINCIPLES:
+        raise ValueError(f"Rubric principles must be {PRINCIPLES} in that order, got {names}")
+
+    keys = {q.key: i for i, q in enumerate(questions)}
+    unknown = set(lexicon) - set(keys)
+    if unknown:
+        raise ValueError(f"lexicon names unknown principle keys {sorted(unknown)}")
+    for q in questions:
+        if any(not 0 <= score <= MAX_SCORE for score, _ in q.lexicon):
+            raise ValueError(f"Lexicon scores for {q.principle!r} must be between 0 and {MAX_SCORE}")
+    for field in ("impact_order", "improvement_order"):
+        unknown = set(spec.get(field, ())) - set(keys)
+        if unknown:
+            raise ValueError(f"{field} names unknown principle keys {sorted(unknown)}")
+    for key in spec.get("impact_order", ()):
+        missing = set(questions[keys[key]].scale.bands) - set(questions[keys[key]].impact)
+        if missing:
+            raise ValueError(f"Principle {key!r} has no impact text for bands {sorted(missing)}")
+
+    return Rubric(
+        version=int(spec.get("version", 1)),
+        name=spec.get("name", ""),
+        digest=digest,
+        questions=questions,
+        summary=spec["summary"],
+        impact_order=tuple(keys[k] for k in spec.get("impact_order", ())),
+        improvement_order=tuple(keys[k] for k in spec.get("improvement_order", ())),
+        improve_max=int(spec.get("improve_max", 2)),
+        no_improvements=spec.get("no_improvements", ""),
+    )
+
+
+def parse_spec(data, path=""):
+    """Parse spec file bytes as JSON (``.json``) or YAML."""
+    if str(path).endswith(".json"):
+        return json.loads(data)
+    import yaml
+
+    return yaml.safe_load(data)
+
+
+_compiled = {}
+_by_stat = {}
+_lock = threading.Lock()
+
+
+def load_rubric(path=None):
+    """Compiled Rubric for the spec at ``path`` (default: config.RUBRIC_PATH).
+
+    The file is only re-read when its size or mtime changes, and only
+    re-compiled when its content hash changes.
+    """
+    path = os.path.abspath(path or RUBRIC_PATH)
+    stat = os.stat(path)
+    stat_key = (path, stat.st_mtime_ns, stat.st_size)
+    rubric = _by_stat.get(stat_key)
+    if rubric is not None:
+        return rubric
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    with _lock:
+        rubric = _compiled.get(digest)
+        if rubric is None:
+            rubric = _compiled[digest] = compile_rubric(parse_spec(data, path), digest)
+        _by_stat[stat_key] = rubric
+    return rubric
@@ -0,0 +1,274 @@
+"""Compact columnar container for many environments' scores.
+
+A ``ScoreTable`` holds the five principle scores as one ``(5, n)`` uint8
+array (each principle's column is contiguous), and the environment names and
+cohort tags dictionary-encoded: an integer code per row, in the smallest
+unsigned dtype that fits, plus one list of distinct values. A million
+environments with distinct names take about 10 MB of arrays (5 bytes of
+scores, a 4-byte name code, a 1-byte cohort code); with repeated names, less.
+
+Slicing with ``table[start:stop]`` is zero-copy (the arrays are views and
+the dictionaries are shared); boolean masks and index arrays copy, as in
+NumPy. ``save`` writes one ``.npy`` file per array plus a JSON dictionary,
+and ``load`` memory-maps the arrays, so opening a saved table is instant
+and only the pages that are touched are read.
+
+Adapters connect it to the rest of the app: ``scores_dict``/``report`` for
+one row (the form's score format and the report text), ``mean_profile`` for
+the profile chart, ``distribution`` for score histograms, ``as_block`` for
+the Compare view, and ``to_arrow``/``to_frame`` for Arrow and pandas.
+"""
+import json
+import os
+
+import numpy as np
+
+from rubric import MAX_SCORE, PRINCIPLES
+
+NO_COHORT = ""
+
+
+def _code_dtype(size):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if size <= np.iinfo(dtype).max + 1:
+            return dtype
+    return np.uint64
+
+
+def _encode(values):
+    """(codes, dictionary) for a sequence of strings, in first-seen order."""
+    index, codes = {}, []
+    for value in values:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index)
+        codes.append(code)
+    return np.array(codes, dtype=_code_dtype(len(index))), list(index)
+
+
+class ScoreTable:
+    """Five uint8 score columns plus dictionary-encoded names and cohorts."""
+
+    def __init__(self, scores, env_codes, env_names, cohort_codes, cohorts):
+        scores = np.asarray(scores)
+        if scores.ndim != 2 or scores.shape[0] != len(PRINCIPLES):
+            raise ValueError(f"scores must have shape ({len(PRINCIPLES)}, n), got {scores.shape}")
+        if len(env_codes) != scores.shape[1] or len(cohort_codes) != scores.shape[1]:
+            raise ValueError("scores, env_codes and cohort_codes must have the same length")
+        self.scores = scores
+        self.env_codes = env_codes
+        self.env_names = env_names
+        self.cohort_codes = cohort_codes
+        self.cohorts = cohorts
+
+    # --------- construction --------- #
+    @classmethod
+    def from_arrays(cls, scores, env_names=None, cohorts=None):
+        """Build from an (n, 5) score matrix and optional per-row names/cohorts."""
+        matrix = np.asarray(scores)
+        if matrix.ndim != 2 or matrix.shape[1] != len(PRINCIPLES):
+            raise ValueError(f"scores must have shape (n, {len(PRINCIPLES)}), got {matrix.shape}")
+        if len(matrix) and (matrix.min() < 0 or matrix.max() > MAX_SCORE):
+            raise ValueError(f"Scores must be between 0 and {MAX_SCORE}")
+        n = len(matrix)
+        env_codes, env_dict = _encode(env_names if env_names is not None else [""] * n)
+        cohort_codes, cohort_dict = _encode(
+            (c or NO_COHORT for c in cohorts) if cohorts is not None else [NO_COHORT] * n
+        )
+        columns = np.ascontiguousarray(matrix.T, dtype=np.uint8)
+        return cls(columns, env_codes, env_dict, cohort_codes, cohort_dict)
+
+    @classmethod
+    def from_dicts(cls, profiles, cohort=None):
+        """Build from {name: scores dict}, e.g. presets.ENVIRONMENTS."""
+        matrix = np.array([[s[p] for p in PRINCIPLES] for s in profiles.values()], dtype=np.uint8)
+        return cls.from_arrays(
+            matrix.reshape(len(profiles), len(PRINCIPLES)), list(profiles), [cohort] * len(profiles)
+        )
+
+    @classmethod
+    def from_frame(cls, df, name_column="env_name", cohort_column="cohort"):
+        """Build from a DataFrame with one column per principle.
+
+        Categorical name/cohort columns are used as they are, without
+        re-encoding.
+        """
+        import pandas as pd
+
+        scores = df[PRINCIPLES]
+        if any(dtype.kind not in "iuf" for dtype in scores.dtypes):
+            # Text columns, e.g. a CSV read with dtype=str; "x" raises ValueError
+            scores = scores.apply(pd.to_numeric, errors="raise")
+        matrix = scores.to_numpy()
+        if matrix.dtype.kind not in "iu":
+            if matrix.dtype.kind != "f" or not np.array_equal(matrix, np.round(matrix)):
+                raise ValueError("Scores must be whole numbers")
+        table = cls.from_arrays(matrix)
+        for column, codes_attr, dict_attr in (
+            (name_column, "env_codes", "env_names"),
+            (cohort_column, "cohort_codes", "cohorts"),
+        ):
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if hasattr(values, "cat"):
+                codes = values.cat.codes.to_numpy()
+                dictionary = [str(v) for v in values.cat.categories]
+                if (codes < 0).any():
+                    codes = np.where(codes < 0, len(dictionary), codes)
+                    dictionary.append("")
+                setattr(table, codes_attr, codes.astype(_code_dtype(len(dictionary))))
+                setattr(table, dict_attr, dictionary)
+            else:
+                import pandas as pd
+
+                codes, uniques = pd.factorize(values.fillna("").astype(str))
+                setattr(table, codes_attr, codes.astype(_code_dtype(len(uniques))))
+                setattr(table, dict_attr, uniques.tolist())
+        return table
+
+    @classmethod
+    def from_file(cls, path, name_column=None, cohort_column=None, chunksize=200_000):
+        """Stream a scored CSV/Parquet file (see batch_score.py) into a table."""
+        from scoring import read_chunks
+
+        columns = list(PRINCIPLES) + [c for c in (name_column, cohort_column) if c]
+        parts = [
+            cls.from_frame(chunk, name_column or "", cohort_column or "")
+            for chunk in read_chunks(path, chunksize, columns=columns)
+        ]
+        return cls.concat(parts) if parts else cls.from_arrays(np.empty((0, len(PRINCIPLES))))
+
+    @classmethod
+    def concat(cls, tables):
+        """One table from several, merging their dictionaries."""
+        tables = list(tables)
+        merged = []
+        for codes_attr, dict_attr in (("env_codes", "env_names"), ("cohort_codes", "cohorts")):
+            index = {}
+            remapped = []
+            for t in tables:
+                dictionary = getattr(t, dict_attr)
+                mapping = np.array([index.setdefault(v, len(index)) for v in dictionary], dtype=np.int64)
+                remapped.append(mapping[getattr(t, codes_attr)] if len(mapping) else getattr(t, codes_attr))
+            codes = np.concatenate(remapped) if remapped else np.empty(0, dtype=np.uint8)
+            merged.append((codes.astype(_code_dtype(len(index))), list(index)))
+        scores = np.concatenate([t.scores for t in tables], axis=1) if tables else np.empty((5, 0), np.uint8)
+        (env_codes, env_names), (cohort_codes, cohorts) = merged
+        return cls(scores, env_codes, env_names, cohort_codes, cohorts)
+
+    # --------- persistence --------- #
+    def save(self, path):
+        """Write the table to directory ``path``."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "scores.npy"), np.ascontiguousarray(self.scores))
+        np.save(os.path.join(path, "env_codes.npy"), np.ascontiguousarray(self.env_codes))
+        np.save(os.path.join(path, "cohort_codes.npy"), np.ascontiguousarray(self.cohort_codes))
+        with open(os.path.join(path, "dictionary.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {"principles": PRINCIPLES, "env_names": self.env_names, "cohorts": self.cohorts},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open a saved table; arrays are memory-mapped read-only unless ``mmap=False``."""
+        with open(os.path.join(path, "dictionary.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("principles", PRINCIPLES) != PRINCIPLES:
+            raise ValueError(f"Table at {path!r} was saved for principles {meta['principles']}")
+        mode = "r" if mmap else None
+        return cls(
+            np.load(os.path.join(path, "scores.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "env_codes.npy"), mmap_mode=mode),
+            meta["env_names"],
+            np.load(os.path.join(path, "cohort_codes.npy"), mmap_mode=mode),
+            meta["cohorts"],
+        )
+
+    # --------- access --------- #
+    def __len__(self):
+        return self.scores.shape[1]
+
+    def __getitem__(self, rows):
+        """Rows ``rows`` (slice: zero-copy view; mask or indices: copy)."""
+        if isinstance(rows, (int, np.integer)):
+            raise TypeError("Use scores_dict(i) or report(i) for a single row")
+        return ScoreTable(
+            self.scores[:, rows], self.env_codes[rows], self.env_names, self.cohort_codes[rows], self.cohorts
+        )
+
+    @property
+    def nbytes(self):
+        return self.scores.nbytes + self.env_codes.nbytes + self.cohort_codes.nbytes
+
+    def column(self, principle):
+        """Contiguous uint8 scores of one principle (name or index)."""
+        i = PRINCIPLES.index(principle) if isinstance(principle, str) else principle
+        return self.scores[i]
+
+    def matrix(self, dtype=np.float32):
+        """(n, 5) score matrix, e.g. for compare.py."""
+        return self.scores.T.astype(dtype)
+
+    def names(self):
+        return np.asarray(self.env_names, dtype=object)[self.env_codes].tolist()
+
+    def cohort(self, name):
+        """Rows tagged with cohort ``name`` (a copy)."""
+        if name not in self.cohorts:
+            return self[np.zeros(len(self), dtype=bool)]
+        return self[self.cohort_codes == self.cohorts.index(name)]
+
+    # --------- adapters --------- #
+    def scores_dict(self, i):
+        """Scores of row ``i`` keyed by principle, like the form's ``custom_scores``."""
+        return dict(zip(PRINCIPLES, self.scores[:, i].tolist()))
+
+    def env_name(self, i):
+        return self.env_names[self.env_codes[i]]
+
+    def report(self, i, rubric=None):
+        """The rendered report of row ``i``."""
+        from report import render_report
+
+        return render_report(tuple(self.scores[:, i].tolist()), self.env_name(i), rubric)
+
+    def mean_profile(self):
+        """Mean score per principle, for charts.profile_frame / show_profile."""
+        if not len(self):
+            return dict.fromkeys(PRINCIPLES, 0.0)
+        # Sum in uint64 so a million rows can't overflow
+        sums = self.scores.sum(axis=1, dtype=np.uint64)
+        return {p: round(float(s) / len(self), 2) for p, s in zip(PRINCIPLES, sums)}
+
+    def distribution(self):
+        """(MAX_SCORE + 1, 5) int64 counts: rows are scores 0..5, columns principles."""
+        return np.stack([np.bincount(col, minlength=MAX_SCORE + 1) for col in self.scores], axis=1)
+
+    def as_block(self):
+        """(names, float32 matrix) for compare.stack."""
+        return self.names(), self.matrix()
+
+    def to_arrow(self):
+        """pyarrow Table with dictionary-encoded name/cohort columns (no copies of the scores)."""
+        import pyarrow as pa
+
+        columns = {p: pa.array(self.scores[i]) for i, p in enumerate(PRINCIPLES)}
+        columns["env_name"] = pa.DictionaryArray.from_arrays(
+            pa.array(self.env_codes), pa.array(self.env_names, type=pa.string())
+        )
+        columns["cohort"] = pa.DictionaryArray.from_arrays(
+            pa.array(self.cohort_codes), pa.array(self.cohorts, type=pa.string())
+        )
+        return pa.table(columns)
+
+    def to_frame(self):
+        """pandas DataFrame with categorical name/cohort columns."""
+        import pandas as pd
+
+        df = pd.DataFrame({p: self.scores[i] for i, p in enumerate(PRINCIPLES)}, copy=False)
+        df["env_name"] = pd.Categorical.from_codes(self.env_codes.astype(np.int64), self.env_names)
+        df["cohort"] = pd.Categorical.from_codes(self.cohort_codes.astype(np.int64), self.cohorts)
+        return df
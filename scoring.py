@@ -0,0 +1,153 @@
+"""Map survey answers to the five design-principle scores.
+
+Answers are scored against the compiled rubric (``rubric.yaml``): the form
+scores option indices with one array lookup per question, and ``score_frame``
+does the same for a whole table of answers: each column is factorized once,
+only the distinct answers are matched against the rubric, and every row is
+then scored with one NumPy gather over the category codes.
+"""
+import numpy as np
+import pandas as pd
+
+from rubric import PRINCIPLES, load_rubric
+
+# Default survey column for each question, in PRINCIPLES order
+ANSWER_COLUMNS = ["q1", "q2", "q3", "q4", "q5"]
+
+# Score written for a missing/blank answer in batch mode
+UNANSWERED = 0
+
+
+# --------- single-answer helpers --------- #
+def map_scaffolding(a):
+    return load_rubric().questions[0].match(a)
+
+
+def map_icap(a):
+    return load_rubric().questions[1].match(a)
+
+
+def map_feedback(a):
+    return load_rubric().questions[2].match(a)
+
+
+def map_collab(a):
+    return load_rubric().questions[3].match(a)
+
+
+def map_meta(a):
+    return load_rubric().questions[4].match(a)
+
+
+def score_answers(q1, q2, q3, q4, q5, rubric=None):
+    """Score one set of answer texts, keyed by design principle."""
+    rubric = rubric or load_rubric()
+    answers = (q1, q2, q3, q4, q5)
+    return {q.principle: q.match(a) for q, a in zip(rubric.questions, answers)}
+
+
+def score_options(options, rubric=None):
+    """Score one set of option indices (as returned by the form), keyed by principle."""
+    return (rubric or load_rubric()).score_options(options)
+
+
+# --------- vectorized batch scoring --------- #
+def score_column(values, question):
+    """Score a column of answers with one rubric match per distinct answer."""
+    codes, uniques = pd.factorize(pd.Series(values, copy=False).astype("string").str.strip())
+    # Slot 0 of the lookup table is reserved for missing answers (code -1)
+    lookup = np.empty(len(uniques) + 1, dtype=np.uint8)
+    lookup[0] = UNANSWERED
+    for i, answer in enumerate(uniques, start=1):
+        lookup[i] = question.match(answer) if answer else UNANSWERED
+    return lookup[codes + 1]
+
+
+def score_frame(df, columns=None, rubric=None):
+    """Return a DataFrame of uint8 principle scores for a table of answers."""
+    rubric = rubric or load_rubric()
+    columns = list(columns or ANSWER_COLUMNS)
+    if len(columns) != len(PRINCIPLES):
+        raise ValueError(
+            f"Expected {len(PRINCIPLES)} answer columns, got {len(columns)}: {columns}"
+        )
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise KeyError(f"Answer columns not found in input: {missing}")
+
+    return pd.DataFrame(
+        {
+            question.principle: score_column(df[col], question)
+            for question, col in zip(rubric.questions, columns)
+        },
+        index=df.index,
+    )
+
+
+def read_chunks(path, chunksize, columns=None):
+    """Yield DataFrame chunks from a CSV or Parquet file."""
+    path = str(path)
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize, usecols=columns, dtype=str)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._parquet = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(
+                self.path,
+                mode="a" if self._wrote_header else "w",
+                header=not self._wrote_header,
+                index=False,
+            )
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def score_file(src, dst, chunksize=50_000, columns=None, keep=None):
+    """Stream ``src`` through ``score_frame`` into ``dst``; return rows scored.
+
+    ``keep`` lists the input columns copied to the output next to the scores
+    (all input columns when None). Only one chunk is held in memory at a time.
+    """
+    columns = list(columns or ANSWER_COLUMNS)
+    usecols = None if keep is None else list(dict.fromkeys([*keep, *columns]))
+    rows = 0
+    with ChunkWriter(dst) as writer:
+        for chunk in read_chunks(src, chunksize, columns=usecols):
+            scored = score_frame(chunk, columns)
+            kept = chunk if keep is None else chunk[list(keep)]
+            writer.write(pd.concat([kept, scored], axis=1))
+            rows += len(chunk)
+    return rows
@@ -0,0 +1,107 @@
+"""Output sections of an analysis, each rebuilt only when its inputs change.
+
+Every section of the "Analyze your own environment" results declares the
+principles whose scores it depends on (and whether it shows the environment
+name). ``SectionMemo`` keeps each section's last inputs and built content per
+session, so on a resubmit only the sections whose inputs changed are built
+again. Change one answer and the chart, download and that principle's
+details are rebuilt; the other details, and the summary, impact and
+improvement text when they don't mention that principle, are reused.
+
+Dependencies come from the rubric: the summary depends on the principles its
+template mentions, impact and improvements on ``impact_order`` and
+``improvement_order``.
+"""
+from functools import lru_cache
+from string import Formatter
+from typing import Callable, NamedTuple
+
+from config import CHART_MODE
+
+
+class Section(NamedTuple):
+    name: str
+    depends: tuple  # principle indices
+    uses_name: bool
+    build: Callable  # (report) -> content
+
+
+def _summary_depends(rubric):
+    keys = {q.key: i for i, q in enumerate(rubric.questions)}
+    fields = {field for _, field, _, _ in Formatter().parse(rubric.summary) if field}
+    return tuple(
+        sorted({keys[f.rsplit("_", 1)[0]] for f in fields if f.rsplit("_", 1)[0] in keys})
+    )
+
+
+@lru_cache(maxsize=512)
+def _profile_figure(principles, scores):
+    # Shared by every session, like the preset figures; nothing mutates them
+    from charts import profile_figure, profile_frame
+
+    return profile_figure(profile_frame(dict(zip(principles, scores))))
+
+
+def _chart(report):
+    # Only the plotly figure is worth keeping; svg/vega are cached per score tuple
+    if CHART_MODE != "plotly":
+        return None
+    return _profile_figure(tuple(report.scores), tuple(report.scores.values()))
+
+
+def _downloads(report):
+    from export import to_json
+
+    return report.download_text, to_json(report)
+
+
+def _detail(i):
+    return lambda report: report.details[i]
+
+
+@lru_cache(maxsize=8)
+def report_sections(rubric):
+    """The results' sections for ``rubric``, in display order."""
+    every = tuple(range(len(rubric.questions)))
+    return (
+        Section("summary", _summary_depends(rubric), True, lambda r: r.summary_line),
+        Section("impact", tuple(sorted(rubric.impact_order)), False, lambda r: r.impact_text),
+        Section("chart", every, False, _chart),
+        *(Section(f"details/{q.key}", (i,), False, _detail(i)) for i, q in enumerate(rubric.questions)),
+        Section("improvements", tuple(sorted(rubric.improvement_order)), False, lambda r: r.improvement_paragraph),
+        Section("downloads", every, True, _downloads),
+    )
+
+
+class SectionMemo:
+    """Last inputs and content of each section, for one session."""
+
+    def __init__(self):
+        self._entries = {}
+
+    def resolve(self, sections, rubric, report):
+        """{name: content} for ``report``, and the names that had to be rebuilt."""
+        scores = tuple(report.scores.values())
+        contents, rebuilt = {}, []
+        for section in sections:
+            key = (
+                rubric.digest,
+                tuple(scores[i] for i in section.depends),
+                report.env_name if section.uses_name else None,
+            )
+            entry = self._entries.get(section.name)
+            if entry is None or entry[0] != key:
+                entry = self._entries[section.name] = (key, section.build(report))
+                rebuilt.append(section.name)
+            contents[section.name] = entry[1]
+        return contents, rebuilt
+
+    def nbytes(self):
+        """Approximate memory held by this memo, for session_resources budgets."""
+        from session_resources import estimate_size
+
+        # The chart figure comes from the shared _profile_figure cache, which
+        # this memo doesn't own; evicting the memo wouldn't free it
+        return estimate_size(
+            {name: entry for name, entry in self._entries.items() if name != "chart"}
+        )
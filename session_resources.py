@@ -0,0 +1,252 @@
+"""Per-session memory accounting with budgets, LRU eviction and idle expiry.
+
+Sessions keep their heavier objects (the section memo with its report text
+and downloads, uploaded batches) in a ``SessionResources`` registry instead
+of ``st.session_state``. The registry owns the only long-lived reference,
+so evicting an entry frees its memory. Each entry has a size estimate, and
+the registry enforces two limits:
+
+- a per-session budget: a session over it loses its own least recently
+  used entries
+- a global budget for the process: over it, the least recently used entry
+  of any session goes first
+
+A session idle for ``idle_timeout`` loses everything it holds, and so does
+one that has ended (``is_active`` says so) after a short grace period for
+reconnects. Sweeps happen on activity, at most every ``sweep_interval``
+seconds. An evicted entry's ``on_evict`` callback runs (e.g. to drop the
+upload from Streamlit's file manager), and the session gets a notice it can
+show once. Evicted content is rebuilt on next use.
+"""
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Ended sessions are kept this long in case the browser reconnects
+ENDED_GRACE = 120
+
+
+def estimate_size(obj, _seen=None):
+    """Approximate bytes held by ``obj`` and everything it references."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):  # pandas DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "nbytes") and not isinstance(obj, type):  # NumPy arrays, ScoreTable
+        return int(obj.nbytes) + sys.getsizeof(obj)
+    if hasattr(obj, "to_plotly_json"):  # plotly figures
+        return estimate_size(obj.to_plotly_json(), seen)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "on_evict")
+
+    def __init__(self, value, nbytes, on_evict):
+        self.value = value
+        self.nbytes = nbytes
+        self.on_evict = on_evict
+
+
+class _Session:
+    __slots__ = ("entries", "nbytes", "last_seen", "notices")
+
+    def __init__(self, now):
+        self.entries = {}
+        self.nbytes = 0
+        self.last_seen = now
+        self.notices = set()
+
+
+class SessionResources:
+    """Registry of per-session objects with per-session and global byte budgets."""
+
+    def __init__(
+        self,
+        session_budget,
+        global_budget,
+        idle_timeout=1800,
+        sweep_interval=30,
+        is_active=None,
+        clock=time.monotonic,
+    ):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self.is_active = is_active
+        self.clock = clock
+        self.total = 0
+        self.evictions = Counter()  # reason -> entries
+        self.evicted_bytes = Counter()  # reason -> bytes
+        self._sessions = {}
+        self._lru = OrderedDict()  # (session, key), least recently used first
+        self._last_sweep = clock()
+        self._lock = threading.RLock()
+
+    # --------- entries --------- #
+    def put(self, session, key, value, nbytes=None, on_evict=None):
+        """Store ``value`` for ``session`` and return it; evicts to stay in budget."""
+        nbytes = estimate_size(value) if nbytes is None else nbytes
+        with self._lock:
+            state = self._session(session)
+            old = state.entries.get(key)
+            if old is not None:
+                self._remove(session, state, key, reason=None)
+            state.entries[key] = _Entry(value, nbytes, on_evict)
+            state.nbytes += nbytes
+            self.total += nbytes
+            self._lru[(session, key)] = None
+            self._enforce(session, state)
+        return value
+
+    def get(self, session, key, default=None):
+        """The value stored under ``key`` (marking it recently used), or ``default``."""
+        with self._lock:
+            state = self._sessions.get(session)
+            entry = state.entries.get(key) if state is not None else None
+            if entry is None:
+                return default
+            state.last_seen = self.clock()
+            self._lru.move_to_end((session, key))
+            return entry.value
+
+    def get_or_create(self, session, key, factory):
+        value = self.get(session, key, _MISSING)
+        return self.put(session, key, factory(), 0) if value is _MISSING else value
+
+    def resize(self, session, key, nbytes=None):
+        """Update an entry's size after it changed in place (``None`` re-estimates it)."""
+        with self._lock:
+            state = self._sessions.get(session)
+            entry = state.entries.get(key) if state is not None else None
+            if entry is None:
+                return
+            nbytes = estimate_size(entry.value) if nbytes is None else nbytes
+            state.nbytes += nbytes - entry.nbytes
+            self.total += nbytes - entry.nbytes
+            entry.nbytes = nbytes
+            self._lru.move_to_end((session, key))
+            self._enforce(session, state)
+
+    def discard(self, session, key):
+        with self._lock:
+            state = self._sessions.get(session)
+            if state is not None and key in state.entries:
+                self._remove(session, state, key, reason=None)
+
+    def pop_notice(self, session, key):
+        """True once after ``key`` of ``session`` was evicted (to tell the user)."""
+        with self._lock:
+            state = self._sessions.get(session)
+            if state is None or key not in state.notices:
+                return False
+            state.notices.discard(key)
+            return True
+
+    # --------- sessions --------- #
+    def touch(self, session):
+        """Record activity of ``session``; sweeps idle and ended sessions now and then."""
+        with self._lock:
+            self._session(session)
+            if self.clock() - self._last_sweep >= self.sweep_interval:
+                self.sweep()
+
+    def drop_session(self, session, reason="ended"):
+        with self._lock:
+            state = self._sessions.pop(session, None)
+            if state is None:
+                return
+            for key in list(state.entries):
+                self._remove(session, state, key, reason)
+
+    def sweep(self):
+        """Drop idle sessions, and ended ones after ENDED_GRACE; returns how many."""
+        with self._lock:
+            now = self._last_sweep = self.clock()
+            dropped = 0
+            for session, state in list(self._sessions.items()):
+                idle = now - state.last_seen
+                if idle >= self.idle_timeout:
+                    self.drop_session(session, "idle")
+                elif idle >= ENDED_GRACE and self.is_active is not None and not self.is_active(session):
+                    self.drop_session(session, "ended")
+                else:
+                    continue
+                dropped += 1
+            return dropped
+
+    def usage(self):
+        """Current totals, budgets, eviction counts and per-session usage (largest first)."""
+        with self._lock:
+            now = self.clock()
+            sessions = sorted(
+                (
+                    {
+                        "session": session,
+                        "bytes": state.nbytes,
+                        "entries": len(state.entries),
+                        "idle_s": now - state.last_seen,
+                    }
+                    for session, state in self._sessions.items()
+                ),
+                key=lambda row: -row["bytes"],
+            )
+            return {
+                "total": self.total,
+                "global_budget": self.global_budget,
+                "session_budget": self.session_budget,
+                "sessions": sessions,
+                "evictions": dict(self.evictions),
+                "evicted_bytes": dict(self.evicted_bytes),
+            }
+
+    # --------- internals --------- #
+    def _session(self, session):
+        state = self._sessions.get(session)
+        if state is None:
+            state = self._sessions[session] = _Session(self.clock())
+        else:
+            state.last_seen = self.clock()
+        return state
+
+    def _remove(self, session, state, key, reason):
+        entry = state.entries.pop(key)
+        state.nbytes -= entry.nbytes
+        self.total -= entry.nbytes
+        self._lru.pop((session, key), None)
+        if reason is None:
+            return
+        self.evictions[reason] += 1
+        self.evicted_bytes[reason] += entry.nbytes
+        state.notices.add(key)
+        if entry.on_evict is not None:
+            try:
+                entry.on_evict(entry.value)
+            except Exception as exc:  # an eviction must never fail the rerun that caused it
+                print(f"session_resources: on_evict for {key!r} failed: {exc}", file=sys.stderr)
+
+    def _enforce(self, session, state):
+        if state.nbytes > self.session_budget:
+            for key in [k for s, k in self._lru if s == session]:
+                if state.nbytes <= self.session_budget:
+                    break
+                self._remove(session, state, key, "session budget")
+        while self.total > self.global_budget and self._lru:
+            oldest_session, key = next(iter(self._lru))
+            self._remove(oldest_session, self._sessions[oldest_session], key, "global budget")
+
+
+_MISSING = object()
@@ -0,0 +1,78 @@
+"""Build-once cache shared by every worker process on a machine.
+
+In the multi-process deployment (see ``deploy.py``) each Streamlit worker
+would otherwise build the preset profile figures and compile the report
+table itself. ``SharedCache`` keeps the pickled results in one SQLite file
+(WAL mode, so concurrent readers don't block each other): the first worker
+to ask builds and stores a value, the others load it. Keys include
+everything the value depends on (rubric digest, preset data), so a changed
+rubric simply gets new entries.
+
+Only use it for values this app built itself: entries are unpickled.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+_MISSING = object()
+
+
+class SharedCache:
+    """Pickled key/value entries in a SQLite file, built at most once per key."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at) VALUES (?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), time.time()),
+            )
+
+    def get_or_build(self, key, build):
+        """Stored value for ``key``, or ``build()``'s result, stored for the others.
+
+        Workers that miss at the same time each build the value; the build
+        is deterministic, so whichever write lands last is as good as any.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.set(key, value)
+        return value
+
+    def keys(self):
+        return [k for (k,) in self._conn().execute("SELECT key FROM entries ORDER BY key")]
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM entries")
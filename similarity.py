@@ -0,0 +1,245 @@
+"""Nearest-environment search over five-score profiles.
+
+    index = SimilarityIndex.from_arrays(ids, scores)      # or .load(path)
+    index.knn({"Scaffolding": 3, ...}, k=5)                # [Match(id, distance), ...]
+    index.within(scores, radius=1.5)
+    index.sync(store)                                      # index analyses added since
+
+Scores are whole numbers from 0 to MAX_SCORE, so every profile is one of
+6^5 = 7,776 lattice points (*cells*). The index keeps its ids grouped by
+cell (one array sorted by cell code plus per-cell offsets) and a count per
+cell. A query computes the squared distance from its cell to all 7,776
+cells at once (integers 0..125), uses the per-cell counts to find the
+smallest radius that holds ``k`` ids, and reads ids only from the cells
+inside it. The work is bounded by the lattice, not by the number of stored
+environments, so a million entries answer as fast as a thousand.
+
+Inserts go to a small per-cell buffer that queries also read and that is
+merged into the sorted arrays once it grows past ``MERGE_EVERY``. ``save``
+writes one ``.npy`` file atomically, and ``load`` memory-maps it.
+
+Distances are Euclidean on the raw scores; ties are broken newest (highest
+id) first. Ids are expected to grow with each insert, like the history's.
+Rows the history updates in place (re-imported LMS records) are moved to
+their new cell by ``sync``, which follows the store's update log; a loaded
+index replays that log once, since the file doesn't record its position.
+"""
+import os
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from rubric import MAX_SCORE, PRINCIPLES
+
+MERGE_EVERY = 50_000
+
+_BASE = MAX_SCORE + 1
+_N_CELLS = _BASE ** len(PRINCIPLES)
+_MAX_D2 = MAX_SCORE**2 * len(PRINCIPLES)
+# Score vector of every cell, in cell-code order
+CELLS = np.array(np.unravel_index(np.arange(_N_CELLS), (_BASE,) * len(PRINCIPLES))).T.astype(np.int16)
+_RECORD = np.dtype([("cell", np.uint16), ("id", np.int64)])
+
+
+class Match(NamedTuple):
+    id: object
+    distance: float
+
+
+def _vector(scores):
+    if isinstance(scores, dict):
+        scores = [scores[p] for p in PRINCIPLES]
+    vector = np.asarray(scores, dtype=np.int16).reshape(len(PRINCIPLES))
+    if vector.min() < 0 or vector.max() > MAX_SCORE:
+        raise ValueError(f"Scores must be between 0 and {MAX_SCORE}")
+    return vector
+
+
+def cell_codes(scores):
+    """Cell code of each row of an (n, 5) score matrix."""
+    matrix = np.asarray(scores, dtype=np.int64).reshape(-1, len(PRINCIPLES))
+    if len(matrix) and (matrix.min() < 0 or matrix.max() > MAX_SCORE):
+        raise ValueError(f"Scores must be between 0 and {MAX_SCORE}")
+    return np.ravel_multi_index(matrix.T, (_BASE,) * len(PRINCIPLES)).astype(np.uint16)
+
+
+class SimilarityIndex:
+    """Integer ids of five-score profiles, grouped by lattice cell."""
+
+    def __init__(self, records=None):
+        self._records = records if records is not None else np.empty(0, dtype=_RECORD)
+        self._offsets = np.searchsorted(self._records["cell"], np.arange(_N_CELLS + 1))
+        self.counts = np.diff(self._offsets).astype(np.int64)
+        self._pending = {}  # cell -> [ids], not yet merged into _records
+        self._pending_size = 0
+        self.last_id = int(self._records["id"].max()) if len(self._records) else 0
+        self.last_update = 0  # seq of the last store update applied
+        self.unsaved = 0
+        # Sessions query and sync from several threads
+        self._lock = threading.RLock()
+
+    # --------- construction --------- #
+    @classmethod
+    def from_arrays(cls, ids, scores):
+        """Index ``ids`` (integers) with their (n, 5) ``scores``."""
+        records = np.empty(len(ids), dtype=_RECORD)
+        records["cell"] = cell_codes(scores)
+        records["id"] = ids
+        records.sort(order=["cell", "id"], kind="stable")
+        return cls(records)
+
+    @classmethod
+    def from_store(cls, store):
+        """Index every analysis in an AnalysisStore."""
+        index = cls()
+        index.sync(store)
+        index.merge()
+        return index
+
+    def insert(self, id, scores):
+        """Add one profile; O(1) until the next merge."""
+        cell = int(cell_codes([_vector(scores)])[0])
+        with self._lock:
+            self._pending.setdefault(cell, []).append(int(id))
+            self.counts[cell] += 1
+            self._pending_size += 1
+            self.last_id = max(self.last_id, int(id))
+            self.unsaved += 1
+            if self._pending_size >= MERGE_EVERY:
+                self.merge()
+
+    def insert_many(self, ids, scores):
+        cells = cell_codes(scores)
+        with self._lock:
+            for cell, id in zip(cells.tolist(), np.asarray(ids).tolist()):
+                self._pending.setdefault(cell, []).append(id)
+            np.add.at(self.counts, cells, 1)
+            self._pending_size += len(cells)
+            if len(cells):
+                self.last_id = max(self.last_id, int(np.max(ids)))
+            self.unsaved += len(cells)
+            if self._pending_size >= MERGE_EVERY:
+                self.merge()
+
+    def update_many(self, ids, scores):
+        """Move already indexed ``ids`` to the cells of their new ``scores``."""
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            self.merge()
+            stale = np.isin(self._records["id"], ids)
+            if stale.any():
+                np.subtract.at(self.counts, self._records["cell"][stale], 1)
+                self._records = np.asarray(self._records)[~stale]
+                self._offsets = np.searchsorted(self._records["cell"], np.arange(_N_CELLS + 1))
+            self.insert_many(ids, scores)
+
+    def sync(self, store, chunk=100_000):
+        """Insert the store's analyses with ids above ``last_id`` and apply its
+        in-place updates since ``last_update``; returns how many rows changed."""
+        changed = 0
+        with self._lock:
+            while rows := store.scores_after(self.last_id, chunk):
+                matrix = np.array(rows, dtype=np.int64)
+                self.insert_many(matrix[:, 0], matrix[:, 1:])
+                changed += len(rows)
+                if len(rows) < chunk:
+                    break
+            while rows := store.updated_after(self.last_update, chunk):
+                matrix = np.array(rows, dtype=np.int64)
+                self.update_many(matrix[:, 1], matrix[:, 2:])
+                self.last_update = int(matrix[-1, 0])
+                changed += len(rows)
+                if len(rows) < chunk:
+                    break
+        return changed
+
+    def merge(self):
+        """Fold the insert buffer into the sorted arrays."""
+        with self._lock:
+            if not self._pending_size:
+                return
+            pending = np.empty(self._pending_size, dtype=_RECORD)
+            pending["cell"] = np.repeat(list(self._pending), [len(v) for v in self._pending.values()])
+            pending["id"] = [id for ids in self._pending.values() for id in ids]
+            records = np.concatenate([np.asarray(self._records), pending])
+            records.sort(order=["cell", "id"], kind="stable")
+            self._records = records
+            self._offsets = np.searchsorted(records["cell"], np.arange(_N_CELLS + 1))
+            self._pending, self._pending_size = {}, 0
+
+    # --------- persistence --------- #
+    def save(self, path):
+        """Write the index to ``path`` (one .npy file), replacing it atomically."""
+        with self._lock:
+            self.merge()
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(self._records))
+            os.replace(tmp, path)
+            self.unsaved = 0
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    # --------- queries --------- #
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def _cell_ids(self, cell):
+        ids = self._records["id"][self._offsets[cell] : self._offsets[cell + 1]]
+        extra = self._pending.get(cell)
+        return np.concatenate([ids, extra]) if extra else ids
+
+    def _search(self, d2, cells, limit, exclude):
+        """Matches from occupied ``cells``, nearest first, newest first at equal distance."""
+        with self._lock:
+            return self._collect(d2, cells, limit, exclude)
+
+    def _collect(self, d2, cells, limit, exclude):
+        matches = []
+        levels = d2[cells]
+        for level in np.unique(levels).tolist():
+            need = None if limit is None else limit - len(matches)
+            # A cell's ids are ascending, so its newest are at the end; read only those
+            take = None if need is None else need + len(exclude)
+            ids = np.concatenate([self._cell_ids(cell)[-take if take else None :] for cell in cells[levels == level]])
+            ids = [id for id in np.sort(ids)[::-1].tolist() if id not in exclude][:need]
+            distance = float(np.sqrt(level))
+            matches.extend(Match(id, distance) for id in ids)
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+    def knn(self, scores, k=5, exclude=()):
+        """The ``k`` nearest ids to ``scores``, nearest first, skipping ``exclude``."""
+        exclude = set(exclude)
+        need = k + len(exclude)
+        if need <= 0 or not len(self):
+            return []
+        d2 = ((CELLS - _vector(scores)) ** 2).sum(axis=1)
+        within = np.cumsum(np.bincount(d2, weights=self.counts, minlength=_MAX_D2 + 1))
+        radius = int(np.searchsorted(within, min(need, within[-1])))
+        cells = np.flatnonzero((d2 <= radius) & (self.counts > 0))
+        return self._search(d2, cells, k, exclude)
+
+    def within(self, scores, radius, limit=None, exclude=()):
+        """Ids within Euclidean ``radius`` of ``scores``, nearest first (at most ``limit``)."""
+        d2 = ((CELLS - _vector(scores)) ** 2).sum(axis=1)
+        cells = np.flatnonzero((d2 <= radius**2 + 1e-9) & (self.counts > 0))
+        return self._search(d2, cells, limit, set(exclude))
+
+    def count_within(self, scores, radius):
+        """How many ids are within ``radius``, from the per-cell counts alone."""
+        d2 = ((CELLS - _vector(scores)) ** 2).sum(axis=1)
+        return int(self.counts[d2 <= radius**2 + 1e-9].sum())
+
+
+def nearest_profiles(scores, profiles, k=1):
+    """The ``k`` profiles of {name: scores dict} nearest to ``scores``: [Match(name, distance)]."""
+    names = list(profiles)
+    matrix = np.array([[profiles[n][p] for p in PRINCIPLES] for n in names], dtype=np.float64)
+    distances = np.sqrt(((matrix - _vector(scores)) ** 2).sum(axis=1))
+    order = np.argsort(distances, kind="stable")[:k]
+    return [Match(names[i], float(distances[i])) for i in order]
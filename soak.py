@@ -0,0 +1,219 @@
+"""Soak test: does a worker's memory stay flat under hours of session churn?
+
+    python soak.py --duration 7200 --students 30
+
+Starts one worker with small session budgets and a short idle expiry, so
+the eviction and expiry paths of session_resources.py run constantly, and
+keeps ``--students`` simulated browsers busy until ``--duration`` is over.
+Each one opens a session, submits a few analyses, uploads a fresh CSV batch
+to the Compare view (an error if the view can't read it), and then either
+leaves or stays connected but idle past the expiry before leaving; then a
+new one takes its place. At the end, the worker's ``?stats`` line with the
+eviction counts is printed.
+
+The worker's resident memory is sampled every ``--sample`` seconds. Memory
+is "flat" when the median of the last third of the samples is within
+``--tolerance`` of the median of the middle third (the first third is
+warm-up: imports, caches filling). The exit status is 1 otherwise.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import aiohttp
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from deploy import start_worker, stop, warm_shared_cache, worker_env
+from loadtest import CUSTOM_VIEW, Session, wait_healthy, ws_url
+from rubric import MAX_SCORE, PRINCIPLES
+
+COMPARE_VIEW = "Compare"
+
+
+def rss_bytes(pid):
+    """Resident memory of process ``pid`` in bytes (Linux)."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError(f"no VmRSS for process {pid}")
+
+
+def batch_csv(rows, rng):
+    lines = [",".join(PRINCIPLES)]
+    lines += [",".join(str(rng.randint(0, MAX_SCORE)) for _ in PRINCIPLES) for _ in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def upload(session, http, base_url, widget_id, data, name="batch.csv"):
+    """Upload ``data`` to the file_uploader ``widget_id`` like the browser does."""
+    msg = BackMsg()
+    msg.file_urls_request.request_id = str(random.getrandbits(32))
+    msg.file_urls_request.session_id = session.session_id
+    msg.file_urls_request.file_names.append(name)
+    await session.ws.send(msg.SerializeToString())
+    while True:
+        fwd = ForwardMsg()
+        fwd.ParseFromString(await session.ws.recv())
+        if fwd.WhichOneof("type") == "file_urls_response":
+            urls = fwd.file_urls_response.file_urls[0]
+            break
+
+    form = aiohttp.FormData()
+    form.add_field("UploadedFile", data, filename=name, content_type="text/csv")
+    async with http.put(base_url + urls.upload_url, data=form) as response:
+        response.raise_for_status()
+
+    state = WidgetState(id=widget_id)
+    state.file_uploader_state_value.uploaded_file_info.append(
+        UploadedFileInfo(file_id=urls.file_id, name=name, size=len(data), file_urls=urls)
+    )
+    session.states[widget_id] = state
+
+
+async def visitor(base_url, http, args, rng, stats):
+    """One browser session: a few submits, one upload, then leave or go idle."""
+    async with websockets.connect(ws_url(base_url), subprotocols=["streamlit"], max_size=None) as ws:
+        session = Session(ws)
+        await session.rerun()
+        view_id, _ = session.find("button_group", key="view")
+
+        session.choose_many(view_id, [CUSTOM_VIEW])
+        await session.rerun()
+        for _ in range(rng.randint(1, args.submits)):
+            for i in range(1, len(PRINCIPLES) + 1):
+                radio_id, radio = session.find("radio", key=f"q{i}")
+                session.choose(radio_id, rng.choice(radio.options))
+            submit_id, _ = session.find("button", label="Analyze")
+            await session.rerun(triggers=[submit_id])
+            stats["submits"] += 1
+
+        session.choose_many(view_id, [COMPARE_VIEW])
+        await session.rerun()
+        uploader_id, _ = session.find("file_uploader", key="compare_upload")
+        await upload(session, http, base_url, uploader_id, batch_csv(args.upload_rows, rng))
+        markdown = await session.rerun()
+        errors = [alert for alert in session.alerts if alert.startswith("Could not read")]
+        if errors:
+            raise RuntimeError(f"upload rejected: {errors[0]}")
+        if not any("environments selected" in m for m in markdown):
+            raise RuntimeError("the uploaded batch did not reach the Compare charts")
+        stats["uploads"] += 1
+
+        if rng.random() < args.idle_share:
+            # Stay connected past the idle expiry, like a forgotten tab
+            await asyncio.sleep(args.idle_minutes * 60 * rng.uniform(1.2, 2.0))
+            stats["idled"] += 1
+    stats["sessions"] += 1
+
+
+async def eviction_summary(base_url):
+    """The ?stats page's session-memory line (sessions tracked, evictions by reason)."""
+    async with websockets.connect(ws_url(base_url), subprotocols=["streamlit"], max_size=None) as ws:
+        markdown = await Session(ws).rerun(query="stats")
+    return next((m for m in markdown if "sessions tracked" in m), "no session memory stats")
+
+
+async def soak(base_url, pid, args):
+    stats = {"sessions": 0, "submits": 0, "uploads": 0, "idled": 0, "errors": 0}
+    samples = []
+    start = time.monotonic()
+    deadline = start + args.duration
+
+    async def slot(i):
+        rng = random.Random(args.seed + i)
+        async with aiohttp.ClientSession() as http:
+            while time.monotonic() < deadline:
+                try:
+                    await visitor(base_url, http, args, rng, stats)
+                except Exception as exc:
+                    stats["errors"] += 1
+                    print(f"    {type(exc).__name__}: {exc}", file=sys.stderr)
+                    await asyncio.sleep(1)
+
+    async def sampler():
+        while time.monotonic() < deadline:
+            elapsed = time.monotonic() - start
+            samples.append((elapsed, rss_bytes(pid)))
+            print(
+                f"{elapsed / 60:7.1f} min  rss {samples[-1][1] / 2**20:7.1f} MB  "
+                f"sessions {stats['sessions']:,}  submits {stats['submits']:,}  "
+                f"uploads {stats['uploads']:,}  errors {stats['errors']}",
+                flush=True,
+            )
+            await asyncio.sleep(min(args.sample, max(deadline - time.monotonic(), 0)))
+        samples.append((time.monotonic() - start, rss_bytes(pid)))
+
+    await asyncio.gather(sampler(), *(slot(i) for i in range(args.students)))
+    stats["evictions"] = await eviction_summary(base_url)
+    return samples, stats
+
+
+def verdict(samples, tolerance):
+    """(flat, middle-third median, last-third median) of the RSS samples."""
+    third = len(samples) // 3
+    middle = statistics.median(rss for _, rss in samples[third : 2 * third])
+    last = statistics.median(rss for _, rss in samples[2 * third :])
+    return last <= middle * (1 + tolerance), middle, last
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that worker memory stays flat under session churn.")
+    parser.add_argument("--duration", type=float, default=3600, help="seconds")
+    parser.add_argument("--students", type=int, default=20, help="concurrent sessions")
+    parser.add_argument("--submits", type=int, default=5, help="at most this many submits per session")
+    parser.add_argument("--upload-rows", type=int, default=5000, help="rows per uploaded batch")
+    parser.add_argument("--idle-share", type=float, default=0.3, help="share of sessions that idle out")
+    parser.add_argument("--idle-minutes", type=float, default=0.5, help="worker's LEA_SESSION_IDLE_MINUTES")
+    parser.add_argument("--session-budget-mb", type=float, default=0.1)
+    parser.add_argument("--memory-budget-mb", type=float, default=2)
+    parser.add_argument("--sample", type=float, default=30, help="seconds between memory samples")
+    parser.add_argument("--tolerance", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    run_dir = tempfile.mkdtemp(prefix="lea-soak-")
+    env = worker_env(
+        run_dir,
+        {
+            "LEA_STORE_PATH": os.path.join(run_dir, "soak.db"),
+            "LEA_SESSION_BUDGET_MB": str(args.session_budget_mb),
+            "LEA_MEMORY_BUDGET_MB": str(args.memory_budget_mb),
+            "LEA_SESSION_IDLE_MINUTES": str(args.idle_minutes),
+            # The upload PUT comes from this script, which has no XSRF cookie
+            "STREAMLIT_SERVER_ENABLE_XSRF_PROTECTION": "false",
+        },
+    )
+    warm_shared_cache(env["LEA_SHARED_CACHE"])
+    worker = start_worker(args.port, env, os.path.join(run_dir, "worker.log"), "soak")
+    try:
+        wait_healthy([args.port])
+        samples, stats = asyncio.run(soak(f"http://127.0.0.1:{args.port}", worker.pid, args))
+    finally:
+        stop([worker])
+
+    flat, middle, last = verdict(samples, args.tolerance)
+    print(
+        f"{stats['sessions']:,} sessions ({stats['idled']:,} idled out), {stats['submits']:,} submits, "
+        f"{stats['uploads']:,} uploads, {stats['errors']} errors in {args.duration / 60:.0f} min"
+    )
+    print(f"worker: {stats['evictions']}")
+    print(
+        f"rss: peak {max(rss for _, rss in samples) / 2**20:.1f} MB, middle third {middle / 2**20:.1f} MB, "
+        f"last third {last / 2**20:.1f} MB -> {'flat' if flat else 'GROWING'}"
+    )
+    sys.exit(0 if flat else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Where does a cold start of the app spend its time?
+
+    python startup_report.py            # top 15 imports per view
+    python startup_report.py --top 30
+
+Runs the app in a fresh interpreter under ``python -X importtime``, first the
+default view and then every other view in turn, and reports for each stage
+the wall time and the top-level modules it imported (cumulative import time,
+so ``pandas`` includes everything pandas pulls in). Modules imported by an
+earlier stage are free for later ones, which is exactly what a student
+switching views experiences.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MARKER = "@@stage "
+
+# Runs in the child interpreter; stage markers go to stderr so they
+# interleave with the -X importtime lines.
+CHILD = """
+import os, sys, time
+from streamlit.testing.v1 import AppTest
+
+def stage(name, started):
+    print(f"{MARKER}{name} {(time.perf_counter() - started) * 1000:.1f}", file=sys.stderr, flush=True)
+
+stage("harness", 0)
+started = time.perf_counter()
+at = AppTest.from_file(APP, default_timeout=120).run()
+stage("default view", started)
+control = at.segmented_control(key="view")
+for view in control.options[1:]:
+    started = time.perf_counter()
+    at.segmented_control(key="view").set_value(view).run()
+    stage(view, started)
+"""
+
+
+def run_child(app):
+    env = dict(os.environ)
+    env.setdefault("LEA_STORE_PATH", os.path.join(tempfile.mkdtemp(), "startup.db"))
+    source = f"MARKER = {MARKER!r}\nAPP = {app!r}\n{CHILD}"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", source],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(proc.returncode)
+    return proc.stderr.splitlines()
+
+
+def parse_stages(lines):
+    """[(stage, wall_ms, {top-level module: cumulative µs})] from importtime output."""
+    stages, imports = [], {}
+    for line in lines:
+        if line.startswith(MARKER):
+            name, wall = line[len(MARKER):].rsplit(" ", 1)
+            stages.append((name, float(wall), imports))
+            imports = {}
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        # Nested imports are indented under their parent, which already counts them
+        if module.startswith(" ") and not module.startswith("  "):
+            top = module.strip().split(".")[0]
+            imports[top] = imports.get(top, 0) + int(cumulative)
+    # Imports done before the first run (AppTest itself) are the harness's cost
+    return [s for s in stages if s[0] != "harness"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Break down the app's cold-start time by view.")
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--top", type=int, default=15, help="imports listed per stage")
+    args = parser.parse_args(argv)
+
+    for name, wall, imports in parse_stages(run_child(args.app)):
+        total = sum(imports.values()) / 1000
+        print(f"{name}: {wall:.0f} ms wall, {total:.0f} ms importing")
+        ranked = sorted(imports.items(), key=lambda kv: kv[1], reverse=True)
+        for module, us in ranked[: args.top]:
+            print(f"  {us / 1000:8.1f} ms  {module}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
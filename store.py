@@ -0,0 +1,351 @@
+"""Persistent history of analyses in a local SQLite database.
+
+Submissions are queued and written by one background thread in batches, so
+a burst of form submits turns into a few multi-row transactions instead of
+one fsync each. The database runs in WAL mode, so readers (the history tab)
+never block the writer.
+
+Paging is keyset-based on (created_at, id) and served from the time
+indexes. Aggregates are answered from ``score_counts``, a small summary
+table of per-(cohort, day, principle, score) counts that the writer keeps
+up to date in the same transaction as the inserts, so their cost does not
+grow with the number of stored analyses.
+
+Analyses imported from elsewhere (lms_import.py) carry an ``external_id``.
+It is unique, so importing the same record again updates the earlier row in
+place (same id, counts adjusted) instead of adding a second one. Each such
+update is logged in ``analysis_updates`` with an increasing ``seq``, so
+indexes that follow the history by id (similarity.py) can re-read the rows
+that changed under ids they already hold.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from rubric import PRINCIPLES
+
+# SQL column for each design principle, in PRINCIPLES order
+COLUMNS = {
+    "Scaffolding": "scaffolding",
+    "ICAP engagement": "icap",
+    "Feedback quality": "feedback",
+    "Collaboration": "collaboration",
+    "Metacognitive support": "metacognition",
+}
+_SCORE_COLUMNS = ", ".join(COLUMNS[p] for p in PRINCIPLES)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    env_name TEXT NOT NULL,
+    cohort TEXT,
+    created_at REAL NOT NULL,
+    {", ".join(f"{COLUMNS[p]} INTEGER NOT NULL" for p in PRINCIPLES)},
+    external_id TEXT
+);
+CREATE INDEX IF NOT EXISTS analyses_cohort_time ON analyses (cohort, created_at);
+CREATE INDEX IF NOT EXISTS analyses_time ON analyses (created_at);
+CREATE TABLE IF NOT EXISTS score_counts (
+    cohort TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    principle INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (cohort, day, principle, score)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS analysis_updates (
+    analysis_id INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analysis_updates_seq ON analysis_updates (seq);
+"""
+
+_UPSERT_COUNTS = (
+    "INSERT INTO score_counts (cohort, day, principle, score, n) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (cohort, day, principle, score) DO UPDATE SET n = n + excluded.n"
+)
+
+# Rebuilds score_counts from analyses, for databases created before it existed
+_BACKFILL_COUNTS = " UNION ALL ".join(
+    f"SELECT COALESCE(cohort, ''), CAST(created_at / 86400 AS INTEGER), {i}, {COLUMNS[p]}, COUNT(*) "
+    f"FROM analyses GROUP BY 1, 2, 4"
+    for i, p in enumerate(PRINCIPLES)
+)
+
+# Created after the migration below, for databases from before external_id
+_EXTERNAL_ID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS analyses_external_id ON analyses (external_id)"
+
+# Only external_id can conflict (NULLs never do): a re-imported record
+# updates its earlier row and keeps its id
+_INSERT = (
+    f"INSERT INTO analyses (env_name, cohort, created_at, {_SCORE_COLUMNS}, external_id) "
+    f"VALUES (?, ?, ?, {', '.join('?' for _ in PRINCIPLES)}, ?) "
+    "ON CONFLICT (external_id) DO UPDATE SET env_name = excluded.env_name, cohort = excluded.cohort, "
+    "created_at = excluded.created_at, "
+    + ", ".join(f"{COLUMNS[p]} = excluded.{COLUMNS[p]}" for p in PRINCIPLES)
+)
+
+# Gives an updated analysis the next seq; run inside the write transaction
+_LOG_UPDATE = (
+    "INSERT INTO analysis_updates (analysis_id, seq) "
+    "SELECT ?, COALESCE(MAX(seq), 0) + 1 FROM analysis_updates WHERE true "
+    "ON CONFLICT (analysis_id) DO UPDATE SET seq = excluded.seq"
+)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class AnalysisStore:
+    """Append-only analysis history with batched writes and SQL aggregates."""
+
+    def __init__(self, path, batch_size=500, flush_interval=0.5):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        with _connect(self.path) as conn:
+            conn.executescript(SCHEMA)
+            if "external_id" not in {r[1] for r in conn.execute("PRAGMA table_info(analyses)")}:
+                conn.execute("ALTER TABLE analyses ADD COLUMN external_id TEXT")
+            conn.execute(_EXTERNAL_ID_INDEX)
+            if conn.execute("SELECT 1 FROM score_counts LIMIT 1").fetchone() is None:
+                conn.execute(f"INSERT INTO score_counts {_BACKFILL_COUNTS}")
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="analysis-store-writer", daemon=True)
+        self._writer.start()
+        # Commit whatever is still queued when the server shuts down
+        atexit.register(self.close)
+
+    # --------- writes --------- #
+    def add(self, env_name, scores, cohort=None, created_at=None, external_id=None):
+        """Queue one analysis; ``scores`` is a dict keyed by design principle.
+
+        An analysis with the ``external_id`` of a stored one replaces it.
+        """
+        self._queue.put(
+            (
+                env_name,
+                cohort or None,
+                time.time() if created_at is None else created_at,
+                *(int(scores[p]) for p in PRINCIPLES),
+                external_id,
+            )
+        )
+
+    def add_many(self, rows):
+        """Queue (env_name, scores, cohort) tuples."""
+        for env_name, scores, cohort in rows:
+            self.add(env_name, scores, cohort)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._writer.join()
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        running = True
+        while running:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if not running or waiters or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+            if batch:
+                with conn:
+                    # Take the write lock first, so the rows read as replaced
+                    # can't change before they are updated (other processes write too)
+                    conn.execute("BEGIN IMMEDIATE")
+                    batch, replaced = self._replacements(conn, batch)
+                    counts = Counter()
+                    for rows, sign in ((batch, 1), (replaced, -1)):
+                        for row in rows:
+                            cohort, day = row[1] or "", int(row[2] // 86400)
+                            for i, score in enumerate(row[3 : 3 + len(PRINCIPLES)]):
+                                counts[cohort, day, i, score] += sign
+                    conn.executemany(_INSERT, batch)
+                    conn.executemany(_UPSERT_COUNTS, [(*key, n) for key, n in counts.items()])
+                    if replaced:
+                        conn.executemany(_LOG_UPDATE, [(row[-1],) for row in replaced])
+                        conn.execute("DELETE FROM score_counts WHERE n <= 0")
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    @staticmethod
+    def _replacements(conn, batch):
+        """The batch with only the last row per external_id, and the stored rows it replaces.
+
+        Replaced rows are (env_name, cohort, created_at, *scores, id).
+        """
+        latest = {row[-1]: row for row in batch if row[-1] is not None}
+        if not latest:
+            return batch, []
+        batch = [row for row in batch if row[-1] is None or latest[row[-1]] is row]
+        ids, replaced = list(latest), []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            replaced += conn.execute(
+                f"SELECT env_name, cohort, created_at, {_SCORE_COLUMNS}, id FROM analyses "
+                f"WHERE external_id IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+        return batch, replaced
+
+    # --------- reads --------- #
+    @property
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    @staticmethod
+    def _counts_where(cohort=None, since=None, principle=None):
+        clauses, params = [], []
+        if principle is not None:
+            clauses.append("principle = ?")
+            params.append(principle)
+        if cohort is not None:
+            clauses.append("cohort = ?")
+            params.append(cohort)
+        if since is not None:
+            clauses.append("day >= ?")
+            params.append(int(since // 86400))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, cohort=None):
+        where, params = self._counts_where(cohort, principle=0)
+        return self._reader.execute(f"SELECT COALESCE(SUM(n), 0) FROM score_counts{where}", params).fetchone()[0]
+
+    def cohorts(self):
+        rows = self._reader.execute("SELECT DISTINCT cohort FROM score_counts WHERE cohort != '' ORDER BY cohort")
+        return [r[0] for r in rows]
+
+    def page(self, cohort=None, before=None, limit=50):
+        """Newest-first page of analyses older than ``before``.
+
+        Returns a list of dicts. ``before`` is the (created_at, id) of the last
+        row of the previous page; cost does not depend on how deep the page is.
+        """
+        clauses, params = [], []
+        if cohort is not None:
+            clauses.append("cohort = ?")
+            params.append(cohort)
+        if before is not None:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(before)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        cursor = self._reader.execute(
+            f"SELECT id, env_name, cohort, created_at, {_SCORE_COLUMNS} "
+            f"FROM analyses{where} ORDER BY created_at DESC, id DESC LIMIT ?",
+            [*params, limit],
+        )
+        return [
+            {"id": r[0], "env_name": r[1], "cohort": r[2], "created_at": r[3], **dict(zip(PRINCIPLES, r[4:]))}
+            for r in cursor
+        ]
+
+    def score_table(self, cohort=None, chunk=100_000):
+        """Every stored analysis (of ``cohort``) as a compact score_table.ScoreTable."""
+        from score_table import ScoreTable
+
+        where, params = (" WHERE cohort = ?", [cohort]) if cohort is not None else ("", [])
+        cursor = self._reader.execute(
+            f"SELECT env_name, cohort, {_SCORE_COLUMNS} FROM analyses{where} ORDER BY id", params
+        )
+        parts = []
+        while rows := cursor.fetchmany(chunk):
+            env_names, cohorts, *scores = zip(*rows)
+            parts.append(ScoreTable.from_arrays(list(zip(*scores)), env_names, cohorts))
+        return ScoreTable.concat(parts)
+
+    def scores_after(self, after_id=0, limit=100_000):
+        """(id, score...) tuples of analyses with ``id > after_id``, oldest first.
+
+        For indexes that follow the history incrementally (similarity.py).
+        """
+        return self._reader.execute(
+            f"SELECT id, {_SCORE_COLUMNS} FROM analyses WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        ).fetchall()
+
+    def updated_after(self, after_seq=0, limit=100_000):
+        """(seq, id, score...) of analyses updated in place with ``seq > after_seq``, oldest first."""
+        return self._reader.execute(
+            f"SELECT u.seq, a.id, {', '.join(f'a.{COLUMNS[p]}' for p in PRINCIPLES)} "
+            "FROM analysis_updates u JOIN analyses a ON a.id = u.analysis_id "
+            "WHERE u.seq > ? ORDER BY u.seq LIMIT ?",
+            (after_seq, limit),
+        ).fetchall()
+
+    def get(self, ids):
+        """{id: row dict} for the analyses in ``ids`` (missing ids are left out)."""
+        ids = list(ids)
+        if not ids:
+            return {}
+        cursor = self._reader.execute(
+            f"SELECT id, env_name, cohort, created_at, {_SCORE_COLUMNS} FROM analyses "
+            f"WHERE id IN ({', '.join('?' for _ in ids)})",
+            ids,
+        )
+        return {
+            r[0]: {"id": r[0], "env_name": r[1], "cohort": r[2], "created_at": r[3], **dict(zip(PRINCIPLES, r[4:]))}
+            for r in cursor
+        }
+
+    def mean_profiles(self, since=None):
+        """Mean score per principle for each cohort: {cohort: (n, {principle: mean})}.
+
+        Analyses without a cohort are reported under ``None``. ``since`` is a
+        unix timestamp, applied at day granularity.
+        """
+        where, params = self._counts_where(since=since)
+        cursor = self._reader.execute(
+            f"SELECT cohort, principle, SUM(n), SUM(score * n) FROM score_counts{where} "
+            "GROUP BY cohort, principle ORDER BY cohort, principle",
+            params,
+        )
+        out = {}
+        for cohort, principle, n, total in cursor:
+            _, means = out.setdefault(cohort or None, (n, {}))
+            means[PRINCIPLES[principle]] = total / n if n else 0.0
+        return out
+
+    def distribution(self, cohort=None, since=None):
+        """Counts per score value for each principle: {principle: {score: n}}."""
+        where, params = self._counts_where(cohort, since)
+        out = {p: {} for p in PRINCIPLES}
+        cursor = self._reader.execute(
+            f"SELECT principle, score, SUM(n) FROM score_counts{where} GROUP BY principle, score ORDER BY principle, score",
+            params,
+        )
+        for principle, score, n in cursor:
+            out[PRINCIPLES[principle]][score] = n
+        return out
@@ -0,0 +1,260 @@
+"""Opt-in timing spans for the stages of a rerun.
+
+Set ``LEA_TELEMETRY_DIR`` to turn it on. Every ``span`` is then timed and
+recorded three ways:
+
+- an aggregate latency histogram per stage,
+- per-session counters (calls and total seconds per stage), for the most
+  recent ``MAX_SESSIONS`` sessions,
+- the span itself, in the OpenTelemetry JSON shape, so nested spans form
+  one trace per rerun.
+
+They are written to ``metrics.prom`` (Prometheus text format, e.g. for the
+node_exporter textfile collector) and appended to ``spans.jsonl`` in that
+directory at most every ``flush_interval`` seconds and at exit.
+
+When telemetry is off, ``span`` returns one shared no-op context manager,
+so an instrumented stage costs a function call and nothing else.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import TELEMETRY_DIR
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+MAX_SESSIONS = 1000
+MAX_PENDING_SPANS = 100_000
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class StageStats:
+    """Histogram of one stage's durations."""
+
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Span:
+    """A timed stage; use through ``Telemetry.span``."""
+
+    __slots__ = ("telemetry", "name", "attributes", "trace_id", "span_id", "parent_id", "session", "start")
+
+    def __init__(self, telemetry, name, attributes):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        local = self.telemetry._local
+        stack = getattr(local, "stack", None)
+        if stack is None:
+            stack = local.stack = []
+        parent = stack[-1] if stack else None
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = ""
+            self.session = self.attributes.get("session", "")
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.session = parent.session
+        stack.append(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.time_ns()
+        self.telemetry._local.stack.pop()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.telemetry._record(self, end)
+        return False
+
+
+class Telemetry:
+    """Span recorder with Prometheus text and OTel JSON-lines file exporters."""
+
+    def __init__(self, directory, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stages = {}
+        self.sessions = OrderedDict()
+        self.started = time.time()
+        self._pending = []
+        self._lock = threading.Lock()
+        # One flush at a time, so spans.jsonl appends and metrics.prom renames don't race
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        self._last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush)
+
+    def span(self, name, **attributes):
+        return Span(self, name, attributes)
+
+    def _record(self, span, end):
+        seconds = (end - span.start) / 1e9
+        with self._lock:
+            stats = self.stages.get(span.name)
+            if stats is None:
+                stats = self.stages[span.name] = StageStats()
+            stats.observe(seconds)
+
+            if span.session:
+                per_stage = self.sessions.get(span.session)
+                if per_stage is None:
+                    per_stage = self.sessions[span.session] = {}
+                    if len(self.sessions) > MAX_SESSIONS:
+                        self.sessions.popitem(last=False)
+                else:
+                    self.sessions.move_to_end(span.session)
+                calls, total = per_stage.get(span.name, (0, 0.0))
+                per_stage[span.name] = (calls + 1, total + seconds)
+
+            if len(self._pending) < MAX_PENDING_SPANS:
+                self._pending.append((span, end))
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                # Claimed under the lock, so only this thread flushes for this interval
+                self._last_flush = time.monotonic()
+        if due:
+            self.flush()
+
+    # --------- exporters --------- #
+    def prometheus_text(self):
+        """Current counters in the Prometheus text exposition format."""
+        lines = [
+            "# HELP lea_stage_seconds Duration of instrumented app stages.",
+            "# TYPE lea_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, stats in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, stats.buckets):
+                    cumulative += n
+                    lines.append(f'lea_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'lea_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'lea_stage_seconds_sum{{stage="{name}"}} {stats.total:.6f}')
+                lines.append(f'lea_stage_seconds_count{{stage="{name}"}} {stats.count}')
+
+            lines += [
+                "# HELP lea_session_stage_calls_total Instrumented stage runs per session.",
+                "# TYPE lea_session_stage_calls_total counter",
+            ]
+            session_seconds = []
+            for session, per_stage in self.sessions.items():
+                for name, (calls, total) in sorted(per_stage.items()):
+                    labels = f'session="{session}",stage="{name}"'
+                    lines.append(f"lea_session_stage_calls_total{{{labels}}} {calls}")
+                    session_seconds.append(f"lea_session_stage_seconds_total{{{labels}}} {total:.6f}")
+            lines += [
+                "# HELP lea_session_stage_seconds_total Time spent in instrumented stages per session.",
+                "# TYPE lea_session_stage_seconds_total counter",
+                *session_seconds,
+                "# HELP lea_sessions Sessions with recorded spans (capped at MAX_SESSIONS).",
+                "# TYPE lea_sessions gauge",
+                f"lea_sessions {len(self.sessions)}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _otel_span(span, end):
+        attributes = [
+            {"key": key, "value": {"stringValue": str(value)}}
+            for key, value in span.attributes.items()
+            if key != "session"
+        ]
+        if span.session:
+            attributes.append({"key": "session.id", "value": {"stringValue": span.session}})
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start),
+            "endTimeUnixNano": str(end),
+            "attributes": attributes,
+        }
+
+    def flush(self):
+        """Rewrite metrics.prom and append pending spans to spans.jsonl."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+            if pending:
+                with open(os.path.join(self.directory, "spans.jsonl"), "a", encoding="utf-8") as f:
+                    for span, end in pending:
+                        f.write(json.dumps(self._otel_span(span, end)))
+                        f.write("\n")
+            # Write-then-rename so a scraper never reads a half-written file
+            path = os.path.join(self.directory, "metrics.prom")
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, path)
+
+    def summary(self):
+        """{stage: (count, mean seconds)} for display."""
+        with self._lock:
+            return {name: (s.count, s.total / s.count) for name, s in self.stages.items() if s.count}
+
+
+_telemetry = Telemetry(TELEMETRY_DIR) if TELEMETRY_DIR else None
+
+
+def enabled():
+    return _telemetry is not None
+
+
+def get_telemetry():
+    """The process-wide Telemetry, or None when LEA_TELEMETRY_DIR is unset."""
+    return _telemetry
+
+
+def span(name, **attributes):
+    """Context manager timing the stage ``name``; a no-op when disabled.
+
+    Pass ``session=...`` on the outermost span; nested spans inherit its
+    trace and session.
+    """
+    if _telemetry is None:
+        return _NOOP
+    return _telemetry.span(name, **attributes)
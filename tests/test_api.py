@@ -0,0 +1,38 @@
+import asyncio
+import json
+
+import api
+from report import render_report
+from rubric import load_rubric
+
+
+def test_report_json_matches_report_for_any_name():
+    rubric = load_rubric()
+    api._report_json_parts.cache_clear()
+    for name in ["", "  Lab 7 ", 'Room "B" \\ é\n', "$env"]:
+        report = render_report((1, 2, 3, 2, 1), name, rubric)
+        expected = {**report.as_dict(), "download_text": report.download_text}
+        assert json.loads(api._report_json((1, 2, 3, 2, 1), name, rubric)) == expected
+    assert api._report_json_parts.cache_info().currsize == 1
+
+
+def post(handler, body):
+    """Call an endpoint with a raw JSON body; returns (status, decoded JSON)."""
+    from starlette.requests import Request
+
+    async def receive():
+        return {"type": "http.request", "body": body.encode(), "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    response = asyncio.run(handler(request))
+    return response.status_code, json.loads(response.body)
+
+
+def test_lone_surrogate_name_is_rejected():
+    # Valid JSON, but the name can't be encoded into the UTF-8 response
+    body = '{"env_name": "Lab \\ud800", "answers": [0, 0, 0, 0, 0]}'
+    status, payload = post(api.score, body)
+    assert status == 422
+    assert "Unicode" in payload["error"]
+    status, payload = post(api.score_batch, f'{{"items": [{body}]}}')
+    assert status == 422 and payload["error"].startswith("item 0:")
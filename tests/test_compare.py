@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compare import read_upload
+from rubric import PRINCIPLES, load_rubric
+from scoring import ANSWER_COLUMNS, score_file, score_frame
+
+
+def test_scored_csv_upload(tmp_path):
+    # batch_score.py output: answer columns plus one score column per principle
+    questions = load_rubric().questions
+    answers = pd.DataFrame(
+        {col: [q.options[i % len(q.options)] for i in range(4)] for col, q in zip(ANSWER_COLUMNS, questions)}
+    )
+    answers["env_name"] = [f"Room {i}" for i in range(4)]
+    answers.to_csv(tmp_path / "answers.csv", index=False)
+    score_file(tmp_path / "answers.csv", tmp_path / "scored.csv")
+
+    table = read_upload((tmp_path / "scored.csv").read_bytes(), "scored.csv")
+
+    names, matrix = table.as_block()
+    assert names == [f"Room {i}" for i in range(4)]
+    np.testing.assert_array_equal(matrix, score_frame(answers)[PRINCIPLES].to_numpy())
+
+
+def test_score_columns_must_be_numbers():
+    data = ",".join(PRINCIPLES).encode() + b"\n1,2,3,4,x\n"
+    with pytest.raises(ValueError):
+        read_upload(data, "bad.csv")
@@ -0,0 +1,30 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from live import BrokerError, RemoteHub
+
+
+class FailingBroker(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_broker_failure_is_an_oserror():
+    server = HTTPServer(("127.0.0.1", 0), FailingBroker)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        hub = RemoteHub(f"http://127.0.0.1:{server.server_port}")
+        # The app shows OSError as "not reachable" instead of a traceback
+        with pytest.raises(OSError):
+            hub.latest("ABCDE")
+        with pytest.raises(BrokerError):
+            hub.latest("ABCDE")
+    finally:
+        server.shutdown()
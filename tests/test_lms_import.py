@@ -0,0 +1,43 @@
+import socket
+import threading
+import time
+
+import uvicorn
+
+from lms_import import Source, sync
+from lms_mock import MockLMS, create_app
+from store import AnalysisStore
+
+
+class UpdatingLMS(MockLMS):
+    """Updates the first record once, just before the second page is served."""
+
+    def page(self, since, until, page, per_page):
+        if page == 2 and not getattr(self, "touched", False):
+            self.touched = True
+            self.update([1])
+        return super().page(since, until, page, per_page)
+
+
+def serve(app):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def test_record_updated_mid_sync_does_not_hide_another(tmp_path):
+    server, url = serve(create_app(UpdatingLMS(50)))
+    store = AnalysisStore(tmp_path / "history.db")
+    try:
+        # Record 1 leaving the snapshot shifts page 2 by one, past record 11
+        result = sync(Source(url, per_page=10), store, tmp_path / "lms_sync.json", concurrency=1)
+    finally:
+        server.should_exit = True
+    assert result.imported == 50
+    assert result.pages == 10  # the shifted pass was repeated
+    assert store.count() == 50
+    store.close()
@@ -0,0 +1,33 @@
+from rubric import PRINCIPLES
+from similarity import SimilarityIndex
+from store import AnalysisStore
+
+
+def scores(*values):
+    return dict(zip(PRINCIPLES, values))
+
+
+def test_reimported_record_moves_in_the_index(tmp_path):
+    store = AnalysisStore(tmp_path / "history.db")
+    store.add("Lab", scores(1, 1, 1, 1, 1), external_id="lms:1")
+    store.add("Studio", scores(5, 5, 5, 5, 5), external_id="lms:2")
+    store.add("Typed", scores(3, 3, 3, 3, 3))
+    store.flush()
+    index = SimilarityIndex.from_store(store)
+    lab = index.knn(scores(1, 1, 1, 1, 1), k=1)[0].id
+
+    store.add("Lab v2", scores(4, 4, 4, 4, 4), external_id="lms:1")
+    store.flush()
+    assert index.sync(store) == 1
+
+    assert len(index) == 3
+    assert index.knn(scores(4, 4, 4, 4, 4), k=1)[0] == (lab, 0.0)
+    # Nothing is left at the old scores, and every match is a stored row
+    nearest = index.knn(scores(1, 1, 1, 1, 1), k=3)
+    assert [store.get([m.id])[m.id]["env_name"] for m in nearest] == ["Typed", "Lab v2", "Studio"]
+    # A saved index replays the update log once, which is harmless
+    index.save(tmp_path / "index.npy")
+    loaded = SimilarityIndex.load(str(tmp_path / "index.npy"))
+    loaded.sync(store)
+    assert len(loaded) == 3 and loaded.knn(scores(4, 4, 4, 4, 4), k=1)[0] == (lab, 0.0)
+    store.close()
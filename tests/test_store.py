@@ -0,0 +1,33 @@
+from rubric import PRINCIPLES
+from store import AnalysisStore
+
+
+def scores(value):
+    return {p: value for p in PRINCIPLES}
+
+
+def test_external_id_replaces_earlier_row(tmp_path):
+    store = AnalysisStore(tmp_path / "history.db")
+    store.add("Lab", scores(1), "A", external_id="lms:1")
+    store.add("Other", scores(4), "A")
+    store.flush()
+    store.add("Lab v2", scores(3), "B", external_id="lms:1")
+    store.flush()
+
+    assert store.count() == 2
+    assert sorted(r["env_name"] for r in store.page()) == ["Lab v2", "Other"]
+    assert store.distribution()["Scaffolding"] == {3: 1, 4: 1}
+    assert store.cohorts() == ["A", "B"]
+    assert store.count("A") == 1
+    store.close()
+
+
+def test_external_id_repeated_in_one_batch(tmp_path):
+    store = AnalysisStore(tmp_path / "history.db")
+    for value in (1, 2, 3):
+        store.add("Lab", scores(value), external_id="lms:1")
+    store.flush()
+
+    assert store.count() == 1
+    assert store.distribution()["Scaffolding"] == {3: 1}
+    store.close()
@@ -0,0 +1,30 @@
+import json
+import threading
+
+from telemetry import Telemetry
+
+
+def test_concurrent_flushes(tmp_path):
+    telemetry = Telemetry(str(tmp_path), flush_interval=0.0)
+    errors = []
+
+    def session():
+        for _ in range(500):
+            try:
+                with telemetry.span("rerun", session="s"):
+                    with telemetry.span("report"):
+                        pass
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    telemetry.flush()
+
+    assert errors == []
+    lines = (tmp_path / "spans.jsonl").read_text().splitlines()
+    assert len([json.loads(line) for line in lines]) == 8 * 500 * 2
+    assert 'lea_stage_seconds_count{stage="rerun"} 4000' in (tmp_path / "metrics.prom").read_text()
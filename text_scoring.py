@@ -0,0 +1,334 @@
+"""Score free-text lesson plans and observation notes against the rubric.
+
+    python text_scoring.py build-index text_index --corpus notes.csv --text-column text
+    python text_scoring.py score notes.csv scores.csv --index text_index --name-column title
+
+A local TF-IDF classifier with no network or model downloads. Each
+(principle, score) pair of the rubric gets a prototype built from its option
+text, keywords and lexicon terms (``lexicon`` in ``rubric.yaml``). A document
+is scored by comparing its TF-IDF vector (over 1-3 word terms) with every
+prototype; per principle it gets the score of the most similar prototype,
+or the principle's lowest score when it mentions none of its terms.
+
+``build_index`` writes the vocabulary, IDF weights (from an optional corpus
+of your own documents) and the prototype matrix to a directory once;
+``TextIndex.load`` memory-maps the arrays, so every worker process shares
+the same pages. Documents stream through a generator pipeline and are
+scored in batches in a process pool. The output has ``env_name`` plus one
+column per principle, the same shape as the form's scores, so it can be
+uploaded to the Compare view or passed to ``export.py --name-column env_name``.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rubric import PRINCIPLES, load_rubric
+
+MAX_NGRAM = 3
+
+_TOKEN = re.compile(r"[a-z][a-z'-]*")
+# Negations are kept: "no support" and "not asked to reflect" are lexicon terms
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or so "
+    "that the their them they this to was were will with".split()
+)
+
+
+# --------- text features --------- #
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def terms(text, max_ngram=MAX_NGRAM):
+    """All 1..max_ngram word terms of ``text``, in order."""
+    tokens = tokenize(text)
+    for n in range(1, max_ngram + 1):
+        for i in range(len(tokens) - n + 1):
+            yield " ".join(tokens[i : i + n])
+
+
+def _prototype_texts(rubric):
+    """[(principle index, score, text)] for every score a principle can get."""
+    prototypes = []
+    for p, q in enumerate(rubric.questions):
+        by_score = {}
+        for option, score in zip(q.options, q.scores.tolist()):
+            by_score.setdefault(score, []).append(option)
+        for keyword, score in q.keywords:
+            by_score.setdefault(score, []).append(keyword)
+        for score, term in q.lexicon:
+            by_score.setdefault(score, []).append(term)
+        for score, texts in sorted(by_score.items()):
+            # Separate phrases so n-grams don't run across them
+            prototypes.append((p, score, " . ".join(texts)))
+    return prototypes
+
+
+# --------- the index --------- #
+def build_index(path, corpus=(), rubric=None):
+    """Build the term index for ``rubric`` into directory ``path``.
+
+    ``corpus`` is an iterable of document texts used only for the IDF
+    weights; without one every term weighs the same. Returns the TextIndex.
+    """
+    rubric = rubric or load_rubric()
+    prototypes = _prototype_texts(rubric)
+    proto_terms = [Counter(t for part in text.split(" . ") for t in terms(part)) for _, _, text in prototypes]
+    vocab = sorted(set().union(*proto_terms))
+    column = {term: i for i, term in enumerate(vocab)}
+
+    df = np.zeros(len(vocab), dtype=np.int64)
+    n_docs = 0
+    for text in corpus:
+        n_docs += 1
+        for term in set(terms(text)):
+            i = column.get(term)
+            if i is not None:
+                df[i] += 1
+    if n_docs:
+        idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+    else:
+        idf = np.ones(len(vocab), dtype=np.float32)
+
+    matrix = np.zeros((len(prototypes), len(vocab)), dtype=np.float32)
+    for row, counts in enumerate(proto_terms):
+        for term, count in counts.items():
+            matrix[row, column[term]] = count
+    matrix *= idf
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "idf.npy"), idf)
+    np.save(os.path.join(path, "prototypes.npy"), matrix)
+    meta = {
+        "rubric_digest": rubric.digest,
+        "max_ngram": MAX_NGRAM,
+        "documents": n_docs,
+        "vocab": vocab,
+        "rows": [[p, score] for p, score, _ in prototypes],
+    }
+    with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return TextIndex.load(path)
+
+
+class TextIndex:
+    """Memory-mapped term index; score documents with ``score_texts``."""
+
+    def __init__(self, vocab, idf, prototypes, rows, rubric_digest="", max_ngram=MAX_NGRAM):
+        self.column = {term: i for i, term in enumerate(vocab)}
+        self.idf = idf
+        self.prototypes = prototypes
+        self.rubric_digest = rubric_digest
+        self.max_ngram = max_ngram
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1, 2)
+        self.row_scores = rows[:, 1].astype(np.uint8)
+        # Prototype rows are grouped by principle, in PRINCIPLES order
+        self.slices = []
+        for p in range(len(PRINCIPLES)):
+            (members,) = np.nonzero(rows[:, 0] == p)
+            if not len(members):
+                raise ValueError(f"Index has no prototypes for {PRINCIPLES[p]!r}")
+            self.slices.append(slice(members[0], members[-1] + 1))
+        self.fallback = np.array([self.row_scores[s].min() for s in self.slices], dtype=np.uint8)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            meta["vocab"],
+            np.load(os.path.join(path, "idf.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "prototypes.npy"), mmap_mode="r"),
+            meta["rows"],
+            meta.get("rubric_digest", ""),
+            meta.get("max_ngram", MAX_NGRAM),
+        )
+
+    def vectorize(self, texts):
+        """(n, vocab) float32 TF-IDF rows, sublinear TF, L2-normalized."""
+        out = np.zeros((len(texts), len(self.column)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = Counter(
+                i for i in map(self.column.get, terms(text or "", self.max_ngram)) if i is not None
+            )
+            if counts:
+                cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                out[row, cols] = 1 + np.log(tf)
+        out *= self.idf
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+    def score_texts(self, texts):
+        """(n, 5) uint8 scores, one row per text, in PRINCIPLES order."""
+        similarity = self.vectorize(texts) @ self.prototypes.T
+        scores = np.empty((len(texts), len(PRINCIPLES)), dtype=np.uint8)
+        for p, rows in enumerate(self.slices):
+            block = similarity[:, rows]
+            best = block.argmax(axis=1)
+            scores[:, p] = np.where(
+                block.max(axis=1, initial=0) > 0, self.row_scores[rows][best], self.fallback[p]
+            )
+        return scores
+
+    def score_text(self, text):
+        """Scores for one text, keyed by principle (like the form's scores)."""
+        return dict(zip(PRINCIPLES, self.score_texts([text])[0].tolist()))
+
+
+def check_index(index, rubric=None):
+    rubric = rubric or load_rubric()
+    if index.rubric_digest and index.rubric_digest != rubric.digest:
+        raise ValueError("The text index was built for a different rubric; rebuild it with build-index")
+
+
+# --------- streaming pipeline --------- #
+def iter_documents(src, text_column="text", name_column=None, chunksize=10_000):
+    """Yield (name, text) from a directory of .txt/.md files or a CSV/Parquet table."""
+    if os.path.isdir(src):
+        for entry in sorted(os.scandir(src), key=lambda e: e.name):
+            if entry.is_file() and entry.name.endswith((".txt", ".md")):
+                with open(entry.path, encoding="utf-8", errors="replace") as f:
+                    yield os.path.splitext(entry.name)[0], f.read()
+        return
+
+    from scoring import read_chunks
+
+    columns = [text_column] + ([name_column] if name_column else [])
+    row_no = 0
+    for chunk in read_chunks(src, chunksize, columns=columns):
+        texts = chunk[text_column].fillna("").astype(str).tolist()
+        names = chunk[name_column].fillna("").astype(str).tolist() if name_column else None
+        for i, text in enumerate(texts):
+            row_no += 1
+            yield (names[i] if names else f"Document {row_no}"), text
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# One index per worker process, memory-mapped by the pool initializer
+_worker_index = None
+
+
+def _init_worker(index_path):
+    global _worker_index
+    _worker_index = TextIndex.load(index_path)
+
+
+def _score_batch(texts):
+    return _worker_index.score_texts(texts)
+
+
+def score_documents(docs, index_path, workers=None, batch_size=256, max_pending=None):
+    """Yield (names, scores) per batch of (name, text) ``docs``, in input order.
+
+    With ``workers`` > 1, batches are scored in a process pool with at most
+    ``max_pending`` batches in flight.
+    """
+    index = TextIndex.load(index_path)
+    check_index(index)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for batch in _batches(docs, batch_size):
+            names, texts = zip(*batch)
+            yield list(names), index.score_texts(texts)
+        return
+
+    max_pending = max_pending or 4 * workers
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(index_path,)) as pool:
+        pending = deque()
+        for batch in _batches(docs, batch_size):
+            names, texts = zip(*batch)
+            pending.append((list(names), pool.submit(_score_batch, texts)))
+            while len(pending) > max_pending:
+                names, future = pending.popleft()
+                yield names, future.result()
+        while pending:
+            names, future = pending.popleft()
+            yield names, future.result()
+
+
+def score_documents_file(src, dst, index_path, text_column="text", name_column=None, workers=None, batch_size=256):
+    """Score every document in ``src`` into the CSV/Parquet ``dst``; return the count."""
+    from scoring import ChunkWriter
+
+    scored = 0
+    with ChunkWriter(dst) as writer:
+        chunk_names, chunk_scores = [], []
+        docs = iter_documents(src, text_column, name_column)
+        for names, scores in score_documents(docs, index_path, workers, batch_size):
+            chunk_names += names
+            chunk_scores.append(scores)
+            if len(chunk_names) >= 50_000:
+                writer.write(_frame(chunk_names, chunk_scores))
+                scored += len(chunk_names)
+                chunk_names, chunk_scores = [], []
+        if chunk_names or not scored:
+            writer.write(_frame(chunk_names, chunk_scores))
+            scored += len(chunk_names)
+    return scored
+
+
+def _frame(names, score_blocks):
+    import pandas as pd
+
+    scores = np.vstack(score_blocks) if score_blocks else np.empty((0, len(PRINCIPLES)), dtype=np.uint8)
+    df = pd.DataFrame(scores, columns=PRINCIPLES)
+    df.insert(0, "env_name", names)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score free-text environment descriptions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build-index", help="build the term index")
+    build.add_argument("index", help="output directory")
+    build.add_argument("--corpus", help="CSV/Parquet table or directory of .txt files for IDF weights")
+    build.add_argument("--text-column", default="text")
+
+    score = commands.add_parser("score", help="score documents")
+    score.add_argument("src", help="CSV/Parquet table or directory of .txt/.md files")
+    score.add_argument("dst", help="output .csv or .parquet file")
+    score.add_argument("--index", default="text_index", help="index directory (see build-index)")
+    score.add_argument("--text-column", default="text")
+    score.add_argument("--name-column", default=None, help="column used as env_name")
+    score.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    score.add_argument("--batch-size", type=int, default=256, help="documents per worker task")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == "build-index":
+        corpus = (text for _, text in iter_documents(args.corpus, args.text_column)) if args.corpus else ()
+        index = build_index(args.index, corpus)
+        print(f"Indexed {len(index.column):,} terms in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    count = score_documents_file(
+        args.src, args.dst, args.index, args.text_column, args.name_column, args.workers, args.batch_size
+    )
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else math.inf
+    print(f"Scored {count:,} documents in {elapsed:.2f}s ({rate:,.0f} docs/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()